@@ -0,0 +1,58 @@
+"""
+----------------------------------------------------------------
+Blitting
+----------------------------------------------------------------
+
+Redraws the lines of the viewer without redrawing the rest of their
+figure. The lines are animated, so a full draw of the figure leaves
+them out; that draw is saved as the background, and each update
+restores it and draws only the lines over it:
+
+    blitter = blitting.Blitter(fig.canvas, lines)
+    line.set_data(t, x_array)
+    blitter.blit()
+
+"""
+
+
+class Blitter():
+    """
+    Draws artists over a saved background of their figure.
+
+    Params:
+
+        canvas: the matplotlib canvas of the figure.
+
+        artists: the artists to draw. They are set animated, so that
+                 full draws of the figure leave them out.
+
+    Every full draw of the canvas, such as after it is resized, saves
+    the figure as the background and draws the artists over it.
+    """
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.artists = list(artists)
+        self.background = None
+        for artist in self.artists:
+            artist.set_animated(True)
+        canvas.mpl_connect("draw_event", self._save_background)
+
+    def _save_background(self, event):
+        self.background = self.canvas.copy_from_bbox(
+            self.canvas.figure.bbox)
+        self.blit()
+
+    def blit(self):
+        """
+        Draw the visible artists over the background. If there is no
+        background yet, a full draw is asked for instead, which saves
+        one and draws them.
+        """
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        for artist in self.artists:
+            if artist.get_visible():
+                self.canvas.figure.draw_artist(artist)
+        self.canvas.blit(self.canvas.figure.bbox)
@@ -0,0 +1,235 @@
+"""
+----------------------------------------------------------------
+Coupled oscillators
+----------------------------------------------------------------
+
+Chains and lattices of masses joined by springs, described by sparse
+mass, damping and stiffness matrices:
+
+    M a = - C v - K x + F(t)
+
+A System can be simulated by any of the fixed step methods in
+numerical with numerical.simulate(). Each step only needs sparse
+matrix-vector products, or solves with banded factors for Verlet's
+method, so the cost grows linearly with the number of masses.
+
+"""
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+import numerical as n
+
+
+class System():
+    """
+    A linear system of coupled oscillators.
+
+    Params:
+
+        M: the mass matrix.
+
+        C: the damping matrix.
+
+        K: the stiffness matrix.
+
+    Each is a square sparse matrix, or anything scipy.sparse can
+    convert to one. A diagonal (lumped) mass matrix is inverted
+    directly; any other is factorised once.
+    """
+    def __init__(self, M, C, K):
+        self.M = sparse.csr_matrix(M, dtype=float)
+        self.C = sparse.csr_matrix(C, dtype=float)
+        self.K = sparse.csr_matrix(K, dtype=float)
+        if (self.M - sparse.diags(self.M.diagonal())).nnz == 0:
+            self._inverse_mass = 1 / self.M.diagonal()
+            self._mass = None
+        else:
+            self._inverse_mass = None
+            self._mass = linalg.splu(self.M.tocsc())
+        self._verlet = {}
+        self._decay = {}
+
+    def __len__(self):
+        """The number of degrees of freedom."""
+        return self.M.shape[0]
+
+    def _solve_mass(self, forces):
+        """M^-1 applied to a vector, or to each column of an array."""
+        if self._inverse_mass is not None:
+            return (self._inverse_mass * forces.T).T
+        return self._mass.solve(forces)
+
+    def acceleration(self, x, v):
+        """The acceleration with no external force."""
+        return self._solve_mass(-(self.C @ v) - self.K @ x)
+
+    def spring(self, x):
+        """The acceleration due to the springs alone."""
+        return self._solve_mass(-(self.K @ x))
+
+    def damp(self, v, tau):
+        """
+        The velocity after damping alone acts for a time tau, by the
+        Crank-Nicolson method, which is symmetric in time as the
+        symplectic methods need.
+        """
+        if tau not in self._decay:
+            self._decay[tau] = (
+                linalg.splu((self.M + tau / 2 * self.C).tocsc()),
+                self.M - tau / 2 * self.C)
+        factor, right = self._decay[tau]
+        return factor.solve(right @ v)
+
+    def drive(self, forces):
+        """
+        The acceleration due to the force at each step, with a row per
+        step. Each row of forces holds the force on every degree of
+        freedom, or a single force applied to all of them.
+        """
+        forces = np.broadcast_to(forces.reshape(len(forces), -1),
+                                 (len(forces), len(self)))
+        return self._solve_mass(np.ascontiguousarray(forces.T)).T
+
+    def verlet_step(self, x, x_old, h):
+        """The next displacement by Verlet's method, with no force."""
+        if h not in self._verlet:
+            self._verlet[h] = (
+                linalg.splu((2 * self.M + h * self.C).tocsc()),
+                2 * (2 * self.M - h ** 2 * self.K),
+                h * self.C - 2 * self.M)
+        factor, A, B = self._verlet[h]
+        return factor.solve(A @ x + B @ x_old)
+
+    def energy(self, x_array, v_array):
+        """
+        The energy stored in the system at each step,
+        1/2 x.K x + 1/2 v.M v, for arrays with a row per degree of
+        freedom.
+        """
+        return 0.5 * (np.sum(x_array * (self.K @ x_array), axis=0) +
+                      np.sum(v_array * (self.M @ v_array), axis=0))
+
+
+def _springs(n_masses, k, fixed_ends):
+    """
+    The stiffness matrix of a line of masses joined by springs, with
+    the ends joined to walls if fixed_ends.
+    """
+    n_springs = n_masses + 1 if fixed_ends else n_masses - 1
+    k = np.broadcast_to(np.asarray(k, dtype=float), (n_springs,))
+    # Each spring pulls apart the pair of masses it joins.
+    joins = sparse.diags([np.ones(n_springs), -np.ones(n_springs)],
+                         [0, -1 if fixed_ends else 1],
+                         shape=(n_springs, n_masses + 1 if fixed_ends
+                                else n_masses))
+    if fixed_ends:
+        joins = joins.tocsc()[:, :n_masses]
+    return (joins.T @ sparse.diags(k) @ joins).tocsr()
+
+
+def chain(n_masses, m=1., k=1., b=0., fixed_ends=True):
+    """
+    A chain of masses joined by springs.
+
+    Params:
+
+        n_masses: the number of masses.
+
+    Kwargs:
+
+        m: the mass of each mass, or an array of them.
+
+        k: the spring constant of each spring, or an array of them,
+           from the first end. There are n_masses + 1 springs with
+           fixed ends and n_masses - 1 without.
+
+        b: the damping coefficient of each mass, damping its motion
+           relative to the walls, or an array of them.
+
+        fixed_ends: whether the ends of the chain are joined to walls.
+
+    Returns:
+
+        the System.
+    """
+    m = np.broadcast_to(np.asarray(m, dtype=float), (n_masses,))
+    b = np.broadcast_to(np.asarray(b, dtype=float), (n_masses,))
+    return System(sparse.diags(m), sparse.diags(b),
+                  _springs(n_masses, k, fixed_ends))
+
+
+def lattice(shape, m=1., k=1., b=0., fixed_ends=True):
+    """
+    A rectangular lattice of masses, each joined by springs to its
+    neighbours along each axis, moving in one direction as on a
+    membrane.
+
+    Params:
+
+        shape: the number of masses along each axis. The masses are
+               numbered in C order.
+
+    Kwargs:
+
+        m, b: as for chain, for each mass, or arrays of the lattice's
+              shape.
+
+        k: the spring constant of every spring.
+
+        fixed_ends: whether the edges of the lattice are joined to
+                    walls.
+
+    Returns:
+
+        the System.
+    """
+    shape = tuple(shape)
+    size = int(np.prod(shape))
+    m = np.broadcast_to(np.asarray(m, dtype=float), shape).reshape(-1)
+    b = np.broadcast_to(np.asarray(b, dtype=float), shape).reshape(-1)
+    K = sparse.csr_matrix((size, size))
+    for axis, length in enumerate(shape):
+        # The springs along one axis act on each line of masses in it.
+        before = sparse.identity(int(np.prod(shape[:axis])))
+        after = sparse.identity(int(np.prod(shape[axis + 1:])))
+        K = K + sparse.kron(sparse.kron(before,
+                                        _springs(length, k, fixed_ends)),
+                            after)
+    return System(sparse.diags(m), sparse.diags(b), K.tocsr())
+
+
+def simulate(method, system, x, v, t, h, force=None, time=None):
+    """
+    Simulate a coupled system with one of the fixed step methods in
+    numerical, such as n.verlet or n.rk4.
+
+    Params:
+
+        method: the method.
+
+        system: the System.
+
+        x: the initial displacement of each mass.
+
+        v: the initial velocity of each mass.
+
+        t: the time series across which to simulate the system.
+
+        h: the step size with which the values are calculated.
+
+    Kwargs:
+
+        force: as for the method. An array or function may give the
+               force on each mass, in an extra last axis; otherwise
+               the same force acts on every mass.
+
+        time: as for the method.
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_masses, len(t)).
+    """
+    x = np.broadcast_to(np.asarray(x, dtype=float), (len(system),))
+    v = np.broadcast_to(np.asarray(v, dtype=float), (len(system),))
+    return n.simulate(method, system, x, v, t, h, force=force, time=time)
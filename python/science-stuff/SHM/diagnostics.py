@@ -0,0 +1,301 @@
+"""
+----------------------------------------------------------------
+Diagnostics
+----------------------------------------------------------------
+
+Measures of a simulated trajectory: its energy, and its error against
+a reference such as the exact solution.
+
+Every function works on a single trajectory, an array over time, or a
+batch of them, with a row per system as the numerical methods return.
+The time is always the last axis. Parameters such as k and m may be
+scalars or have an element per system. Nothing is computed element by
+element in Python.
+
+For trajectories too long to hold at once, as from numerical.Stream,
+Online keeps the same measures up to date one chunk at a time.
+
+"""
+import numpy as np
+
+
+def _per_system(param, array):
+    """A parameter shaped to broadcast against an array over time."""
+    param = np.asarray(param, dtype=float)
+    return param.reshape(param.shape +
+                         (1,) * max(np.ndim(array) - param.ndim, 0))
+
+
+# Energy stored in the system:
+def energy(k, x_array, m, v_array):
+    """
+    Params:
+
+        k: the spring constant of the system.
+
+        x_array: the displacement array for the system.
+
+        m: the mass of the osciallator.
+
+        v_array: the velocity array for the system.
+
+    Mathematical backing:
+
+        E = 1 * k * x ^ 2 + 1 * m * v ^ 2
+            2               2
+
+    Returns:
+
+        the energy at each step, of the same shape as x_array.
+    """
+    return (0.5 * _per_system(k, x_array) * np.real(x_array) ** 2 +
+            0.5 * _per_system(m, v_array) * np.real(v_array) ** 2)
+
+
+# Chi Squared:
+def chi_sq(y_array, model_array):
+    """
+    Params:
+
+        y_array: the measured values.
+
+        model_array: the modelled values.
+
+    Mathematical backing:
+
+        chi ^ 2 = sum | y - model | ^ 2
+                      -------------
+                          model
+
+    Returns:
+
+        the chi squared of each system.
+    """
+    return np.sum(np.absolute(y_array - model_array) ** 2 / model_array,
+                  axis=-1)
+
+
+def rms_error(y_array, reference):
+    """The root mean square of the error of each system."""
+    return np.sqrt(np.mean(np.absolute(y_array - reference) ** 2, axis=-1))
+
+
+def max_error(y_array, reference):
+    """The largest absolute error of each system."""
+    return np.max(np.absolute(y_array - reference), axis=-1)
+
+
+def phase(b, m, k, x_array, v_array):
+    """
+    The phase of an under damped oscillator at each step.
+
+    Mathematical backing:
+
+        The free motion is x = A exp(-gamma t) cos(omega t + phi), so
+        with theta = omega t + phi,
+
+            x = A exp(-gamma t) cos(theta)
+
+            v + gamma x = - A omega exp(-gamma t) sin(theta)
+
+        which gives theta whatever the amplitude.
+
+    Returns:
+
+        the phase, wrapped to (-pi, pi], or nan for systems which
+        aren't under damped.
+    """
+    m = _per_system(m, x_array)
+    gamma = _per_system(b, x_array) / (2 * m)
+    disc = _per_system(k, x_array) / m - gamma ** 2
+    omega = np.sqrt(np.where(disc > 0, disc, np.nan))
+    return np.arctan2(-(v_array + gamma * x_array) / omega, x_array)
+
+
+def phase_error(b, m, k, x_array, v_array, x_reference, v_reference):
+    """
+    Params:
+
+        b, m, k: the oscillator, as for the numerical methods.
+
+        x_array, v_array: the simulated trajectory.
+
+        x_reference, v_reference: the reference trajectory, such as the
+                                  exact solution at the same times.
+
+    Returns:
+
+        how far the phase of the trajectory leads the reference at each
+        step, wrapped to (-pi, pi].
+    """
+    difference = (phase(b, m, k, x_array, v_array) -
+                  phase(b, m, k, x_reference, v_reference))
+    return np.angle(np.exp(1j * difference))
+
+
+def energy_drift_rate(energy_array, h, relative=False):
+    """
+    Params:
+
+        energy_array: the energy at each step.
+
+        h: the step size.
+
+    Kwargs:
+
+        relative: if True, the rate is divided by the initial energy.
+
+    Mathematical backing:
+
+        The slope of a least squares line through the energy against
+        time,
+
+            rate = sum (t - t_mean) (E - E_mean)
+                   -------------------------
+                      sum (t - t_mean) ^ 2
+
+        Zero for a method which conserves energy on average; negative
+        for one which damps the motion.
+
+    Returns:
+
+        the rate of change of energy per unit time of each system.
+    """
+    energy_array = np.asarray(energy_array, dtype=float)
+    t = h * np.arange(energy_array.shape[-1])
+    t = t - t.mean()
+    rate = (np.sum(t * (energy_array -
+                        energy_array.mean(axis=-1, keepdims=True)),
+                   axis=-1) / np.sum(t ** 2))
+    if relative:
+        rate = rate / energy_array[..., 0]
+    return rate
+
+
+class Online():
+    """
+    The diagnostics of a trajectory, kept up to date as it is made one
+    chunk at a time.
+
+    Params:
+
+        k: the spring constant, or an array of them, one per system.
+
+        m: the mass, or an array of them.
+
+        h: the step size.
+
+    Kwargs:
+
+        b: the damping coefficient, or an array of them. Needed for
+           the phase error.
+
+    After each update, these attributes hold the values for all the
+    steps so far, with an element per system:
+
+        energy:            the energy at the last step.
+
+        rms_error,
+        max_error,
+        chi_sq:            of the displacement against the reference,
+                           over the steps given one.
+
+        phase_error:       as for phase_error, at the last step given
+                           a reference velocity, if b is given.
+
+        max_phase_error:   the largest magnitude of the phase error
+                           over the steps given a reference velocity.
+
+        energy_drift_rate: as for energy_drift_rate.
+    """
+    def __init__(self, k, m, h, b=None):
+        self.k = k
+        self.m = m
+        self.h = h
+        self.b = b
+        self.n_steps = 0
+        self.energy = None
+        self.max_error = None
+        self.chi_sq = None
+        self.phase_error = None
+        self.max_phase_error = None
+        self._squared_error = None
+        # The number of steps given a reference.
+        self._n_compared = 0
+        # Running means and co-moments of time and energy, merged chunk
+        # by chunk as by Chan et al., for the energy drift.
+        self._t_mean = 0.
+        self._energy_mean = None
+        self._t_moment = 0.
+        self._co_moment = None
+
+    def update(self, x_chunk, v_chunk, x_reference=None, v_reference=None):
+        """
+        Add the next steps of the trajectory, with time as the last
+        axis, and optionally the reference displacement and velocity
+        at them. The phase error needs both, and b.
+        """
+        chunk = energy(self.k, x_chunk, self.m, v_chunk)
+        length = chunk.shape[-1]
+        if length == 0:
+            return self
+        self.energy = chunk[..., -1]
+
+        t = self.h * np.arange(self.n_steps, self.n_steps + length)
+        t_mean = t.mean()
+        energy_mean = chunk.mean(axis=-1)
+        t_moment = np.sum((t - t_mean) ** 2)
+        co_moment = np.sum((t - t_mean) * (chunk - energy_mean[..., None]),
+                           axis=-1)
+        if self.n_steps == 0:
+            self._t_mean, self._energy_mean = t_mean, energy_mean
+            self._t_moment, self._co_moment = t_moment, co_moment
+        else:
+            total = self.n_steps + length
+            weight = self.n_steps * length / total
+            dt = t_mean - self._t_mean
+            de = energy_mean - self._energy_mean
+            self._t_mean += dt * length / total
+            self._energy_mean = self._energy_mean + de * length / total
+            self._t_moment += t_moment + dt ** 2 * weight
+            self._co_moment = self._co_moment + co_moment + dt * de * weight
+
+        if x_reference is not None:
+            error = np.absolute(x_chunk - x_reference)
+            squared = np.sum(error ** 2, axis=-1)
+            largest = np.max(error, axis=-1)
+            chi = chi_sq(x_chunk, x_reference)
+            if self._squared_error is None:
+                self._squared_error = squared
+                self.max_error = largest
+                self.chi_sq = chi
+            else:
+                self._squared_error = self._squared_error + squared
+                self.max_error = np.maximum(self.max_error, largest)
+                self.chi_sq = self.chi_sq + chi
+            self._n_compared += length
+
+            if v_reference is not None and self.b is not None:
+                errors = phase_error(self.b, self.m, self.k, x_chunk,
+                                     v_chunk, x_reference, v_reference)
+                self.phase_error = errors[..., -1]
+                largest = np.max(np.abs(errors), axis=-1)
+                if self.max_phase_error is None:
+                    self.max_phase_error = largest
+                else:
+                    self.max_phase_error = np.maximum(self.max_phase_error,
+                                                      largest)
+        self.n_steps += length
+        return self
+
+    @property
+    def rms_error(self):
+        if self._squared_error is None:
+            return None
+        return np.sqrt(self._squared_error / self._n_compared)
+
+    @property
+    def energy_drift_rate(self):
+        if self.n_steps < 2:
+            return None
+        return self._co_moment / self._t_moment
@@ -0,0 +1,278 @@
+"""
+----------------------------------------------------------------
+Monte Carlo ensembles
+----------------------------------------------------------------
+
+Propagates uncertainty in b, m, k and the initial conditions through
+the numerical methods. Samples of the parameters are drawn in chunks,
+each chunk is simulated as one batch of systems by a vectorised method
+and the chunks are run across a process pool:
+
+    result = ensemble.run(n.verlet,
+                          dict(b=0.1, m=("normal", 1, 0.05),
+                               k=("uniform", 0.9, 1.1), x=1, v=0),
+                          t, h, n_samples=100000)
+    result.x.mean, result.x.std, result.energy.quantile(0.95)
+
+Only summaries of each chunk are sent back and merged, so however many
+samples are drawn no trajectory is kept: the running mean and variance
+of x(t) and energy(t) at each time, merged as by Chan et al., and a
+histogram at each time from which quantiles are read.
+
+The samples are drawn from independent streams spawned from one seed,
+one per chunk, so the results don't depend on the number of workers.
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import diagnostics
+
+PARAMETERS = ("b", "m", "k", "x", "v")
+
+
+def _sample(spec, generator, size):
+    """
+    Draw samples of a parameter: a number is fixed, and a tuple of the
+    name of a numpy Generator distribution and its arguments is drawn
+    from, e.g. ("normal", 1, 0.05).
+    """
+    if not isinstance(spec, tuple):
+        return np.full(size, float(spec))
+    name, *args = spec
+    return getattr(generator, name)(*args, size=size)
+
+
+def _bounds(samples):
+    """
+    The range of the histogram at each time: that of the samples with
+    half as much again either side.
+    """
+    lower = samples.min(axis=0)
+    upper = samples.max(axis=0)
+    margin = np.maximum(0.5 * (upper - lower),
+                        np.finfo(float).eps * np.maximum(np.abs(lower), 1))
+    return lower - margin, upper + margin
+
+
+class Summary():
+    """
+    Running statistics of a quantity at each time across an ensemble.
+
+    Params:
+
+        samples: an array with a row per sample and a column per time.
+
+        lower, upper: the range of the histogram at each time.
+
+    Kwargs:
+
+        n_bins: the number of bins in the histogram at each time.
+
+    Attributes:
+
+        count: the number of samples.
+
+        mean: the mean at each time.
+
+        variance, std: the sample variance and standard deviation at
+                       each time.
+
+    Samples outside the range of the histogram are counted in a bin
+    beyond each end, so quantiles falling there are clipped to it.
+    """
+    def __init__(self, samples, lower, upper, n_bins=256):
+        self.count = len(samples)
+        self.mean = samples.mean(axis=0)
+        self._m2 = np.sum((samples - self.mean) ** 2, axis=0)
+        self._lower = lower
+        self._width = (upper - lower) / n_bins
+        # Bin 0 and bin n_bins + 1 hold the samples beyond each end.
+        bins = np.floor((samples - lower) / self._width)
+        bins = np.clip(bins, -1, n_bins).astype(np.intp) + 1
+        n_times = samples.shape[1]
+        offsets = np.arange(n_times) * (n_bins + 2)
+        self._counts = np.bincount((bins + offsets).reshape(-1),
+                                   minlength=n_times * (n_bins + 2)
+                                   ).reshape(n_times, n_bins + 2)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def merge(self, other):
+        """
+        Add the samples summarised by another Summary with the same
+        histogram range.
+
+        Mathematical backing:
+
+            For counts n_a and n_b, with delta = mean_b - mean_a,
+
+            mean = mean_a + delta n_b / n
+
+            M2 = M2_a + M2_b + delta ^ 2 n_a n_b / n
+
+            where n = n_a + n_b and the variance is M2 / (n - 1).
+        """
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / total
+        self._m2 = (self._m2 + other._m2 +
+                    delta ** 2 * self.count * other.count / total)
+        self._counts = self._counts + other._counts
+        self.count = total
+        return self
+
+    def quantile(self, q):
+        """
+        Params:
+
+            q: a probability, or an array of them.
+
+        Returns:
+
+            the quantile at each time, interpolated linearly within the
+            bin it falls in, with an extra first axis if q is an array.
+        """
+        q = np.asarray(q, dtype=float)
+        n_bins = self._counts.shape[1] - 2
+        cumulative = np.cumsum(self._counts, axis=1)
+        target = q.reshape(q.shape + (1, 1)) * self.count
+        # The first bin reaching the target, at each time.
+        found = np.argmax(cumulative >= target, axis=-1)
+        before = np.take_along_axis(
+            np.broadcast_to(cumulative - self._counts,
+                            q.shape + cumulative.shape),
+            found[..., None], -1)[..., 0]
+        inside = np.take_along_axis(
+            np.broadcast_to(self._counts, q.shape + cumulative.shape),
+            found[..., None], -1)[..., 0]
+        fraction = (target[..., 0] - before) / np.maximum(inside, 1)
+        position = np.clip(found - 1 + np.clip(fraction, 0, 1), 0, n_bins)
+        return self._lower + position * self._width
+
+
+class Result():
+    """
+    The summaries of an ensemble.
+
+    Attributes:
+
+        t: the time series simulated.
+
+        x: the Summary of the displacement.
+
+        energy: the Summary of the energy.
+    """
+    def __init__(self, t, x, energy):
+        self.t = t
+        self.x = x
+        self.energy = energy
+
+    @property
+    def count(self):
+        return self.x.count
+
+
+def _simulate(method, parameters, seed, size, t, h, force, time):
+    """Draw a chunk of samples and simulate them as one batch."""
+    generator = np.random.default_rng(seed)
+    b, m, k, x, v = [_sample(parameters.get(name, 0.), generator, size)
+                     for name in PARAMETERS]
+    x_array, v_array = method(b, m, k, x, v, t, h, force=force, time=time)
+    return x_array, diagnostics.energy(k, x_array, m, v_array)
+
+
+def _chunk(method, parameters, seed, size, t, h, force, time, bounds,
+           n_bins):
+    """Simulate a chunk in a worker, returning only its summaries."""
+    x_array, energy_array = _simulate(method, parameters, seed, size, t, h,
+                                      force, time)
+    return (Summary(x_array, *bounds[0], n_bins=n_bins),
+            Summary(energy_array, *bounds[1], n_bins=n_bins))
+
+
+def run(method, parameters, t, h, n_samples, force=None, time=None,
+        chunk_size=1000, n_bins=256, seed=None, executor=None):
+    """
+    Simulate an ensemble of oscillators with uncertain parameters.
+
+    Params:
+
+        method: the method, such as n.verlet or n.propagate.
+
+        parameters: a dictionary of b, m, k, x and v, each a number or
+                    a tuple of the name of a numpy Generator
+                    distribution and its arguments, e.g.
+                    ("normal", 1, 0.05). Any left out are 0.
+
+        t: the time series across which to simulate each system.
+
+        h: the step size.
+
+        n_samples: the number of samples to draw.
+
+    Kwargs:
+
+        force, time: as for the method.
+
+        chunk_size: the number of samples simulated as one batch.
+
+        n_bins: the number of histogram bins at each time, which sets
+                the resolution of the quantiles.
+
+        seed: seeds the samples, for repeatable results.
+
+        executor: the process pool to run on. If None, one is created
+                  for the call.
+
+    The mean and variance are exact, but the quantiles are approximate:
+    they are read from histograms whose range at each time is set by
+    the first chunk, with half as much again either side. Samples from
+    later chunks beyond that range are counted at its edges, so
+    quantiles far in the tails are clipped to them and biased towards
+    the middle. A larger chunk_size gives a wider range.
+
+    Returns:
+
+        a Result, with the Summary of x and of the energy over t.
+    """
+    if n_samples < 1:
+        raise(ValueError("n_samples must be at least 1, not %r."
+                         % n_samples))
+    for name in parameters:
+        if name not in PARAMETERS:
+            raise(ValueError("Unknown parameter %r. Choose from %r."
+                             % (name, PARAMETERS)))
+    sizes = [min(chunk_size, n_samples - start)
+             for start in range(0, n_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    # The first chunk is run here, to set the range of the histograms.
+    x_array, energy_array = _simulate(method, parameters, seeds[0],
+                                      sizes[0], t, h, force, time)
+    bounds = (_bounds(x_array), _bounds(energy_array))
+    x = Summary(x_array, *bounds[0], n_bins=n_bins)
+    energy = Summary(energy_array, *bounds[1], n_bins=n_bins)
+    del x_array, energy_array
+
+    if len(sizes) > 1:
+        pool = ProcessPoolExecutor() if executor is None else executor
+        try:
+            futures = [pool.submit(_chunk, method, parameters, chunk_seed,
+                                   size, t, h, force, time, bounds, n_bins)
+                       for chunk_seed, size in zip(seeds[1:], sizes[1:])]
+            for future in futures:
+                x_chunk, energy_chunk = future.result()
+                x.merge(x_chunk)
+                energy.merge(energy_chunk)
+        finally:
+            if executor is None:
+                pool.shutdown()
+    return Result(np.asarray(t), x, energy)
@@ -0,0 +1,80 @@
+"""
+----------------------------------------------------------------
+Level of detail
+----------------------------------------------------------------
+
+Downsampling of long series for plotting. A line drawn across w pixels
+can't show more than a few points per pixel, so sending it more only
+slows the drawing down. minmax keeps the smallest and largest value in
+each pixel's worth of samples, so that no peak is lost and the line
+looks the same as drawn.
+
+The points kept are points of the original series, so the full series
+can be kept as it is and saved at full resolution with save().
+
+"""
+import numpy as np
+
+
+def minmax(t, y, n_buckets):
+    """
+    Params:
+
+        t: the times, in increasing order.
+
+        y: the values.
+
+        n_buckets: the number of buckets, typically the width of the
+                   plot in pixels.
+
+    Returns:
+
+        the times and values of the first and last points and of the
+        minimum and maximum in each bucket, in order. At most
+        2 * n_buckets + 2 points.
+    """
+    t = np.asarray(t)
+    y = np.asarray(y)
+    n_buckets = max(int(n_buckets), 1)
+    if len(y) <= 2 * n_buckets + 2:
+        return t, y
+
+    size = len(y) // n_buckets
+    whole = size * n_buckets
+    buckets = y[:whole].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.argmin(buckets, axis=1)
+    highs = offsets + np.argmax(buckets, axis=1)
+    # The samples left over are added to the last bucket.
+    if whole < len(y):
+        rest = y[whole:]
+        lows[-1] = min(lows[-1], whole + np.argmin(rest),
+                       key=lambda i: y[i])
+        highs[-1] = max(highs[-1], whole + np.argmax(rest),
+                        key=lambda i: y[i])
+
+    indices = np.unique(np.concatenate(([0], lows, highs, [len(y) - 1])))
+    return t[indices], y[indices]
+
+
+def save(filename, results, names):
+    """
+    Params:
+
+        filename: the .npz file to save to.
+
+        results: a dictionary of the full resolution (t, x, energy)
+                 arrays of each line, by name.
+
+        names: the names of the lines to save.
+
+    Saves the arrays of each named line as name_t, name_x and
+    name_energy.
+    """
+    arrays = {}
+    for name in names:
+        t, x_array, energy_array = results[name]
+        arrays[name + "_t"] = t
+        arrays[name + "_x"] = x_array
+        arrays[name + "_energy"] = energy_array
+    np.savez(filename, **arrays)
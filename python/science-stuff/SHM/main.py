@@ -2,7 +2,10 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.text import Annotation
 from matplotlib.widgets import Slider, CheckButtons, TextBox
+import blitting
+import lod
 import numerical as n
+import recompute
 # n.exact(b, m, k, x, v, t, h)
 # n.euler(b, m, k, x, v, t, h)
 # n.imp_euler(b, m, k, x, v, t, h)
@@ -29,12 +32,24 @@ func_dict = dict(line1=n.exact,
                  line4=n.verlet,
                  line5=n.euler_cromer)
 
+# Milliseconds to wait for the sliders to settle before recomputing,
+# and between checks for finished results.
+DEBOUNCE_INTERVAL = 150
+POLL_INTERVAL = 50
+
+# Where the full resolution results of the shown lines are saved.
+EXPORT_FILE = "shm_export.npz"
+
+# Results of each line, cached by their parameters.
+compute = recompute.cached(func_dict, ax_length)
+
+
 # Initialise lines for the graph.
-y1 = n.exact(b0, m0, k0, x0, v0, t, h0)[0]
-y2 = n.euler(b0, m0, k0, x0, v0, t, h0)[0]
-y3 = n.imp_euler(b0, m0, k0, x0, v0, t, h0)[0]
-y4 = n.verlet(b0, m0, k0, x0, v0, t, h0)[0]
-y5 = n.euler_cromer(b0, m0, k0, x0, v0, t, h0)[0]
+y1 = compute("line1", b0, m0, k0, h0, x0, v0, 0, 0)[1]
+y2 = compute("line2", b0, m0, k0, h0, x0, v0, 0, 0)[1]
+y3 = compute("line3", b0, m0, k0, h0, x0, v0, 0, 0)[1]
+y4 = compute("line4", b0, m0, k0, h0, x0, v0, 0, 0)[1]
+y5 = compute("line5", b0, m0, k0, h0, x0, v0, 0, 0)[1]
 
 fig, axx = plt.subplots()
 
@@ -96,19 +111,19 @@ def set_critical_labels(ax, k, m):
     Label the axis for the damping level with arrows to indicate the
     half critical, critical and twice critical damping levels.
     """
-    cr_label = Annotation(s=r"$b_{cr}$", xy=(2 * np.sqrt(k * m), 0),
+    cr_label = Annotation(r"$b_{cr}$", xy=(2 * np.sqrt(k * m), 0),
                           xytext=(2 * np.sqrt(k * m), - 2),
                           arrowprops=dict(arrowstyle='->'))
     ax.add_artist(cr_label)
 
     # Half-critical level.
-    cr_label05 = Annotation(s=r"$b_{cr}$", xy=(np.sqrt(k * m), 0),
+    cr_label05 = Annotation(r"$b_{cr}$", xy=(np.sqrt(k * m), 0),
                             xytext=(np.sqrt(k * m), - 2),
                             arrowprops=dict(arrowstyle='->'))
     ax.add_artist(cr_label05)
 
     # Twice critical level.
-    cr_label2 = Annotation(s=r"$b_{cr}$", xy=(4 * np.sqrt(k * m), 0),
+    cr_label2 = Annotation(r"$b_{cr}$", xy=(4 * np.sqrt(k * m), 0),
                            xytext=(4 * np.sqrt(k * m), - 2),
                            arrowprops=dict(arrowstyle='->'),
                            annotation_clip=False)
@@ -136,20 +151,11 @@ plt.xlabel("Time")
 plt.ylabel("n.energy")
 
 
-e1 = n.energy(k0, n.exact(b0, m0, k0, x0, v0, t, h0)[0], m0,
-              n.exact(b0, m0, k0, x0, v0, t, h0)[1])
-
-e2 = n.energy(k0, n.euler(b0, m0, k0, x0, v0, t, h0, 0, 0)[0], m0,
-              n.euler(b0, m0, k0, x0, v0, t, h0, 0, 0)[1])
-
-e3 = n.energy(k0, n.imp_euler(b0, m0, k0, x0, v0, t, h0, 0, 0)[0], m0,
-              n.imp_euler(b0, m0, k0, x0, v0, t, h0, 0, 0)[1])
-
-e4 = n.energy(k0, n.verlet(b0, m0, k0, x0, v0, t, h0, 0, 0)[0], m0,
-              n.verlet(b0, m0, k0, x0, v0, t, h0, 0, 0)[1])
-
-e5 = n.energy(k0, n.euler_cromer(b0, m0, k0, x0, v0, t, h0, 0, 0)[0], m0,
-              n.euler_cromer(b0, m0, k0, x0, v0, t, h0, 0, 0)[1])
+e1 = compute("line1", b0, m0, k0, h0, x0, v0, 0, 0)[2]
+e2 = compute("line2", b0, m0, k0, h0, x0, v0, 0, 0)[2]
+e3 = compute("line3", b0, m0, k0, h0, x0, v0, 0, 0)[2]
+e4 = compute("line4", b0, m0, k0, h0, x0, v0, 0, 0)[2]
+e5 = compute("line5", b0, m0, k0, h0, x0, v0, 0, 0)[2]
 
 n.energy1, = plt.plot(t, e1)
 n.energy2, = plt.plot(t, e2)
@@ -171,54 +177,96 @@ for en in energys:
 fig2.legend()
 
 
-# Master update function for updating the plotted graphs.
-def update(val):
-        m = mslider.val
-        k = kslider.val
-        h = hslider.val
-        b = bslider.val
-        x = xslider.val
-        t = np.arange(1, ax_length, h)
-        v = vslider.val
-        try:            # Check force and time are valid numbers.
-                force = float(force_box.text)
-                time = float(time_box.text)
-        except:
-                force = 0
-                time = 0
-
-        # This can be improved aesthetically by, for example, creating a
-        # dictionary of relevent functions corresponding to each line,
-        # then iterating across the lines calling each function.
-        #
-        # Potentially a TODO although any performance benefits would be
-        # negligible.
+# The full resolution results last drawn for each line, kept for
+# export since only a few points per pixel are plotted, and the damping
+# levels last marked.
+shown = dict(results={name: compute(name, b0, m0, k0, h0, x0, v0, 0, 0)
+                      for name in func_dict},
+             critical=(m0, k0))
 
-        for line in lines:
-            func = func_dict[line.__string__name__]
-            line.set_ydata(func(b, m, k, x, v, t, h, force=force,
-                                time=time)[0])
-            line.set_xdata(t)
-            energy = energys[lines.index(line)]
-            energy.set_ydata(n.energy(k, func(b, m, k, x, v, t, h, force=force,
-                                              time=time)[0], m,
-                                      func(b, m, k, x, v, t, h, force=force,
-                                           time=time)[1]))
-            energy.set_xdata(t)
+# The lines are drawn by blitting over a background of each figure
+# without them, saved on each full draw.
+blitters = {fig: blitting.Blitter(fig.canvas, lines),
+            fig2: blitting.Blitter(fig2.canvas, energys)}
 
-        # Refresh position of critical damping markers.
-        for child in b_ax.get_children():
-                if isinstance(child, Annotation):
-                        child.remove()
 
-        set_critical_labels(b_ax, k, m)
+def parameters():
+    """The current parameters from the sliders and text boxes."""
+    try:            # Check force and time are valid numbers.
+            force = float(force_box.text)
+            time = float(time_box.text)
+    except:
+            force = 0
+            time = 0
+    return (bslider.val, mslider.val, kslider.val, hslider.val,
+            xslider.val, vslider.val, force, time)
+
+
+def request():
+        # Hidden lines are left until they are shown again.
+        names = [line.__string__name__ for line in lines
+                 if line.get_visible()]
+        return parameters(), names
+
+
+def downsample(ax, t, y_array):
+        # Two points per pixel across the axes, however small h is.
+        return lod.minmax(t, y_array, ax.bbox.width)
+
+
+def draw(params, results):
+        m, k = params[1:3]
+        shown["results"].update(results)
+        for line in lines:
+            if line.__string__name__ not in results:
+                continue
+            t, x_array, energy_array = results[line.__string__name__]
+            energy = energys[lines.index(line)]
+            line.set_data(*downsample(line.axes, t, x_array))
+            energy.set_data(*downsample(energy.axes, t, energy_array))
 
         # TODO Implement some way of displaying the chi squared between
         # the exact value and the numerical solutions.
 
-        # Refresh both plots
-        fig.canvas.draw_idle()
-        fig2.canvas.draw_idle()
+        if (m, k) != shown["critical"]:
+                # Refresh position of critical damping markers, which
+                # needs the whole figure redrawn.
+                for child in b_ax.get_children():
+                        if isinstance(child, Annotation):
+                                child.remove()
+
+                set_critical_labels(b_ax, k, m)
+                shown["critical"] = (m, k)
+                fig.canvas.draw_idle()
+        else:
+                blitters[fig].blit()
+        blitters[fig2].blit()
+
+
+def export(event):
+        # Save the full resolution results of the visible lines.
+        if event.key != "e":
+                return
+        names = [line.__string__name__ for line in lines
+                 if line.get_visible()]
+        lod.save(EXPORT_FILE, shown["results"], names)
+
+
+# The methods are run on a background thread once the sliders settle,
+# so that dragging a slider isn't held up by them. Matplotlib must only
+# be used from the main thread, so the results are drawn from the poll
+# timer rather than by the worker.
+debounce_timer = fig.canvas.new_timer(interval=DEBOUNCE_INTERVAL)
+debounce_timer.single_shot = True
+poll_timer = fig.canvas.new_timer(interval=POLL_INTERVAL)
+recomputer = recompute.Recomputer(compute, request, draw, debounce_timer,
+                                  poll_timer)
+update = recomputer.update
+fig.canvas.mpl_connect("key_press_event", export)
+fig2.canvas.mpl_connect("key_press_event", export)
+
+# Plot the initial lines downsampled, as every later draw is.
+draw((b0, m0, k0, h0, x0, v0, 0, 0), shown["results"])
 
 
 # TODO Tidy the following: lots of repetition
@@ -232,6 +280,8 @@ def click(label):
                         en.set_visible(not en.get_visible())
         fig.canvas.draw_idle()
         fig2.canvas.draw_idle()
+        # Lines shown again need results for the current parameters.
+        update(label)
 
 
 # Update plots on interaction
@@ -244,6 +294,6 @@ xslider.on_changed(update)
 vslider.on_changed(update)
 force_box.on_submit(update)
 time_box.on_submit(update)
-fig.canvas.set_window_title("Approximations for SHM")
-fig2.canvas.set_window_title("n.energy")
+fig.canvas.manager.set_window_title("Approximations for SHM")
+fig2.canvas.manager.set_window_title("n.energy")
 plt.show()
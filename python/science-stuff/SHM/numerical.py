@@ -7,17 +7,464 @@ Toby James - March 2018
 A selection of numerical methods for the solution of linear differential
 equations.
 
+The numerical methods simulate many oscillators at once. Any of b, m,
+k, x and v may be arrays, which are broadcast together to give one
+system per element, and every system is advanced in a single
+vectorised update per step.
+
 """
 # ma = - bv - kx + F(t)
 
 import numpy as np
-from cmath import sqrt
+from scipy import signal
+from itertools import repeat
+import diagnostics
+
+
+def _systems(*params):
+    """
+    Broadcast the parameters of the systems together.
+
+    Returns:
+
+        a list of 1-D float arrays, one per parameter, and whether all
+        the parameters were scalars.
+    """
+    scalar = all(np.ndim(param) == 0 for param in params)
+    arrays = np.broadcast_arrays(*[np.asarray(param, dtype=float)
+                                   for param in params])
+    return [array.reshape(-1) for array in arrays], scalar
+
+
+class _Oscillator():
+    """
+    Independent damped harmonic oscillators, one per element of b, m
+    and k. This is the model the integrators step: any object with the
+    same methods can be integrated in the same way.
+    """
+    def __init__(self, b, m, k):
+        self.b = b
+        self.m = m
+        self.k = k
+        self._damping = -b / m
+        self._stiffness = k / m
+        self._verlet = {}
+        self._decay = {}
+
+    def acceleration(self, x, v):
+        """The acceleration with no external force."""
+        return self._damping * v - self._stiffness * x
+
+    def spring(self, x):
+        """The acceleration due to the springs alone."""
+        return -self._stiffness * x
+
+    def damp(self, v, tau):
+        """The velocity after damping alone acts for a time tau."""
+        if tau not in self._decay:
+            self._decay[tau] = np.exp(self._damping * tau)
+        return self._decay[tau] * v
+
+    def drive(self, forces):
+        """
+        The acceleration due to the force at each step, with a row per
+        step.
+        """
+        return forces.reshape(len(forces), -1) / self.m
+
+    def verlet_step(self, x, x_old, h):
+        """The next displacement by Verlet's method, with no force."""
+        if h not in self._verlet:
+            D = 2 * self.m + self.b * h
+            self._verlet[h] = (2 * (2 * self.m - self.k * h ** 2) / D,
+                               (self.b * h - 2 * self.m) / D)
+        A, B = self._verlet[h]
+        return A * x + B * x_old
+
+
+def _force_schedule(force, time, t, h, start=0):
+    """
+    The force applied over each step of the simulation.
+
+    Params:
+
+        force: None; an impulse, or an array of impulses, if time is
+               given; an array of the force at each time in t; or a
+               function returning the force at each time in an array.
+
+        time: the time, or array of times, of the impulses, measured
+              from the first step.
+
+        start: the index of the step at t[0], for a schedule of part
+               of a simulation.
+
+    Returns:
+
+        None if there is no force. Otherwise an array whose nth row is
+        the force applied while stepping from t[n] to t[n + 1].
+
+        An impulse is applied over every step ending within h of its
+        time.
+    """
+    if force is None:
+        return None
+    if callable(force):
+        forces = np.asarray(force(np.asarray(t, dtype=float)), dtype=float)
+        # A constant force may be returned as a scalar.
+        return forces if forces.ndim else np.full(len(t), float(forces))
+    if time is None:
+        if np.ndim(force) == 0:
+            return None
+        return np.asarray(force, dtype=float)
+
+    force, time = np.broadcast_arrays(np.atleast_1d(force),
+                                      np.atleast_1d(time))
+    n = np.arange(start + 1, start + len(t) + 1)
+    windows = ((n * h - h < time[:, None]) &
+               (time[:, None] < n * h + h))
+    return (force[:, None] * windows).sum(axis=0)
+
+
+def _centred_schedule(force, time, t, h, start=0):
+    """
+    As _force_schedule, but with a force given as a function or samples
+    taken at the middle of each step rather than the start.
+    """
+    if callable(force):
+        return _force_schedule(force, time,
+                               np.asarray(t, dtype=float) + h / 2, h, start)
+    forces = _force_schedule(force, time, t, h, start)
+    if forces is not None and time is None:
+        forces = np.concatenate(((forces[:-1] + forces[1:]) / 2,
+                                 forces[-1:]))
+    return forces
+
+
+def _stage_schedule(force, time, t, h, offsets, start=0):
+    """
+    As _force_schedule, but with the force at each stage of the steps
+    of a higher order method.
+
+    Params:
+
+        offsets: the times of the stages within a step, as fractions of
+                 h from its start.
+
+    Returns:
+
+        None if there is no force. Otherwise an array whose nth row
+        holds the force at each stage of the step from t[n] to
+        t[n + 1]. A function is evaluated at the time of each stage and
+        samples are interpolated linearly to it, while an impulse is
+        held over every stage of the steps it is applied over.
+    """
+    offsets = np.asarray(offsets, dtype=float)
+    if callable(force):
+        times = np.asarray(t, dtype=float)[:, None] + offsets * h
+        forces = _force_schedule(force, time, times.reshape(-1), h, start)
+        return forces.reshape(times.shape + forces.shape[1:])
+    forces = _force_schedule(force, time, t, h, start)
+    if forces is None:
+        return None
+    if time is not None:
+        return np.repeat(forces[:, None], len(offsets), axis=1)
+    # The last sample is held over the last step.
+    following = np.concatenate((forces[1:], forces[-1:]))
+    offsets = offsets.reshape((1, -1) + (1,) * (forces.ndim - 1))
+    return (forces[:, None] +
+            offsets * (following - forces)[:, None])
+
+
+def _drive(model, force, time, t, h, offsets=None, start=0):
+    """
+    The acceleration due to the force over each step, from
+    model.drive(), or None if there is no force.
+
+    If offsets are given, as for _stage_schedule, each row holds the
+    acceleration at each stage of the step instead.
+    """
+    if offsets is None:
+        forces = _force_schedule(force, time, t, h, start)
+        return None if forces is None else model.drive(forces)
+    forces = _stage_schedule(force, time, t, h, offsets, start)
+    if forces is None:
+        return None
+    n_steps, n_stages = forces.shape[:2]
+    return model.drive(forces.reshape((-1,) + forces.shape[2:])).reshape(
+        n_steps, n_stages, -1)
+
+
+def _integrate(step, model, state, n_steps, h, drive, start=1):
+    """
+    Run an integrator into preallocated arrays.
+
+    Params:
+
+        step: the integrator's step, step(model, state, h, a), returning
+              the next state. a is the acceleration due to the force
+              over the step, or at each of its stages, or None if there
+              is none.
+
+        model: the system being integrated, such as _Oscillator.
+
+        state: the state at step start - 1, a tuple beginning with the
+               displacement and velocity.
+
+        n_steps: the number of steps to store.
+
+        h: the step size.
+
+        drive: the acceleration due to the force over each step, from
+               _drive(), or None.
+
+    Kwargs:
+
+        start: the first step to compute. Earlier steps are left for
+               the caller to fill in.
+
+    Returns:
+
+        the displacement and velocity arrays, of shape
+        (len(state[0]), n_steps).
+    """
+    x_array = np.empty((len(state[0]), n_steps))
+    v_array = np.empty((len(state[0]), n_steps))
+    if n_steps < start:
+        return x_array, v_array
+    x_array[:, start - 1] = state[0]
+    v_array[:, start - 1] = state[1]
+    drives = repeat(None) if drive is None else drive[start - 1:]
+    for i, a in zip(range(start, n_steps), drives):
+        state = step(model, state, h, a)
+        x_array[:, i] = state[0]
+        v_array[:, i] = state[1]
+    return x_array, v_array
+
+
+def _setup(b, m, k, x, v, force, time, t, h, offsets=None):
+    """
+    The model, initial state and force schedule for an integrator, and
+    whether the parameters were all scalars.
+
+    offsets are the times of the stages of the higher order methods,
+    as for _stage_schedule.
+    """
+    (b, m, k, x, v), scalar = _systems(b, m, k, x, v)
+    model = _Oscillator(b, m, k)
+    drive = _drive(model, force, time, t, h, offsets)
+    return model, (x, v), drive, scalar
+
+
+def _result(x_array, v_array, scalar):
+    """Drop the systems axis if there is a single scalar system."""
+    if scalar:
+        return [x_array[0], v_array[0]]
+    return [x_array, v_array]
+
+
+def _euler_step(model, state, h, a):
+    x, v = state
+    acceleration = model.acceleration(x, v)
+    if a is not None:
+        acceleration = acceleration + a
+    v = v + h * acceleration
+    x = x + h * v
+    return x, v
+
+
+def _imp_euler_step(model, state, h, a):
+    x, v = state
+    acceleration = model.acceleration(x, v)
+    if a is not None:
+        acceleration = acceleration + a
+    v = v + h * acceleration
+    x = x + (h * v + (h ** 2) * acceleration / 2)
+    return x, v
+
+
+def _verlet_step(model, state, h, a):
+    x, _, x_old = state
+    x_ = model.verlet_step(x, x_old, h)
+    if a is not None:
+        x_ = x_ + a * h ** 2
+    return x_, (x_ - x) / (2 * h), x
+
+
+def _euler_cromer_step(model, state, h, a):
+    x, v = state
+    dv = model.acceleration(x, v) * h
+    if a is not None:
+        dv = dv + a * h
+    v = v + dv
+    x = x + v * h
+    return x, v
+
+
+# The stages of a Runge-Kutta step are at its start, middle and end.
+_RK4_OFFSETS = (0, 0.5, 1)
+
+
+def _rk4_step(model, state, h, a):
+    x, v = state
+
+    def derivative(x, v, stage):
+        acceleration = model.acceleration(x, v)
+        if a is not None:
+            acceleration = acceleration + a[stage]
+        return v, acceleration
+
+    dx1, dv1 = derivative(x, v, 0)
+    dx2, dv2 = derivative(x + h / 2 * dx1, v + h / 2 * dv1, 1)
+    dx3, dv3 = derivative(x + h / 2 * dx2, v + h / 2 * dv2, 1)
+    dx4, dv4 = derivative(x + h * dx3, v + h * dv3, 2)
+    return (x + h / 6 * (dx1 + 2 * dx2 + 2 * dx3 + dx4),
+            v + h / 6 * (dv1 + 2 * dv2 + 2 * dv3 + dv4))
+
+
+def _composition(weights):
+    """
+    The sequence of kicks, drifts and damping making up a composition
+    of velocity Verlet steps of the given fractions of h. Consecutive
+    operations of the same kind are merged, so the kick ending one
+    Verlet step also starts the next.
+    """
+    sequence = []
+    for w in weights:
+        for operation, fraction in (("kick", w / 2), ("damp", w / 2),
+                                    ("drift", w), ("damp", w / 2),
+                                    ("kick", w / 2)):
+            if sequence and sequence[-1][0] == operation:
+                sequence[-1] = (operation, sequence[-1][1] + fraction)
+            else:
+                sequence.append((operation, fraction))
+    return sequence
+
+
+def _composition_step(weights):
+    """
+    The step function for a composition of velocity Verlet steps, and
+    the times of its kicks as fractions of h, at which the force is
+    taken. The time moves on with each drift.
+    """
+    sequence = _composition(weights)
+    offsets = []
+    position = 0.
+    for operation, fraction in sequence:
+        if operation == "kick":
+            offsets.append(position)
+        elif operation == "drift":
+            position += fraction
+
+    def step(model, state, h, a):
+        x, v = state
+        kick = 0
+        for operation, fraction in sequence:
+            if operation == "kick":
+                acceleration = model.spring(x)
+                if a is not None:
+                    acceleration = acceleration + a[kick]
+                kick += 1
+                v = v + fraction * h * acceleration
+            elif operation == "drift":
+                x = x + fraction * h * v
+            else:
+                v = model.damp(v, fraction * h)
+        return x, v
+    return step, tuple(offsets)
+
+
+def _triple_jump(weights, order):
+    """
+    Yoshida's triple jump: raise the order of a symmetric composition
+    of the given order by two.
+    """
+    w1 = 1 / (2 - 2 ** (1 / (order + 1)))
+    w0 = 1 - 2 * w1
+    return ([w1 * w for w in weights] + [w0 * w for w in weights] +
+            [w1 * w for w in weights])
+
+
+_velocity_verlet_step, _VELOCITY_VERLET_OFFSETS = _composition_step([1])
+_yoshida4_step, _YOSHIDA4_OFFSETS = _composition_step(_triple_jump([1], 2))
+_yoshida6_step, _YOSHIDA6_OFFSETS = _composition_step(
+    _triple_jump(_triple_jump([1], 2), 4))
+
+
+class ExactSolution():
+    """
+    The exact solution for damped oscillators, evaluated at whatever
+    times are asked for.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+    Any of these may be arrays, as for the numerical methods.
+
+    Mathematical backing:
+
+        x = exp(-gamma t) ((C + gamma S) x_0 + S v_0)
+
+        v = exp(-gamma t) ((C - gamma S) v_0 - k S x_0)
+                                               m
+        gamma = b
+                2 m
+
+        where C and S are cos(omega t) and sin(omega t) / omega when
+        under damped, cosh(mu t) and sinh(mu t) / mu when over damped,
+        and 1 and t when critically damped, with
+
+        omega ^ 2 = - mu ^ 2 = k - b ^ 2
+                               m   4 m ^ 2
+
+        Only real arithmetic is used, and the exponential envelope is
+        shared between x and v.
+    """
+    def __init__(self, b, m, k, x, v):
+        (b, m, k, x, v), self._scalar = _systems(b, m, k, x, v)
+        gamma, disc = _decay(b, m, k)
+        self._gamma = gamma[:, None]
+        self._disc = disc[:, None]
+        self._stiffness = (k / m)[:, None]
+        self._x = x[:, None]
+        self._v = v[:, None]
+
+    def __call__(self, t):
+        """
+        Params:
+
+            t: a time, or an array of times, since the start.
+
+        Returns:
+
+            a tuple of the displacement and the velocity at each time,
+            with an extra first axis for the systems unless every
+            parameter is a scalar.
+        """
+        t = np.asarray(t, dtype=float)
+        C, S = _envelope_terms(self._gamma, self._disc, t.reshape(1, -1))
+        x_out = C * self._x + S * (self._v + self._gamma * self._x)
+        v_out = C * self._v - S * (self._stiffness * self._x +
+                                   self._gamma * self._v)
+        if self._scalar:
+            return [x_out[0].reshape(t.shape), v_out[0].reshape(t.shape)]
+        shape = (len(x_out),) + t.shape
+        return [x_out.reshape(shape), v_out.reshape(shape)]
 
 
 # Exact solution:
 def exact(b, m, k, x, v, t, *args, **kwargs):
     """
-    Return the exact solution, where it exists.
+    Return the exact solution.
 
     Params:
 
@@ -36,30 +483,14 @@ def exact(b, m, k, x, v, t, *args, **kwargs):
 
     Mathematical backing:
 
-        x = A exp((i * omega - gamma) *t)
-                                 2
-        gamma = b
-                m
-
-        omega ^ 2 = k - b ^ 2
-                    m   4 m ^ 2
+        see ExactSolution, which evaluates the solution at any times
+        without a time series being given up front.
 
     Returns:
 
         a tuple of the displacement array and the velocity array.
     """
-    gamma = b/m
-    omega = sqrt(k/m - (b ** 2/(4 * m ** 2)))
-    A = 1/(2 * omega) * (v + x * gamma/2) + x / 2
-    B = x - A
-    x_out = (A * np.exp((omega * 1j - gamma / 2) * t) +
-             B * np.exp((-omega * 1j - gamma / 2) * t))
-    v_out = ((omega * 1j - gamma / 2) * A * np.exp((omega * 1j -
-                                                    gamma / 2) * t) +
-             (-omega * 1j - gamma / 2) * B * np.exp((-omega * 1j -
-                                                     gamma / 2) * t))
-
-    return [x_out, v_out]
+    return ExactSolution(b, m, k, x, v)(t)
 
 
 # Euler's method:
@@ -86,9 +517,13 @@ def euler(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Kwargs:
 
-        force: a force to be applied to the oscillator.
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each.
 
-        time: the time at which the force should be applied.
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
 
     Mathematical backing:
         Euler's method is iterative and follows the following recurrence
@@ -103,21 +538,14 @@ def euler(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Returns:
 
-        a tuple of the displacement array and the velocity array.
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
     """
-    x_array = [x]
-    v_array = [v]
-    while len(x_array) != len(t):
-            a = -b/m * v - k/m * x
-            if force is not None and time is not None and \
-               len(x_array) * h - h < time < len(x_array) * h + h:
-
-                a += force / m
-            v += h * a
-            x += h * v
-            x_array.append(x)
-            v_array.append(v)
-    return [x_array, v_array]
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h)
+    x_array, v_array = _integrate(_euler_step, model, state, len(t), h,
+                                  drive)
+    return _result(x_array, v_array, scalar)
 
 
 # Improved Euler:
@@ -144,9 +572,13 @@ def imp_euler(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Kwargs:
 
-        force: a force to be applied to the oscillator.
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each.
 
-        time: the time at which the force should be applied.
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
 
     Mathematical backing:
         The improved Euler method is iterative and follows the following
@@ -161,23 +593,14 @@ def imp_euler(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
                               2
     Returns:
 
-        a tuple of the displacement array and the velocity array.
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
     """
-    x_array = [x]
-    v_array = [v]
-    while len(x_array) != len(t):
-            a = -b/m * v - k/m * x
-            if force is not None and time is not None and \
-               len(x_array) * h - h < time < len(x_array) * h + h:
-
-                a += force/m
-
-            v += h * a
-            x += h * v + (h ** 2) * a/2
-            v_array.append(v)
-            x_array.append(x)
-
-    return [x_array, v_array]
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h)
+    x_array, v_array = _integrate(_imp_euler_step, model, state, len(t), h,
+                                  drive)
+    return _result(x_array, v_array, scalar)
 
 
 # Verlet:
@@ -204,9 +627,13 @@ def verlet(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Kwargs:
 
-        force: a force to be applied to the oscillator.
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each.
 
-        time: the time at which the force should be applied.
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
 
     Mathematical backing:
         Verlet's method is iterative and follows the following
@@ -224,35 +651,18 @@ def verlet(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Returns:
 
-        a tuple of the displacement array and the velocity array.
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
     """
-    x_array = [x]
-    v_array = [v]
-    a = 0
-
-    D = 2 * m + b * h
-    A = 2 * (2 * m - k * h ** 2) / D
-    B = (b * h - 2 * m) / D
-    _x = x
-    x += v * h
-    x_array.append(x)
-    v_array.append(v)
-    while len(x_array) != len(t):
-
-            if force is not None and time is not None and \
-               len(x_array) * h - h < time < len(x_array) * h + h:
-
-                a += force/m
-
-            x_ = A * x + B * _x + a * h ** 2
-            a = 0
-            _x = x
-            x = x_
-            x_array.append(x)
-            v = (x_ - _x)/(2 * h)
-            v_array.append(v)
-
-    return [x_array, v_array]
+    model, (x, v), drive, scalar = _setup(b, m, k, x, v, force, time, t,
+                                          h)
+    # The first step is a plain Euler step, without the force.
+    x_array, v_array = _integrate(_verlet_step, model, (x + v * h, v, x),
+                                  len(t), h, drive, start=2)
+    x_array[:, :1] = x[:, None]
+    v_array[:, :1] = v[:, None]
+    return _result(x_array, v_array, scalar)
 
 
 # Euler-Cromer method:
@@ -279,9 +689,13 @@ def euler_cromer(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Kwargs:
 
-        force: a force to be applied to the oscillator.
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each.
 
-        time: the time at which the force should be applied.
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
 
     Mathematical backing:
         The Euler-Cromer method is iterative and follows the following
@@ -294,26 +708,990 @@ def euler_cromer(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
 
     Returns:
 
-        a tuple of the displacement array and the velocity array.
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h)
+    x_array, v_array = _integrate(_euler_cromer_step, model, state, len(t),
+                                  h, drive)
+    return _result(x_array, v_array, scalar)
+
+
+# Runge-Kutta method:
+def rk4(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
+    """
+    The classical fourth order Runge-Kutta method for solving linear
+    differential equations.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+        t: the time series across which to simulate the system.
+
+        h: the step size with which the values are calculated.
+
+    Kwargs:
+
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each. A function is
+               evaluated at the time of each stage of a step, and
+               samples are interpolated linearly to it.
+
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
+
+    Mathematical backing:
+        The Runge-Kutta method averages four estimates of the
+        derivative of y = (x, v) across each step:
+
+        k_1 = f(y_n)
+
+        k_2 = f(y_n + h k_1)
+                      2
+
+        k_3 = f(y_n + h k_2)
+                      2
+
+        k_4 = f(y_n + h k_3)
+
+        y_n+1 = y_n + h (k_1 + 2 k_2 + 2 k_3 + k_4)
+                      6
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h,
+                                         offsets=_RK4_OFFSETS)
+    x_array, v_array = _integrate(_rk4_step, model, state, len(t), h,
+                                  drive)
+    return _result(x_array, v_array, scalar)
+
+
+# Velocity Verlet:
+def velocity_verlet(b, m, k, x, v, t, h, force=None, time=None, *args,
+                    **kwargs):
+    """
+    The velocity Verlet method for solving linear differential
+    equations. Unlike verlet, the velocities are found at each step
+    rather than estimated from the displacements.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+        t: the time series across which to simulate the system.
+
+        h: the step size with which the values are calculated.
+
+    Kwargs:
+
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each. A function is
+               evaluated at the time of each stage of a step, and
+               samples are interpolated linearly to it.
+
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
+
+    Mathematical backing:
+        Each step is split into a kick by the spring, damping, a drift
+        at constant velocity, then damping and a kick again:
+
+        v_n+1/2 = exp(-b h / 2 m) (v_n - k h x_n / 2 m)
+
+        x_n+1 = x_n + h v_n+1/2
+
+        v_n+1 = exp(-b h / 2 m) v_n+1/2 - k h x_n+1 / 2 m
+
+        The damping is solved exactly, so the step is symmetric in
+        time and without damping it conserves a modified energy.
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h,
+                                         offsets=_VELOCITY_VERLET_OFFSETS)
+    x_array, v_array = _integrate(_velocity_verlet_step, model, state,
+                                  len(t), h, drive)
+    return _result(x_array, v_array, scalar)
+
+
+# Yoshida fourth order method:
+def yoshida4(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
+    """
+    Yoshida's fourth order symplectic method for solving linear
+    differential equations.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+        t: the time series across which to simulate the system.
+
+        h: the step size with which the values are calculated.
+
+    Kwargs:
+
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each. A function is
+               evaluated at the time of each stage of a step, and
+               samples are interpolated linearly to it.
+
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
+
+    Mathematical backing:
+        Each step is made of three velocity Verlet steps of sizes
+        w_1 h, w_0 h and w_1 h, where
+
+        w_1 =     1          w_0 = 1 - 2 w_1
+              2 - 2 ^ 1/3
+
+        The errors of the second order steps cancel to leave a fourth
+        order method, which keeps the energy bounded over long runs
+        when undamped.
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h,
+                                         offsets=_YOSHIDA4_OFFSETS)
+    x_array, v_array = _integrate(_yoshida4_step, model, state, len(t), h,
+                                  drive)
+    return _result(x_array, v_array, scalar)
+
+
+# Yoshida sixth order method:
+def yoshida6(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
+    """
+    Yoshida's sixth order symplectic method for solving linear
+    differential equations.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+        t: the time series across which to simulate the system.
+
+        h: the step size with which the values are calculated.
+
+    Kwargs:
+
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each. A function is
+               evaluated at the time of each stage of a step, and
+               samples are interpolated linearly to it.
+
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
+
+    Mathematical backing:
+        Each step is made of three yoshida4 steps of sizes z_1 h,
+        z_0 h and z_1 h, where
+
+        z_1 =     1          z_0 = 1 - 2 z_1
+              2 - 2 ^ 1/5
+
+        giving nine velocity Verlet steps, of which the kicks between
+        neighbouring steps are combined.
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    model, state, drive, scalar = _setup(b, m, k, x, v, force, time, t, h,
+                                         offsets=_YOSHIDA6_OFFSETS)
+    x_array, v_array = _integrate(_yoshida6_step, model, state, len(t), h,
+                                  drive)
+    return _result(x_array, v_array, scalar)
+
+
+# Dormand-Prince coefficients, with the dense output coefficients of
+# Shampine (1986) as used by scipy's RK45.
+_DOPRI_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+_DOPRI_A = np.array([
+    [0, 0, 0, 0, 0],
+    [1/5, 0, 0, 0, 0],
+    [3/40, 9/40, 0, 0, 0],
+    [44/45, -56/15, 32/9, 0, 0],
+    [19372/6561, -25360/2187, 64448/6561, -212/729, 0],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]])
+_DOPRI_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+_DOPRI_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200,
+                     -22/525, 1/40])
+_DOPRI_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608,
+     -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933,
+     87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304,
+     -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408,
+     701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+
+def _force_function(force, time, t):
+    """
+    The force as a function of time, for integrators which choose their
+    own steps.
+
+    Params:
+
+        as for _force_schedule.
+
+    Returns:
+
+        the force as a function of an absolute time, or None if there
+        is none, and a list of (time, impulse) pairs with the times
+        measured from t[0].
+    """
+    if force is None:
+        return None, []
+    if callable(force):
+        return force, []
+    if time is None:
+        if np.ndim(force) == 0:
+            return None, []
+        forces = np.asarray(force, dtype=float)
+        if len(t) < 2:
+            return (lambda s: forces[0]), []
+
+        def sampled(s):
+            # Linear interpolation between the samples.
+            i = np.clip(np.searchsorted(t, s, side="right") - 1, 0,
+                        len(t) - 2)
+            w = (s - t[i]) / (t[i + 1] - t[i])
+            return forces[i] * (1 - w) + forces[i + 1] * w
+        return sampled, []
+
+    force, time = np.broadcast_arrays(np.atleast_1d(force),
+                                      np.atleast_1d(time))
+    return None, sorted(zip(time.tolist(), force.tolist()))
+
+
+# Dormand-Prince method:
+def dopri(b, m, k, x, v, t, h, force=None, time=None, rtol=1e-6, atol=1e-9,
+          full_output=False, *args, **kwargs):
     """
-    x_array = [x]
-    v_array = [v]
-    a = 0
-    while len(x_array) != len(t):
-            if force is not None and time is not None and \
-               len(x_array) * h - h < time < len(x_array) * h + h:
+    The Dormand-Prince 5(4) method, with adaptive step size, for
+    solving linear differential equations.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
 
-                a += force/m
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
 
-            v += (-b / m * v - k / m * x) * h + a * h
-            a = 0
-            x += v * h
-            v_array.append(v)
-            x_array.append(x)
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+        t: the time series across which to simulate the system. It
+           need not be evenly spaced, but must be increasing.
+
+        h: the size of the first step. The method chooses the size of
+           each step after that.
+
+    Kwargs:
+
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t, interpolated between them; or
+               a function of time returning the force.
+
+        time: the time, or times, at which impulses are applied,
+              measured from t[0]. Each changes the velocity at once by
+              force * h / m, with h the first step size given. The
+              fixed step methods instead apply the force over each
+              step ending within h of the time, of which there may be
+              one or two, so may change the velocity by twice as much.
+
+        rtol, atol: the relative and absolute tolerances on the local
+                    error of each step.
+
+        full_output: if True, also returns a dictionary of the number
+                     of accepted and rejected steps and of evaluations
+                     of the acceleration.
+
+    Mathematical backing:
+        Each step takes seven evaluations of the acceleration, the
+        last of which is reused by the next step, giving a fifth order
+        solution and an embedded fourth order one. Their difference
+        estimates the local error. A step is accepted if the error,
+        scaled by atol + rtol * |y|, has a root mean square of at most
+        one for every system, and the next step size is
 
+            h_n+1 = h_n * 0.9 * error ^ (-1 / 5)
+
+        limited to between a fifth and ten times h_n. The solution is
+        interpolated onto t between the steps with a fourth order
+        polynomial.
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    (b, m, k, x, v), scalar = _systems(b, m, k, x, v)
+    model = _Oscillator(b, m, k)
+    t = np.asarray(t, dtype=float)
+    force_function, impulses = _force_function(force, time, t)
+    x_array = np.empty((len(x), len(t)))
+    v_array = np.empty((len(x), len(t)))
+    counts = dict(steps=0, rejected=0, evaluations=0)
+    nominal = h
+
+    def derivative(s, y):
+        counts["evaluations"] += 1
+        a = model.acceleration(y[0], y[1])
+        if force_function is not None:
+            a = a + force_function(s) / model.m
+        return np.stack((y[1], a))
+
+    if len(t):
+        x_array[:, 0] = x
+        v_array[:, 0] = v
+        s = t[0]
+        y = np.stack((x, v))
+        K = np.empty((7,) + y.shape)
+        K[0] = derivative(s, y)
+        j = 1  # The next point of t to fill in.
+        stops = [(t[0] + kick, f) for kick, f in impulses
+                 if 0 <= kick < t[-1] - t[0]] + [(t[-1], None)]
+        for stop, impulse in stops:
+            while s < stop:
+                step = min(h, stop - s)
+                for i in range(1, 6):
+                    K[i] = derivative(
+                        s + _DOPRI_C[i] * step,
+                        y + step * np.tensordot(_DOPRI_A[i, :i], K[:i], 1))
+                y_new = y + step * np.tensordot(_DOPRI_B, K[:6], 1)
+                K[6] = derivative(s + step, y_new)
+                scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+                error = step * np.tensordot(_DOPRI_E, K, 1) / scale
+                norm = np.max(np.sqrt(np.mean(error ** 2, axis=0)))
+
+                if norm <= 1:
+                    counts["steps"] += 1
+                    end = stop if step == stop - s else s + step
+                    n = np.searchsorted(t, end, side="right")
+                    if n > j:
+                        theta = (t[j:n] - s) / step
+                        powers = np.cumprod(np.repeat(theta[:, None], 4, 1),
+                                            axis=1)
+                        Q = np.tensordot(K, _DOPRI_P, (0, 0))
+                        dense = y[..., None] + step * np.tensordot(
+                            Q, powers, (-1, 1))
+                        x_array[:, j:n] = dense[0]
+                        v_array[:, j:n] = dense[1]
+                        j = n
+                    s = end
+                    y = y_new
+                    K[0] = K[6]
+                    factor = 10 if norm == 0 else min(10, 0.9 * norm ** -0.2)
+                else:
+                    counts["rejected"] += 1
+                    factor = max(0.2, 0.9 * norm ** -0.2)
+                h = step * factor
+                if h < 10 * np.spacing(s):
+                    raise(RuntimeError("Step size became too small at time"
+                                       " %r." % s))
+
+            if impulse is not None:
+                y[1] = y[1] + impulse * nominal / model.m
+                K[0] = derivative(s, y)
+
+    result = _result(x_array, v_array, scalar)
+    if full_output:
+        result.append(counts)
+    return result
+
+
+def _under_damped(gamma, disc, tau):
+    envelope = np.exp(-gamma * tau)
+    omega = np.sqrt(disc)
+    # sin(omega tau) / omega, without dividing by zero near critical
+    # damping.
+    return (envelope * np.cos(omega * tau),
+            envelope * tau * np.sinc(omega * tau / np.pi))
+
+
+def _critically_damped(gamma, disc, tau):
+    envelope = np.exp(-gamma * tau)
+    return envelope, envelope * tau
+
+
+def _over_damped(gamma, disc, tau):
+    mu = np.sqrt(-disc)
+    # Written in terms of the slower decay so as not to overflow.
+    slow = np.exp((mu - gamma) * tau)
+    fast = np.expm1(-2 * mu * tau)  # exp(-2 mu tau) - 1
+    return slow * (2 + fast) / 2, -slow * fast / (2 * mu)
+
+
+def _envelope_terms(gamma, disc, tau):
+    """
+    The decaying terms of the exact solution, split by regime.
+
+    Params:
+
+        gamma: the decay rate of the envelope, b / 2 m, with a row per
+               system.
+
+        disc: the discriminant, k / m - gamma ^ 2, whose sign sets the
+              regime of each system.
+
+        tau: the times since the start, broadcast against gamma.
+
+    Returns:
+
+        the arrays exp(-gamma tau) C and exp(-gamma tau) S, where C and
+        S are cos(omega tau) and sin(omega tau) / omega when under
+        damped, cosh(mu tau) and sinh(mu tau) / mu when over damped, and
+        1 and tau when critically damped.
+    """
+    gamma = np.asarray(gamma, dtype=float)
+    disc = np.asarray(disc, dtype=float)
+    tau = np.asarray(tau, dtype=float)
+    shape = np.broadcast_shapes(gamma.shape, disc.shape, tau.shape)
+    C = np.empty(shape)
+    S = np.empty(shape)
+    regimes = disc.reshape(len(disc), -1)[:, 0]
+    per_system = tau.ndim == len(shape) and len(tau) == len(regimes)
+    for systems, terms in ((regimes > 0, _under_damped),
+                           (regimes == 0, _critically_damped),
+                           (regimes < 0, _over_damped)):
+        if systems.any():
+            C[systems], S[systems] = terms(
+                gamma[systems], disc[systems],
+                tau[systems] if per_system else tau)
+    return C, S
+
+
+def _decay(b, m, k):
+    """The envelope's decay rate and the discriminant of each system."""
+    gamma = b / (2 * m)
+    return gamma, k / m - gamma ** 2
+
+
+def _transition(b, m, k, tau):
+    """
+    The state transition matrices, of shape (n_systems, 2, 2), taking
+    (x, v) forward by a time tau.
+    """
+    gamma, disc = _decay(b, m, k)
+    C, S = _envelope_terms(gamma, disc, tau)
+    return np.stack((np.stack((C + gamma * S, S), axis=-1),
+                     np.stack((-k / m * S, C - gamma * S), axis=-1)),
+                    axis=-2)
+
+
+def _step_response(b, m, k, matrix, h):
+    """
+    The change in (x, v) over a step of size h due to a unit force held
+    over the step, given the step's transition matrices.
+    """
+    S = matrix[:, 0, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (1 - matrix[:, 1, 1] - b / m * S) / k
+    # With no spring, integrate the velocity's response directly.
+    free = k == 0
+    if free.any():
+        z = b[free] / m[free] * h
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(z < 1e-3, 1 - z / 3 + z ** 2 / 12,
+                             2 * (z + np.expm1(-z)) / z ** 2)
+        x[free] = h ** 2 / (2 * m[free]) * ratio
+    return np.stack((x, S / m), axis=-1)
+
+
+def _trajectory(matrix, state, n_steps):
+    """
+    The states matrix ^ n @ state for n up to n_steps, as an array of
+    shape (n_systems, 2, n_steps). The array is filled by doubling, so
+    it takes log2(n_steps) vectorised products.
+    """
+    states = np.empty(state.shape + (n_steps,))
+    if not n_steps:
+        return states
+    states[..., 0] = state
+    power = matrix
+    filled = 1
+    while filled < n_steps:
+        count = min(filled, n_steps - filled)
+        states[..., filled:filled + count] = np.einsum(
+            "nij,njt->nit", power, states[..., :count])
+        filled += count
+        power = power @ power
+    return states
+
+
+# Exact state transition:
+def transition_matrix(b, m, k, h):
+    """
+    The exact state transition matrix of a damped oscillator.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        h: the time step.
+
+    Mathematical backing:
+        The oscillator is linear, so the state y = (x, v) after a time
+        h is y(h) = Phi y(0), where
+
+        Phi = exp(-gamma h) [C + gamma S       S     ]
+                            [  - k S / m   C - gamma S]
+
+        gamma = b / 2 m, and C and S are cos(omega h) and
+        sin(omega h) / omega when under damped, cosh(mu h) and
+        sinh(mu h) / mu when over damped, and 1 and h when critically
+        damped, where omega ^ 2 = -mu ^ 2 = k / m - gamma ^ 2.
+
+    Returns:
+
+        the matrix, of shape (n_systems, 2, 2), or (2, 2) if every
+        parameter is a scalar.
+    """
+    (b, m, k), scalar = _systems(b, m, k)
+    matrix = _transition(b, m, k, h)
+    return matrix[0] if scalar else matrix
+
+
+def jump(b, m, k, x, v, h, n):
+    """
+    Jump straight to the state after n steps of size h.
+
+    Params:
+
+        b, m, k, x, v: as for propagate.
+
+        h: the step size.
+
+        n: the number of steps, a non-negative integer.
+
+    Mathematical backing:
+        The state after n steps is Phi ^ n y(0). The power is found by
+        repeated squaring, taking about 2 log2(n) matrix products, so
+        even distant times are reached at once and without the
+        rounding errors of stepping there.
+
+    Returns:
+
+        a tuple of the displacement and the velocity after n steps.
+    """
+    (b, m, k, x, v), scalar = _systems(b, m, k, x, v)
+    power = np.linalg.matrix_power(_transition(b, m, k, h), int(n))
+    state = np.einsum("nij,nj->ni", power, np.stack((x, v), axis=-1))
+    if scalar:
+        return [state[0, 0], state[0, 1]]
+    return [state[:, 0], state[:, 1]]
+
+
+def propagate(b, m, k, x, v, t, h, force=None, time=None, *args, **kwargs):
+    """
+    The exact solution on an evenly spaced time series, found by
+    propagating the state from step to step.
+
+    Params:
+
+        b: the damping coefficient of the system,
+           where damping force = b * v.
+
+        m: the mass of the osciallator.
+
+        k: the spring constant of the oscillator.
+
+        x: the initial displacement of the oscillator.
+
+        v: the initial velocity of the oscillator.
+
+        t: the time series across which to simulate the system.
+
+        h: the spacing of t.
+
+    Kwargs:
+
+        force: the force applied to the oscillator: an impulse, or an
+               array of impulses, applied at time; an array of the
+               force at each time in t; or a function of an array of
+               times returning the force at each. The force is held
+               at its value at the middle of each step.
+
+        time: the time, or times, at which impulses are applied,
+              measured from the first step.
+
+    Mathematical backing:
+        With the force u_n held over each step,
+
+        y_n+1 = Phi y_n + Gamma u_n
+
+        Gamma = A ^ -1 (Phi - I) [ 0 ]     A = [  0     1  ]
+                                 [1/m]         [-k/m  -b/m]
+
+        where Phi is the transition_matrix. The unforced states
+        Phi ^ n y_0 are built by doubling, using log2(len(t)) matrix
+        products in all, and the response to the force,
+
+        sum(Phi ^ (n - 1 - j) Gamma u_j) over j < n,
+
+        is a convolution computed with FFTs. The result is exact, to
+        rounding, for a force constant over each step.
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (n_systems, len(t)), or of length len(t) if every
+        parameter is a scalar.
+    """
+    (b, m, k, x, v), scalar = _systems(b, m, k, x, v)
+    forces = _centred_schedule(force, time, t, h)
+    matrix = _transition(b, m, k, h)
+    states = _trajectory(matrix, np.stack((x, v), axis=-1), len(t))
+
+    if forces is not None and len(t) > 1:
+        forces = np.broadcast_to(forces.reshape(len(t), -1), (len(t), len(x)))
+        response = _trajectory(matrix, _step_response(b, m, k, matrix, h),
+                               len(t) - 1)
+        states[..., 1:] += signal.fftconvolve(
+            response, forces[:-1].T[:, None, :], axes=-1)[..., :len(t) - 1]
+
+    return _result(states[:, 0], states[:, 1], scalar)
+
+
+def _verlet_first_step(model, state, h, a):
+    # Verlet's method needs two displacements, so starts with an Euler
+    # step without the force.
+    x, v = state
+    return x + v * h, v, x
+
+
+# The step function of each fixed step method, the times of the stages
+# at which it takes the force, if it takes it more than once a step,
+# and any special first step.
+_STEPS = {euler: (_euler_step, None, None),
+          imp_euler: (_imp_euler_step, None, None),
+          verlet: (_verlet_step, None, _verlet_first_step),
+          euler_cromer: (_euler_cromer_step, None, None),
+          rk4: (_rk4_step, _RK4_OFFSETS, None),
+          velocity_verlet: (_velocity_verlet_step, _VELOCITY_VERLET_OFFSETS,
+                            None),
+          yoshida4: (_yoshida4_step, _YOSHIDA4_OFFSETS, None),
+          yoshida6: (_yoshida6_step, _YOSHIDA6_OFFSETS, None)}
+
+
+def _fixed_step(method):
+    """The entry of _STEPS for a method, checking that it has one."""
+    if method not in _STEPS:
+        raise(ValueError("%r is not a fixed step method. Choose from %r."
+                         % (getattr(method, "__name__", method),
+                            [f.__name__ for f in _STEPS])))
+    return _STEPS[method]
+
+
+def simulate(method, model, x, v, t, h, force=None, time=None):
+    """
+    Simulate any linear system with one of the fixed step methods.
+
+    Params:
+
+        method: the fixed step method, such as verlet or rk4.
+
+        model: the system, with the methods of _Oscillator:
+               acceleration(x, v), drive(forces), spring(x),
+               damp(v, tau) and verlet_step(x, x_old, h). See the
+               coupled module.
+
+        x: the initial displacement of each degree of freedom.
+
+        v: the initial velocity of each degree of freedom.
+
+        t: the time series across which to simulate the system.
+
+        h: the step size with which the values are calculated.
+
+    Kwargs:
+
+        force, time: as for the method, with the force given to
+                     model.drive().
+
+    Returns:
+
+        a tuple of the displacement array and the velocity array, each
+        of shape (len(x), len(t)).
+    """
+    step, offsets, first_step = _fixed_step(method)
+    drive = _drive(model, force, time, t, h, offsets)
+    x = np.asarray(x, dtype=float)
+    v = np.asarray(v, dtype=float)
+    if first_step is None:
+        return list(_integrate(step, model, (x, v), len(t), h, drive))
+    x_array, v_array = _integrate(step, model, first_step(model, (x, v), h,
+                                                          None),
+                                  len(t), h, drive, start=2)
+    x_array[:, :1] = x[:, None]
+    v_array[:, :1] = v[:, None]
     return [x_array, v_array]
 
 
+# Streaming:
+class Stream():
+    """
+    A simulation by one of the fixed step methods, run in chunks so
+    that its memory use doesn't grow with its length.
+
+    Iterating over a Stream yields a tuple (t, x, v) for each chunk,
+    holding every every-th step. The arrays are reused for the next
+    chunk, so copy them to keep them. Running reductions over every
+    step, not only those kept, are updated as each chunk is made:
+
+        energy:         the energy at the last step so far.
+
+        energy_min,
+        energy_max:     the extremes of the energy.
+
+        x_min, x_max:   the extremes of the displacement.
+
+        zero_crossings: the number of times the displacement has
+                        changed sign.
+
+    Each is an array with an element per system, or a scalar if every
+    parameter is a scalar.
+
+    Params:
+
+        method: the fixed step method, such as verlet or rk4.
+
+        b, m, k, x, v: as for the method.
+
+        n_steps: the number of steps to simulate, including the
+                 initial state.
+
+        h: the step size.
+
+    Kwargs:
+
+        force, time: as for the method. A force given as samples must
+                     have one for each step, and may itself be a
+                     memory-mapped array.
+
+        t0: the time of the first step, at which a force given as a
+            function is first evaluated.
+
+        every: keep every every-th step, starting from the first.
+
+        chunk_size: the number of steps simulated at a time.
+
+        output: if given, the name of a .npy file to write the kept
+                steps to as they are made, as an array of shape
+                (2, n_systems, n_kept) holding x then v, or
+                (2, n_kept) if every parameter is a scalar. The file
+                is memory-mapped, so isn't held in memory.
+    """
+    def __init__(self, method, b, m, k, x, v, n_steps, h, force=None,
+                 time=None, t0=0., every=1, chunk_size=65536, output=None):
+        self._step, self._offsets, self._first_step = _fixed_step(method)
+        (b, m, k, x, v), self._scalar = _systems(b, m, k, x, v)
+        self._model = _Oscillator(b, m, k)
+        self._initial = (x, v)
+        self._n_steps = int(n_steps)
+        self._h = h
+        self._force = force
+        self._time = time
+        self._t0 = t0
+        self._every = int(every)
+        self._chunk_size = int(chunk_size)
+        self._output = output
+
+        self._energy = np.full(len(x), np.nan)
+        self._energy_min = np.full(len(x), np.inf)
+        self._energy_max = np.full(len(x), -np.inf)
+        self._x_min = np.full(len(x), np.inf)
+        self._x_max = np.full(len(x), -np.inf)
+        self._zero_crossings = np.zeros(len(x), dtype=int)
+
+    def _reduced(self, array):
+        return array[0] if self._scalar else array
+
+    @property
+    def energy(self):
+        return self._reduced(self._energy)
+
+    @property
+    def energy_min(self):
+        return self._reduced(self._energy_min)
+
+    @property
+    def energy_max(self):
+        return self._reduced(self._energy_max)
+
+    @property
+    def x_min(self):
+        return self._reduced(self._x_min)
+
+    @property
+    def x_max(self):
+        return self._reduced(self._x_max)
+
+    @property
+    def zero_crossings(self):
+        return self._reduced(self._zero_crossings)
+
+    def _drive(self, start, length):
+        """The acceleration due to the force over the steps of a chunk."""
+        force = self._force
+        if force is not None and not callable(force) and \
+                self._time is None and np.ndim(force):
+            # Samples, with one more to interpolate to the stages of
+            # the last step.
+            force = force[start:start + length + 1]
+        t = self._t0 + self._h * np.arange(start, start + length + 1)
+        drive = _drive(self._model, force, self._time, t, self._h,
+                       self._offsets, start)
+        if drive is None:
+            return repeat(None)
+        return iter(drive[:length])
+
+    def _reduce(self, x_chunk, v_chunk, x_last):
+        """Update the running reductions with a chunk of every step."""
+        energy = diagnostics.energy(self._model.k, x_chunk, self._model.m,
+                                    v_chunk)
+        self._energy = energy[:, -1]
+        np.minimum(self._energy_min, energy.min(axis=1), out=self._energy_min)
+        np.maximum(self._energy_max, energy.max(axis=1), out=self._energy_max)
+        np.minimum(self._x_min, x_chunk.min(axis=1), out=self._x_min)
+        np.maximum(self._x_max, x_chunk.max(axis=1), out=self._x_max)
+        negative = x_chunk < 0
+        self._zero_crossings += (negative[:, 1:] != negative[:, :-1]).sum(1)
+        if x_last is not None:
+            self._zero_crossings += (x_last < 0) != negative[:, 0]
+
+    def __iter__(self):
+        n_systems = len(self._initial[0])
+        n_kept = -(-self._n_steps // self._every)
+        output = None
+        if self._output is not None:
+            shape = ((2, n_kept) if self._scalar else
+                     (2, n_systems, n_kept))
+            output = np.lib.format.open_memmap(self._output, mode="w+",
+                                               dtype=float, shape=shape)
+
+        x_buffer = np.empty((n_systems, min(self._chunk_size,
+                                            self._n_steps)))
+        v_buffer = np.empty_like(x_buffer)
+        state = self._initial
+        step = self._first_step or self._step
+        x_last = None
+        kept = 0
+        for start in range(0, self._n_steps, self._chunk_size):
+            length = min(self._chunk_size, self._n_steps - start)
+            drives = self._drive(start, length)
+            x_chunk = x_buffer[:, :length]
+            v_chunk = v_buffer[:, :length]
+            x_chunk[:, 0] = state[0]
+            v_chunk[:, 0] = state[1]
+            for i in range(1, length):
+                state = step(self._model, state, self._h, next(drives))
+                step = self._step
+                x_chunk[:, i] = state[0]
+                v_chunk[:, i] = state[1]
+            if start + length < self._n_steps:
+                # Step into the next chunk.
+                state = step(self._model, state, self._h, next(drives))
+                step = self._step
+
+            self._reduce(x_chunk, v_chunk, x_last)
+            x_last = x_chunk[:, -1].copy()
+
+            first = -start % self._every
+            t = self._t0 + self._h * np.arange(start + first, start + length,
+                                               self._every)
+            x_kept = x_chunk[:, first::self._every]
+            v_kept = v_chunk[:, first::self._every]
+            if output is not None:
+                output[0, ..., kept:kept + len(t)] = self._reduced(x_kept)
+                output[1, ..., kept:kept + len(t)] = self._reduced(v_kept)
+                output.flush()
+            kept += len(t)
+            yield t, self._reduced(x_kept), self._reduced(v_kept)
+
+    def run(self):
+        """Run the whole simulation, for its reductions and output."""
+        for _ in self:
+            pass
+        return self
+
+
 # Chi Squared:
 def chi_sq(y_array, model_array):
     """
@@ -329,10 +1707,10 @@ def chi_sq(y_array, model_array):
     Returns:
 
         the sum of the squares of the differences between y_array and
-        y_model.
+        y_model, for each system if given a row per system. See
+        diagnostics for other measures of error.
     """
-    return sum([((np.absolute((y - model)) ** 2) / model) for y, model in
-                zip(y_array, model_array)])
+    return diagnostics.chi_sq(y_array, model_array)
 
 
 # Energy stored in the system:
@@ -369,8 +1747,9 @@ def energy(k, x_array, m, v_array):
 
     Returns:
 
-        the energy array of the system, as it evolves with time.
+        the energy array of the system, as it evolves with time, with
+        a row per system if given one. k and m may have an element per
+        system.
 
     """
-    return np.array([0.5 * k * np.real(x) ** 2 + 0.5 * m *
-                    np.real(v) ** 2 for x, v, in zip(x_array, v_array)])
+    return diagnostics.energy(k, x_array, m, v_array)
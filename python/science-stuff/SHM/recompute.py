@@ -0,0 +1,132 @@
+"""
+----------------------------------------------------------------
+Recomputation for the viewer
+----------------------------------------------------------------
+
+Keeps the viewer responsive while its sliders are dragged. The results
+of each method are cached by their parameters, and are recomputed on a
+background thread only once the sliders have settled:
+
+    compute = recompute.cached(func_dict, ax_length)
+    recomputer = recompute.Recomputer(compute, request, draw,
+                                      debounce_timer, poll_timer)
+    slider.on_changed(recomputer.update)
+
+Nothing here depends on the GUI. The timers are anything with start(),
+stop() and add_callback(), such as those made by a matplotlib canvas's
+new_timer(), so the logic can be tested without one.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+import diagnostics
+
+
+def cached(methods, ax_length, maxsize=128):
+    """
+    Params:
+
+        methods: a dictionary of the method of each line, by name.
+
+        ax_length: the end of the time series, which runs from 1 in
+                   steps of h.
+
+    Kwargs:
+
+        maxsize: the number of results to keep.
+
+    Returns:
+
+        a function compute(name, b, m, k, h, x, v, force, time) which
+        runs the method for a line, returning the time series, the
+        displacement and the energy. The most recently used results
+        are cached, so returning to earlier parameters or showing a
+        hidden line again doesn't recompute them.
+    """
+    @lru_cache(maxsize=maxsize)
+    def compute(name, b, m, k, h, x, v, force, time):
+        t = np.arange(1, ax_length, h)
+        x_array, v_array = methods[name](b, m, k, x, v, t, h, force=force,
+                                         time=time)
+        return t, x_array, diagnostics.energy(k, x_array, m, v_array)
+    return compute
+
+
+class Recomputer():
+    """
+    Recomputes the lines of the viewer on a background thread once its
+    parameters stop changing, drawing only the latest results.
+
+    Params:
+
+        compute: a function of the name of a line and the parameters,
+                 returning its results, such as from cached().
+
+        request: a function returning the current parameters, as a
+                 tuple, and the names of the lines to compute.
+
+        draw: a function of the parameters and a dictionary of the
+              results of each line, by name. It is called from
+              poll(), so from the GUI's thread.
+
+        debounce_timer: a single shot timer, whose interval is how
+                        long to wait for the parameters to settle.
+
+        poll_timer: a repeating timer, whose interval is how often to
+                    check for finished results.
+
+    Kwargs:
+
+        executor: the executor to compute on. If None, a single
+                  worker thread is used.
+
+    Attributes:
+
+        future: the future of the latest computation, until it is
+                drawn.
+
+        params: the parameters it was started with.
+    """
+    def __init__(self, compute, request, draw, debounce_timer, poll_timer,
+                 executor=None):
+        self._compute = compute
+        self._request = request
+        self._draw = draw
+        self._debounce_timer = debounce_timer
+        self._poll_timer = poll_timer
+        self._executor = (ThreadPoolExecutor(max_workers=1)
+                          if executor is None else executor)
+        self.future = None
+        self.params = None
+        debounce_timer.add_callback(self.recompute)
+        poll_timer.add_callback(self.poll)
+
+    def compute_all(self, params, names):
+        """The results of each of the named lines."""
+        return {name: self._compute(name, *params) for name in names}
+
+    def update(self, *args):
+        """Restart the wait for the parameters to settle."""
+        self._debounce_timer.stop()
+        self._debounce_timer.start()
+
+    def recompute(self):
+        """Start computing the lines for the current parameters."""
+        params, names = self._request()
+        if self.future is not None:
+            # Superseded, so skip it if it hasn't started. If it has,
+            # its results are dropped.
+            self.future.cancel()
+        self.future = self._executor.submit(self.compute_all, params, names)
+        self.params = params
+        self._poll_timer.start()
+
+    def poll(self):
+        """Draw the latest results, if they are ready."""
+        future = self.future
+        if future is None or not future.done():
+            return
+        self._poll_timer.stop()
+        self.future = None
+        self._draw(self.params, future.result())
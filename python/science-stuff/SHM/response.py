@@ -0,0 +1,169 @@
+"""
+----------------------------------------------------------------
+Frequency response
+----------------------------------------------------------------
+
+The steady state response of a damped oscillator to a sinusoidal
+force, F cos(omega t), over many driving frequencies at once.
+
+For the linear model it is known exactly, and analytic() evaluates it
+over any number of frequencies in one vectorised pass. spectral()
+instead estimates it from the Fourier transform of a single simulated
+impulse response, so a resonance curve doesn't need one long
+simulation for each frequency, and shows how a numerical method
+distorts it.
+
+Both give the amplitude of the response per unit force and its phase
+lag behind the force, with the frequencies as the last axis and a
+first axis for the systems if any parameter is an array.
+
+"""
+import numpy as np
+
+
+def _per_system(param):
+    """A parameter shaped to broadcast against the frequencies."""
+    param = np.asarray(param, dtype=float)
+    return param.reshape(param.shape + (1,))
+
+
+def transfer(b, m, k, omega):
+    """
+    Params:
+
+        b, m, k: the oscillator, as for the numerical methods.
+
+        omega: the angular frequency, or an array of them.
+
+    Mathematical backing:
+
+        Driven by F exp(i omega t), the steady state is
+        x = H F exp(i omega t) with
+
+            H = 1 / (k - m omega ^ 2 + i b omega)
+
+    Returns:
+
+        the complex transfer function H at each frequency.
+    """
+    omega = np.asarray(omega, dtype=float)
+    b, m, k = np.broadcast_arrays(_per_system(b), _per_system(m),
+                                  _per_system(k))
+    return 1 / (k - m * omega ** 2 + 1j * b * omega)
+
+
+def _amplitude_phase(H, scalar):
+    amplitude = np.abs(H)
+    phase = -np.angle(H)
+    if scalar:
+        return [amplitude[0], phase[0]]
+    return [amplitude, phase]
+
+
+def analytic(b, m, k, omega):
+    """
+    The exact frequency response.
+
+    Params:
+
+        b, m, k: the oscillator, as for the numerical methods.
+
+        omega: the array of driving angular frequencies.
+
+    Mathematical backing:
+
+        amplitude = 1 / sqrt((k - m omega ^ 2) ^ 2 + (b omega) ^ 2)
+
+        phase = arctan2(b omega, k - m omega ^ 2)
+
+        The phase runs from 0, far below resonance, through pi / 2 at
+        omega ^ 2 = k / m to pi far above it.
+
+    Returns:
+
+        a tuple of the amplitude per unit force and the phase lag at
+        each frequency.
+    """
+    scalar = all(np.ndim(param) == 0 for param in (b, m, k))
+    H = transfer(np.reshape(b, -1), np.reshape(m, -1), np.reshape(k, -1),
+                 omega)
+    return _amplitude_phase(H, scalar)
+
+
+def resonance(b, m, k):
+    """
+    Params:
+
+        b, m, k: the oscillator, as for the numerical methods.
+
+    Mathematical backing:
+
+        The amplitude peaks where its denominator is least, at
+
+            omega_r ^ 2 = k - b ^ 2
+                          m   2 m ^ 2
+
+        There is no peak above zero frequency if this is negative.
+
+    Returns:
+
+        a tuple of the resonant angular frequency and the amplitude
+        there, or nan for systems with no resonance.
+    """
+    b, m, k = [np.asarray(param, dtype=float) for param in (b, m, k)]
+    square = k / m - b ** 2 / (2 * m ** 2)
+    omega = np.sqrt(np.where(square > 0, square, np.nan))
+    # At the peak the denominator is b^2 (k/m - b^2 / (4 m^2)).
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amplitude = 1 / (b * np.sqrt(k / m - b ** 2 / (4 * m ** 2)))
+    return [omega, np.where(square > 0, amplitude, np.nan)]
+
+
+def spectral(method, b, m, k, h, n_steps, n_fft=None):
+    """
+    Estimate the frequency response from a simulated impulse response.
+
+    Params:
+
+        method: the method, such as n.verlet or n.rk4.
+
+        b, m, k: the oscillator, as for the methods.
+
+        h: the step size.
+
+        n_steps: the number of steps simulated. The response should
+                 have decayed by the end, or the estimate will show
+                 ripples from cutting it off.
+
+    Kwargs:
+
+        n_fft: the length of the Fourier transform, padding the
+               response with zeros to sample the frequencies more
+               finely. By default n_steps.
+
+    Mathematical backing:
+
+        A unit impulse at t = 0 starts the oscillator from x = 0 with
+        v = 1 / m, and the transfer function is the Fourier transform
+        of the motion which follows,
+
+            H(omega) = integral x(t) exp(-i omega t) dt
+
+        approximated by h times the discrete Fourier transform of x.
+        The frequencies run from zero up to the Nyquist frequency,
+        pi / h.
+
+    Returns:
+
+        a tuple of the angular frequencies, the amplitude per unit
+        force and the phase lag at each.
+    """
+    scalar = all(np.ndim(param) == 0 for param in (b, m, k))
+    b, m, k = [np.reshape(np.asarray(param, dtype=float), -1)
+               for param in (b, m, k)]
+    t = h * np.arange(n_steps)
+    x_array, _ = method(b, m, k, 0., 1 / m, t, h)
+    n_fft = n_steps if n_fft is None else n_fft
+    H = h * np.fft.rfft(x_array, n_fft, axis=-1)
+    omega = 2 * np.pi * np.fft.rfftfreq(n_fft, h)
+    return [omega] + _amplitude_phase(H, scalar)
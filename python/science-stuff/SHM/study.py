@@ -0,0 +1,230 @@
+"""
+----------------------------------------------------------------
+Convergence and cost of the numerical methods
+----------------------------------------------------------------
+
+Runs each method over a logarithmic grid of step sizes, measuring the
+error of each run against the exact solution and the time it took.
+The runs are shared out across a process pool.
+
+From the results, the empirical order of each method is the slope of
+log(error) against log(h), and the Pareto front is the set of runs for
+which no other run was both faster and more accurate: the cheapest
+method for a given accuracy is on it.
+
+Run from this directory as:
+
+    python study.py --b 0.2 --duration 20 --output study.json
+
+dopri chooses its own steps, so h only sets its first one, and it is
+left out unless asked for.
+
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import diagnostics
+import numerical as n
+
+METHODS = dict(euler=n.euler,
+               imp_euler=n.imp_euler,
+               verlet=n.verlet,
+               euler_cromer=n.euler_cromer,
+               rk4=n.rk4,
+               velocity_verlet=n.velocity_verlet,
+               yoshida4=n.yoshida4,
+               yoshida6=n.yoshida6,
+               propagate=n.propagate,
+               dopri=n.dopri)
+
+DEFAULT_METHODS = [name for name in METHODS if name != "dopri"]
+
+# Errors below this are taken to be round-off, and left out of the fit
+# of each method's order.
+ROUND_OFF = 1e-11
+
+
+def _errors(x_array, v_array, x_exact, v_exact):
+    """The error norms of one run against the exact solution."""
+    return dict(rms=float(diagnostics.rms_error(x_array, x_exact)),
+                max=float(diagnostics.max_error(x_array, x_exact)),
+                final=float(np.hypot(x_array[-1] - x_exact[-1],
+                                     v_array[-1] - v_exact[-1])))
+
+
+def _run(name, b, m, k, x, v, h, duration, repeat):
+    """Time one method at one step size and measure its error."""
+    method = METHODS[name]
+    # The exact solution is measured from t = 0.
+    t = h * np.arange(int(round(duration / h)) + 1)
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        x_array, v_array = method(b, m, k, x, v, t, h)
+        seconds = min(seconds, time.perf_counter() - start)
+    result = dict(method=name, h=h, n_steps=len(t), seconds=seconds)
+    result.update(_errors(x_array, v_array, *n.exact(b, m, k, x, v, t)))
+    return result
+
+
+def run(b=0.2, m=1., k=1., x=1., v=0., duration=20., h=None,
+        methods=None, repeat=3, executor=None):
+    """
+    Run every method at every step size.
+
+    Kwargs:
+
+        b, m, k, x, v: the oscillator, as for the methods.
+
+        duration: the time simulated by each run.
+
+        h: the step sizes, by default 13 from 1e-3 to 1e-1 spaced
+           logarithmically.
+
+        methods: the names of the methods to run, from METHODS, by
+                 default DEFAULT_METHODS.
+
+        repeat: the number of timed runs of each, of which the fastest
+                is kept.
+
+        executor: the process pool to run on. If None, one is created
+                  for the call.
+
+    Returns:
+
+        a list with a dictionary for each run, of the method, h, the
+        number of steps, the time taken in seconds and the rms, max
+        and final errors. rms and max are errors in the displacement
+        over the run; final is the error in (x, v) at its end.
+    """
+    h = np.logspace(-3, -1, 13) if h is None else h
+    methods = DEFAULT_METHODS if methods is None else methods
+    for name in methods:
+        if name not in METHODS:
+            raise(ValueError("Unknown method %r. Choose from %r."
+                             % (name, list(METHODS))))
+    pool = ProcessPoolExecutor() if executor is None else executor
+    try:
+        futures = [pool.submit(_run, name, b, m, k, x, v, float(step),
+                               duration, repeat)
+                   for name in methods for step in h]
+        return [future.result() for future in futures]
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+
+def orders(results, error="rms"):
+    """
+    The empirical order of each method.
+
+    Params:
+
+        results: the results from run().
+
+    Kwargs:
+
+        error: the error norm to fit, "rms", "max" or "final".
+
+    Mathematical backing:
+
+        For small h the error of a method of order p is C h ^ p, so
+
+            log(error) = log(C) + p log(h)
+
+        and p is the slope of a least squares line through the runs.
+        Runs with errors at round-off are left out, as are those with
+        errors of order one, which are far from that limit.
+
+    Returns:
+
+        a dictionary of the order of each method, or nan where fewer
+        than two runs are left to fit.
+    """
+    fitted = {}
+    for name in dict.fromkeys(result["method"] for result in results):
+        points = np.array([(result["h"], result[error]) for result in results
+                           if result["method"] == name and
+                           ROUND_OFF < result[error] < 0.1])
+        if len(points) < 2:
+            fitted[name] = float("nan")
+        else:
+            fitted[name] = float(np.polyfit(np.log(points[:, 0]),
+                                            np.log(points[:, 1]), 1)[0])
+    return fitted
+
+
+def pareto_front(results, error="rms"):
+    """
+    The runs for which no other run was both faster and more accurate.
+
+    Params:
+
+        results: the results from run().
+
+    Kwargs:
+
+        error: the error norm to compare, "rms", "max" or "final".
+
+    Returns:
+
+        the list of those runs, from fastest to most accurate.
+    """
+    front = []
+    for result in sorted(results, key=lambda result: (result["seconds"],
+                                                      result[error])):
+        if not front or result[error] < front[-1][error]:
+            front.append(result)
+    return front
+
+
+def report(results, error="rms"):
+    """The orders and the Pareto front as a table, for printing."""
+    lines = ["%-16s %s" % ("method", "order")]
+    for name, order in orders(results, error).items():
+        lines.append("%-16s %.2f" % (name, order))
+    lines.append("")
+    lines.append("%-16s %-10s %-12s %s" % ("method", "h", "seconds", error))
+    for result in pareto_front(results, error):
+        lines.append("%-16s %-10.3g %-12.3g %.3g"
+                     % (result["method"], result["h"], result["seconds"],
+                        result[error]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1],
+                                     prog="python study.py")
+    parser.add_argument("--b", type=float, default=0.2)
+    parser.add_argument("--m", type=float, default=1.)
+    parser.add_argument("--k", type=float, default=1.)
+    parser.add_argument("--x", type=float, default=1.)
+    parser.add_argument("--v", type=float, default=0.)
+    parser.add_argument("--duration", type=float, default=20.)
+    parser.add_argument("--h-min", type=float, default=1e-3)
+    parser.add_argument("--h-max", type=float, default=1e-1)
+    parser.add_argument("--points", type=int, default=13,
+                        help="number of step sizes")
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS))
+    parser.add_argument("--error", choices=("rms", "max", "final"),
+                        default="rms")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file to write the JSON results to")
+    arguments = parser.parse_args(argv)
+
+    h = np.logspace(np.log10(arguments.h_min), np.log10(arguments.h_max),
+                    arguments.points)
+    results = run(arguments.b, arguments.m, arguments.k, arguments.x,
+                  arguments.v, arguments.duration, h, arguments.methods,
+                  arguments.repeat)
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(dict(orders=orders(results, arguments.error),
+                           results=results), output, indent=2)
+    print(report(results, arguments.error))
+
+
+if __name__ == "__main__":
+    main()
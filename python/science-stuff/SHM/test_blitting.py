@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import blitting
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+except ImportError:
+    Figure = None
+
+"""
+Unit testing for the blitting of the viewer's lines, on the Agg canvas.
+"""
+
+
+@unittest.skipIf(Figure is None, "matplotlib is not installed")
+class TestBlitter(unittest.TestCase):
+    def setUp(self):
+        self.figure = Figure(figsize=(2, 2), dpi=50)
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        ax.set_ylim(0, 1)
+        self.line, = ax.plot([0, 1], [0.2, 0.2], color="red", linewidth=4)
+        self.blitter = blitting.Blitter(self.canvas, [self.line])
+
+    def red_rows(self):
+        """The rows of the image holding the line, from the top."""
+        image = np.asarray(self.canvas.buffer_rgba())
+        red = ((image[..., 0] > 200) & (image[..., 1] < 50) &
+               (image[..., 2] < 50))
+        return np.flatnonzero(red.any(axis=1))
+
+    def test_draw_saves_background_without_artists(self):
+        self.canvas.draw()
+        self.assertIsNotNone(self.blitter.background)
+        self.assertTrue(self.line.get_animated())
+        # The draw event put the line back over the background.
+        self.assertGreater(len(self.red_rows()), 0)
+        self.canvas.restore_region(self.blitter.background)
+        self.assertEqual(len(self.red_rows()), 0)
+
+    def test_blit_moves_the_line(self):
+        self.canvas.draw()
+        low = self.red_rows()
+        self.line.set_ydata([0.8, 0.8])
+        self.blitter.blit()
+        high = self.red_rows()
+        self.assertGreater(len(high), 0)
+        # Higher up the axes is nearer the top of the image, and the
+        # line's old position is cleared.
+        self.assertLess(high.max(), low.min())
+
+    def test_hidden_artists_are_not_drawn(self):
+        self.canvas.draw()
+        self.line.set_visible(False)
+        self.blitter.blit()
+        self.assertEqual(len(self.red_rows()), 0)
+
+    def test_blit_before_draw_asks_for_draw(self):
+        self.assertIsNone(self.blitter.background)
+        self.blitter.blit()
+        self.assertIsNotNone(self.blitter.background)
+        self.assertGreater(len(self.red_rows()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
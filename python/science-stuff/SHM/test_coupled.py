@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from scipy import linalg
+import coupled
+import numerical as n
+
+"""
+Unit testing for the coupled oscillators.
+"""
+
+
+class TestCoupled(unittest.TestCase):
+    def setUp(self):
+        self.t = 0.05 * np.arange(400)
+
+    def test_single_mass_matches_scalar_oscillator(self):
+        # Two springs of 0.5 to the walls act as one of 1.
+        system = coupled.chain(1, m=2., k=0.5, b=0.3)
+        for method in (n.euler, n.verlet, n.euler_cromer, n.rk4,
+                       n.yoshida4):
+            x_array, v_array = coupled.simulate(method, system, 1., 0.5,
+                                                self.t, 0.05, force=np.cos)
+            x_one, v_one = method(0.3, 2., 1., 1., 0.5, self.t, 0.05,
+                                  force=np.cos)
+            # The coupled damping is by Crank-Nicolson rather than
+            # exact, so yoshida4 agrees only to its error.
+            atol = 1e-9 if method is n.yoshida4 else 1e-12
+            np.testing.assert_allclose(x_array[0], x_one, rtol=0,
+                                       atol=atol)
+            np.testing.assert_allclose(v_array[0], v_one, rtol=0,
+                                       atol=atol)
+
+    def test_chain_matches_matrix_exponential(self):
+        system = coupled.chain(5, m=np.linspace(1, 2, 5), k=1., b=0.1)
+        x = np.linspace(-1, 1, 5)
+        x_array, v_array = coupled.simulate(n.rk4, system, x, 0., self.t,
+                                            0.05)
+        M = system.M.toarray()
+        A = np.block([[np.zeros((5, 5)), np.eye(5)],
+                      [-linalg.solve(M, system.K.toarray()),
+                       -linalg.solve(M, system.C.toarray())]])
+        exact = linalg.expm(A * self.t[-1]) @ np.concatenate((x, [0.] * 5))
+        np.testing.assert_allclose(x_array[:, -1], exact[:5], atol=1e-5)
+
+    def test_energy_is_conserved_without_damping(self):
+        system = coupled.chain(4, k=[1., 2., 3., 2., 1.])
+        x_array, v_array = coupled.simulate(n.yoshida6, system,
+                                            [1., 0., 0., -1.], 0., self.t,
+                                            0.05)
+        energy = system.energy(x_array, v_array)
+        np.testing.assert_allclose(energy, energy[0], rtol=1e-6)
+
+    def test_lattice_row_is_a_chain_held_sideways(self):
+        lattice = coupled.lattice((1, 4), k=1.)
+        chain = coupled.chain(4, k=1.)
+        np.testing.assert_array_equal(
+            lattice.K.toarray(), chain.K.toarray() + 2 * np.eye(4))
+
+    def test_unknown_method_raises_error(self):
+        with self.assertRaises(ValueError):
+            coupled.simulate(n.exact, coupled.chain(2), 1., 0., self.t,
+                             0.05)
+        with self.assertRaises(ValueError):
+            n.simulate(n.dopri, coupled.chain(2), [1., 1.], [0., 0.],
+                       self.t, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
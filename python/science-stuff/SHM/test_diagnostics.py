@@ -0,0 +1,105 @@
+import unittest
+import numpy as np
+import diagnostics
+import numerical as n
+
+"""
+Unit testing for the trajectory diagnostics.
+"""
+
+
+class TestDiagnostics(unittest.TestCase):
+    def setUp(self):
+        self.b = np.array([0., 0.1, 0.3])
+        self.t = 0.01 * np.arange(2001)
+        self.x_exact, self.v_exact = n.exact(self.b, 1, 1, 1, 0, self.t)
+        self.x_array, self.v_array = n.euler(self.b, 1, 1, 1, 0, self.t,
+                                             0.01)
+
+    def test_energy_matches_legacy_for_one_system(self):
+        x, v = self.x_array[0], self.v_array[0]
+        legacy = np.array([0.5 * 2 * a ** 2 + 0.5 * 3 * b ** 2
+                           for a, b in zip(x, v)])
+        np.testing.assert_allclose(diagnostics.energy(2, x, 3, v), legacy,
+                                   rtol=1e-15)
+
+    def test_batched_matches_each_system(self):
+        errors = diagnostics.rms_error(self.x_array, self.x_exact)
+        for i in range(len(self.b)):
+            self.assertAlmostEqual(
+                errors[i], diagnostics.rms_error(self.x_array[i],
+                                                 self.x_exact[i]))
+
+    def test_exact_solution_has_no_phase_error(self):
+        errors = diagnostics.phase_error(self.b, 1, 1, self.x_exact,
+                                         self.v_exact, self.x_exact,
+                                         self.v_exact)
+        np.testing.assert_allclose(errors, 0, atol=1e-12)
+
+    def test_euler_gains_energy_without_damping(self):
+        energy = diagnostics.energy(1, self.x_array, 1, self.v_array)
+        self.assertGreater(diagnostics.energy_drift_rate(energy, 0.01)[0], 0)
+
+
+class TestOnline(unittest.TestCase):
+    def setUp(self):
+        self.x_array = np.random.normal(size=(2, 1000))
+        self.v_array = np.random.normal(size=(2, 1000))
+        self.reference = np.random.normal(size=(2, 1000))
+
+    def test_matches_whole_trajectory(self):
+        online = diagnostics.Online(1, 2, 0.1)
+        for start in range(0, 1000, 300):
+            online.update(self.x_array[:, start:start + 300],
+                          self.v_array[:, start:start + 300],
+                          self.reference[:, start:start + 300])
+        energy = diagnostics.energy(1, self.x_array, 2, self.v_array)
+        np.testing.assert_allclose(online.energy_drift_rate,
+                                   diagnostics.energy_drift_rate(energy, 0.1))
+        np.testing.assert_allclose(
+            online.rms_error,
+            diagnostics.rms_error(self.x_array, self.reference))
+        np.testing.assert_array_equal(
+            online.max_error,
+            diagnostics.max_error(self.x_array, self.reference))
+
+    def test_rms_error_over_steps_with_a_reference(self):
+        online = diagnostics.Online(1, 1, 0.1)
+        online.update(self.x_array[:, :500], self.v_array[:, :500],
+                      self.reference[:, :500])
+        online.update(self.x_array[:, 500:], self.v_array[:, 500:])
+        np.testing.assert_allclose(
+            online.rms_error,
+            diagnostics.rms_error(self.x_array[:, :500],
+                                  self.reference[:, :500]))
+
+    def test_phase_error_matches_whole_trajectory(self):
+        b = np.array([0., 0.1, 3.])
+        t = 0.01 * np.arange(1000)
+        x_exact, v_exact = n.exact(b, 1, 1, 1, 0, t)
+        x_array, v_array = n.euler(b, 1, 1, 1, 0, t, 0.01)
+        online = diagnostics.Online(1, 1, 0.01, b=b)
+        for start in range(0, 1000, 300):
+            chunk = slice(start, start + 300)
+            online.update(x_array[:, chunk], v_array[:, chunk],
+                          x_exact[:, chunk], v_exact[:, chunk])
+        errors = diagnostics.phase_error(b, 1, 1, x_array, v_array,
+                                         x_exact, v_exact)
+        np.testing.assert_array_equal(online.phase_error, errors[:, -1])
+        np.testing.assert_array_equal(online.max_phase_error,
+                                      np.max(np.abs(errors), axis=-1))
+        # Over damped systems have no phase.
+        self.assertTrue(np.isnan(online.max_phase_error[2]))
+
+    def test_phase_error_needs_b_and_reference_velocity(self):
+        online = diagnostics.Online(1, 1, 0.1)
+        online.update(self.x_array, self.v_array, self.reference,
+                      self.reference)
+        self.assertIsNone(online.phase_error)
+        online = diagnostics.Online(1, 1, 0.1, b=0.1)
+        online.update(self.x_array, self.v_array, self.reference)
+        self.assertIsNone(online.max_phase_error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import ensemble
+import numerical as n
+
+"""
+Unit testing for the Monte Carlo ensembles.
+"""
+
+
+class TestEnsemble(unittest.TestCase):
+    def setUp(self):
+        self.t = 0.1 * np.arange(51)
+        self.parameters = dict(b=0.1, m=("normal", 1, 0.05),
+                               k=("uniform", 0.9, 1.1), x=1,
+                               v=("normal", 0, 0.1))
+
+    def samples(self, n_samples, chunk_size, seed):
+        """Every trajectory of the ensemble, held at once."""
+        seeds = np.random.SeedSequence(seed).spawn(
+            -(-n_samples // chunk_size))
+        chunks = [ensemble._simulate(n.verlet, self.parameters, chunk_seed,
+                                     min(chunk_size, n_samples - start),
+                                     self.t, 0.1, None, None)
+                  for chunk_seed, start in zip(seeds, range(0, n_samples,
+                                                            chunk_size))]
+        return (np.vstack([x for x, _ in chunks]),
+                np.vstack([energy for _, energy in chunks]))
+
+    def test_moments_match_all_samples(self):
+        result = ensemble.run(n.verlet, self.parameters, self.t, 0.1, 2500,
+                              chunk_size=500, seed=1)
+        x, energy = self.samples(2500, 500, 1)
+        self.assertEqual(result.count, 2500)
+        np.testing.assert_allclose(result.x.mean, x.mean(axis=0))
+        np.testing.assert_allclose(result.x.variance,
+                                   x.var(axis=0, ddof=1))
+        np.testing.assert_allclose(result.energy.std,
+                                   energy.std(axis=0, ddof=1))
+
+    def test_quantiles_within_a_bin(self):
+        result = ensemble.run(n.verlet, self.parameters, self.t, 0.1, 2500,
+                              chunk_size=500, seed=2)
+        x, _ = self.samples(2500, 500, 2)
+        width = (x.max(axis=0) - x.min(axis=0)).max() * 2 / 256
+        np.testing.assert_allclose(result.x.quantile([0.1, 0.5, 0.9]),
+                                   np.quantile(x, [0.1, 0.5, 0.9], axis=0),
+                                   atol=width)
+
+    def test_results_repeat_with_seed(self):
+        first = ensemble.run(n.rk4, self.parameters, self.t, 0.1, 30,
+                             chunk_size=10, seed=3)
+        second = ensemble.run(n.rk4, self.parameters, self.t, 0.1, 30,
+                              chunk_size=10, seed=3)
+        np.testing.assert_array_equal(first.x.mean, second.x.mean)
+
+    def test_no_samples_raises_error(self):
+        with self.assertRaises(ValueError):
+            ensemble.run(n.verlet, self.parameters, self.t, 0.1, 0)
+
+    def test_unknown_parameter_raises_error(self):
+        with self.assertRaises(ValueError):
+            ensemble.run(n.verlet, dict(c=1), self.t, 0.1, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
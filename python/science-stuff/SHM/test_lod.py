@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import lod
+
+"""
+Unit testing for the plot downsampling and export.
+"""
+
+
+class TestMinMax(unittest.TestCase):
+    def setUp(self):
+        self.t = 1e-4 * np.arange(100003)
+        self.y = np.sin(7 * self.t) + np.random.normal(0, 0.1, len(self.t))
+
+    def test_points_are_bounded_by_buckets(self):
+        t, y = lod.minmax(self.t, self.y, 400)
+        self.assertLessEqual(len(t), 2 * 400 + 2)
+        self.assertTrue(np.all(np.diff(t) > 0))
+
+    def test_extremes_and_ends_are_kept(self):
+        t, y = lod.minmax(self.t, self.y, 400)
+        self.assertEqual(y.max(), self.y.max())
+        self.assertEqual(y.min(), self.y.min())
+        self.assertEqual((t[0], t[-1]), (self.t[0], self.t[-1]))
+
+    def test_points_are_from_the_series(self):
+        t, y = lod.minmax(self.t, self.y, 400)
+        indices = np.searchsorted(self.t, t)
+        np.testing.assert_array_equal(self.y[indices], y)
+
+    def test_short_series_is_unchanged(self):
+        t, y = lod.minmax(self.t[:100], self.y[:100], 400)
+        np.testing.assert_array_equal(y, self.y[:100])
+
+
+class TestSave(unittest.TestCase):
+    def test_only_named_lines_are_saved(self):
+        t = np.arange(10.)
+        results = dict(line1=(t, t ** 2, t ** 3), line2=(t, -t, t))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "export.npz")
+            lod.save(filename, results, ["line1"])
+            with np.load(filename) as saved:
+                self.assertEqual(sorted(saved.files),
+                                 ["line1_energy", "line1_t", "line1_x"])
+                np.testing.assert_array_equal(saved["line1_x"], t ** 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,392 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from scipy import integrate, linalg
+import numerical as n
+
+"""
+Unit testing for the numerical methods.
+"""
+
+# Under, critically and over damped, in that order.
+REGIMES = (0.3, 2., 3.)
+
+
+class TestVectorised(unittest.TestCase):
+    def test_batch_matches_each_system(self):
+        b = np.array([0., 0.5, 3.])
+        k = np.array([1., 2., 0.5])
+        t = 0.05 * np.arange(200)
+        for method in (n.exact, n.euler, n.imp_euler, n.verlet,
+                       n.euler_cromer):
+            x_array, v_array = method(b, 1., k, 1., 0., t, 0.05)
+            for i in range(len(b)):
+                x_one, v_one = method(b[i], 1., k[i], 1., 0., t, 0.05)
+                np.testing.assert_allclose(x_array[i], x_one, rtol=1e-12)
+                np.testing.assert_allclose(v_array[i], v_one, rtol=1e-12)
+
+    def test_batch_of_one_keeps_systems_axis(self):
+        x_array, v_array = n.verlet([0.1], 1., 1., 1., 0.,
+                                    0.05 * np.arange(10), 0.05)
+        self.assertEqual(x_array.shape, (1, 10))
+        self.assertEqual(v_array.shape, (1, 10))
+
+    def test_scalar_system_gives_one_dimensional_arrays(self):
+        x_array, v_array = n.euler(0.1, 1., 1., 1., 0.,
+                                   0.05 * np.arange(10), 0.05)
+        self.assertEqual(x_array.shape, (10,))
+        self.assertEqual(v_array.shape, (10,))
+
+
+def euler_by_hand(b, m, k, x, v, h, forces):
+    """Euler's method step by step, with forces[i] over the ith step."""
+    x_list, v_list = [x], [v]
+    for force in forces[:-1]:
+        v = v + h * (force - b * v - k * x) / m
+        x = x + h * v
+        x_list.append(x)
+        v_list.append(v)
+    return np.array(x_list), np.array(v_list)
+
+
+class TestForceSchedule(unittest.TestCase):
+    def setUp(self):
+        self.t = 0.1 * np.arange(10)
+
+    def test_impulses_cover_the_steps_ending_near_them(self):
+        # Steps ending at 0.2 and 0.3 are within 0.1 of 0.25, and those
+        # ending at 0.6 and 0.7 within 0.1 of 0.62.
+        np.testing.assert_array_equal(
+            n._force_schedule([2., 3.], [0.25, 0.62], self.t, 0.1),
+            [0, 2, 2, 0, 0, 3, 3, 0, 0, 0])
+
+    def test_impulses_add_up(self):
+        both = n._force_schedule([2., 3.], [0.25, 0.33], self.t, 0.1)
+        np.testing.assert_array_equal(
+            both, n._force_schedule(2., 0.25, self.t, 0.1) +
+            n._force_schedule(3., 0.33, self.t, 0.1))
+        self.assertEqual(both[2], 5.)
+
+    def test_impulses_in_a_run(self):
+        forces = [0, 2, 2, 0, 0, 3, 3, 0, 0, 0]
+        np.testing.assert_allclose(
+            n.euler(0.2, 2., 1., 1., 0., self.t, 0.1, force=[2., 3.],
+                    time=[0.25, 0.62]),
+            euler_by_hand(0.2, 2., 1., 1., 0., 0.1, forces), atol=1e-14)
+
+    def test_sampled_force_in_a_run(self):
+        forces = np.cos(self.t)
+        np.testing.assert_allclose(
+            n.euler(0.2, 2., 1., 1., 0., self.t, 0.1, force=forces),
+            euler_by_hand(0.2, 2., 1., 1., 0., 0.1, forces), atol=1e-14)
+
+    def test_function_is_sampled_at_each_step(self):
+        np.testing.assert_array_equal(
+            n.euler(0.2, 2., 1., 1., 0., self.t, 0.1, force=np.cos),
+            n.euler(0.2, 2., 1., 1., 0., self.t, 0.1,
+                    force=np.cos(self.t)))
+
+    def test_constant_function(self):
+        np.testing.assert_array_equal(
+            n._force_schedule(lambda t: 1.5, None, self.t, 0.1),
+            np.full(10, 1.5))
+
+    def test_schedule_of_part_of_a_run(self):
+        whole = n._force_schedule([2., 3.], [0.25, 0.62], self.t, 0.1)
+        np.testing.assert_array_equal(
+            n._force_schedule([2., 3.], [0.25, 0.62], self.t[4:], 0.1,
+                              start=4), whole[4:])
+
+
+class TestDopri(unittest.TestCase):
+    def setUp(self):
+        self.t = np.linspace(0, 20, 400)
+
+    def test_matches_exact_within_tolerance(self):
+        for b in REGIMES:
+            x_array, v_array = n.dopri(b, 1., 1., 1., 0.5, self.t, 0.1,
+                                       rtol=1e-9, atol=1e-12)
+            x_exact, v_exact = n.exact(b, 1., 1., 1., 0.5, self.t)
+            np.testing.assert_allclose(x_array, x_exact, atol=1e-7)
+            np.testing.assert_allclose(v_array, v_exact, atol=1e-7)
+
+    def test_impulses_kick_the_velocity(self):
+        # Impulses of 2 and -1 at 5.3 and 12.1, with h = 0.1, change the
+        # velocity by 0.2 / m and -0.1 / m at once.
+        x_array, v_array = n.dopri(0.2, 2., 1., 1., 0., self.t, 0.1,
+                                   force=[2., -1.], time=[5.3, 12.1],
+                                   rtol=1e-10, atol=1e-12)
+        x, v = 1., 0.
+        start = 0.
+        for kick, change in ((5.3, 0.1), (12.1, -0.05), (20., 0.)):
+            part = (start <= self.t) & (self.t <= kick)
+            x_exact, v_exact = n.exact(0.2, 2., 1., x, v,
+                                       self.t[part] - start)
+            np.testing.assert_allclose(x_array[part], x_exact, atol=1e-8)
+            np.testing.assert_allclose(v_array[part], v_exact, atol=1e-8)
+            x, v = n.exact(0.2, 2., 1., x, v, kick - start)
+            v += change
+            start = kick
+
+    def test_full_output_counts_the_steps(self):
+        x_array, v_array, counts = n.dopri(0.2, 1., 1., 1., 0., self.t,
+                                           0.1, force=1., time=5.,
+                                           full_output=True)
+        self.assertEqual(x_array.shape, self.t.shape)
+        self.assertGreater(counts["steps"], 0)
+        # One evaluation to start, six for each step tried and one
+        # after the impulse.
+        self.assertEqual(counts["evaluations"],
+                         1 + 6 * (counts["steps"] + counts["rejected"]) + 1)
+
+    def test_tighter_tolerance_takes_more_steps(self):
+        loose = n.dopri(0.2, 1., 1., 1., 0., self.t, 0.1, rtol=1e-4,
+                        full_output=True)[2]
+        tight = n.dopri(0.2, 1., 1., 1., 0., self.t, 0.1, rtol=1e-10,
+                        atol=1e-12, full_output=True)[2]
+        self.assertGreater(tight["steps"], loose["steps"])
+
+
+def order(method, hs, b=0.2, duration=4.):
+    """The slope of log(error) against log(h) at the end of a run."""
+    errors = []
+    for h in hs:
+        t = h * np.arange(int(round(duration / h)) + 1)
+        x_array, v_array = method(b, 1., 1., 1., 0., t, h)
+        x_exact, v_exact = n.exact(b, 1., 1., 1., 0., t)
+        errors.append(np.hypot(x_array[-1] - x_exact[-1],
+                               v_array[-1] - v_exact[-1]))
+    return np.polyfit(np.log(hs), np.log(errors), 1)[0]
+
+
+def reference_forced(t):
+    """x for b = 0.2, m = k = 1, x = 1, v = 0, driven by cos(t)."""
+    solution = integrate.solve_ivp(
+        lambda s, y: [y[1], np.cos(s) - y[0] - 0.2 * y[1]],
+        (t[0], t[-1]), [1., 0.], t_eval=t, rtol=1e-13, atol=1e-13)
+    return solution.y[0]
+
+
+def forced_order(method, hs):
+    """As order, driven by cos(t) and measured against reference_forced."""
+    errors = []
+    for h in hs:
+        t = h * np.arange(int(round(4 / h)) + 1)
+        x_array, _ = method(0.2, 1., 1., 1., 0., t, h, force=np.cos)
+        errors.append(abs(x_array[-1] - reference_forced(t)[-1]))
+    return np.polyfit(np.log(hs), np.log(errors), 1)[0]
+
+
+class TestConvergence(unittest.TestCase):
+    def test_rk4_is_fourth_order(self):
+        self.assertAlmostEqual(order(n.rk4, [0.1, 0.05, 0.025]), 4,
+                               delta=0.2)
+
+    def test_velocity_verlet_is_second_order(self):
+        self.assertAlmostEqual(order(n.velocity_verlet, [0.1, 0.05, 0.025]),
+                               2, delta=0.2)
+
+    def test_yoshida4_is_fourth_order(self):
+        self.assertAlmostEqual(order(n.yoshida4, [0.1, 0.05, 0.025]), 4,
+                               delta=0.2)
+
+    def test_yoshida6_is_sixth_order(self):
+        self.assertAlmostEqual(order(n.yoshida6, [0.2, 0.1, 0.05]), 6,
+                               delta=0.3)
+
+    def test_forced_rk4_is_fourth_order(self):
+        self.assertAlmostEqual(forced_order(n.rk4, [0.1, 0.05, 0.025]), 4,
+                               delta=0.2)
+
+    def test_forced_yoshida4_is_fourth_order(self):
+        self.assertAlmostEqual(forced_order(n.yoshida4, [0.1, 0.05, 0.025]),
+                               4, delta=0.2)
+
+    def test_forced_yoshida6_is_sixth_order(self):
+        self.assertAlmostEqual(forced_order(n.yoshida6, [0.4, 0.2, 0.1]), 6,
+                               delta=0.3)
+
+    def test_batch_matches_each_system(self):
+        b = np.array([0., 0.5, 3.])
+        k = np.array([1., 2., 0.5])
+        t = 0.05 * np.arange(200)
+        for method in (n.rk4, n.velocity_verlet, n.yoshida4, n.yoshida6):
+            x_array, v_array = method(b, 1., k, 1., 0., t, 0.05,
+                                      force=np.sin)
+            for i in range(len(b)):
+                x_one, v_one = method(b[i], 1., k[i], 1., 0., t, 0.05,
+                                      force=np.sin)
+                np.testing.assert_allclose(x_array[i], x_one, rtol=1e-12)
+                np.testing.assert_allclose(v_array[i], v_one, rtol=1e-12)
+
+
+class TestStageSchedule(unittest.TestCase):
+    def setUp(self):
+        self.t = 0.1 * np.arange(4)
+
+    def test_function_is_evaluated_at_each_stage(self):
+        np.testing.assert_allclose(
+            n._stage_schedule(lambda s: s, None, self.t, 0.1, (0, 0.5, 1)),
+            [[0., 0.05, 0.1], [0.1, 0.15, 0.2], [0.2, 0.25, 0.3],
+             [0.3, 0.35, 0.4]])
+
+    def test_samples_are_interpolated(self):
+        # The last sample is held over the last step.
+        np.testing.assert_allclose(
+            n._stage_schedule([1., 3., 2., 4.], None, self.t, 0.1,
+                              (0, 0.5, 1)),
+            [[1., 2., 3.], [3., 2.5, 2.], [2., 3., 4.], [4., 4., 4.]])
+
+    def test_impulse_is_held_over_each_stage(self):
+        # The steps ending at 0.1 and 0.2 are within 0.1 of 0.15.
+        np.testing.assert_array_equal(
+            n._stage_schedule(2., 0.15, self.t, 0.1, (0, 0.5, 1)),
+            [[2., 2., 2.], [2., 2., 2.], [0., 0., 0.], [0., 0., 0.]])
+
+    def test_kicks_of_yoshida4_follow_the_drifts(self):
+        w1 = 1 / (2 - 2 ** (1 / 3))
+        w0 = 1 - 2 * w1
+        np.testing.assert_allclose(n._YOSHIDA4_OFFSETS,
+                                   [0, w1, w1 + w0, 1])
+
+
+class TestPropagate(unittest.TestCase):
+    def setUp(self):
+        self.t = np.linspace(0, 10, 101)
+
+    def test_propagate_matches_exact(self):
+        for b in REGIMES:
+            np.testing.assert_allclose(
+                n.propagate(b, 1., 1., 1., 0.5, self.t, 0.1),
+                n.exact(b, 1., 1., 1., 0.5, self.t), atol=1e-12)
+
+    def test_jump_matches_exact(self):
+        for b in REGIMES:
+            x, v = n.jump(b, 1., 1., 1., 0.5, 0.1, 100)
+            x_exact, v_exact = n.exact(b, 1., 1., 1., 0.5, 10.)
+            self.assertAlmostEqual(x, x_exact, places=12)
+            self.assertAlmostEqual(v, v_exact, places=12)
+
+    def test_jump_batch_across_regimes(self):
+        b = np.array(REGIMES)
+        x, v = n.jump(b, 1., 1., 1., 0.5, 0.1, 100)
+        x_exact, v_exact = n.exact(b, 1., 1., 1., 0.5, 10.)
+        np.testing.assert_allclose(x, x_exact, atol=1e-12)
+        np.testing.assert_allclose(v, v_exact, atol=1e-12)
+
+    def test_constant_force_is_exact(self):
+        # A constant force F moves the rest position to F / k.
+        b = np.array(REGIMES)
+        x_array, v_array = n.propagate(b, 1., 2., 1., 0., self.t, 0.1,
+                                       force=np.full(len(self.t), 0.7))
+        x_exact, v_exact = n.exact(b, 1., 2., 1. - 0.35, 0., self.t)
+        np.testing.assert_allclose(x_array, x_exact + 0.35, atol=1e-12)
+        np.testing.assert_allclose(v_array, v_exact, atol=1e-12)
+
+    def test_driven_matches_reference(self):
+        # The force is held at its value at the middle of each step, so
+        # the error falls as h ^ 2.
+        errors = []
+        for h in (0.02, 0.01):
+            t = h * np.arange(int(round(10 / h)) + 1)
+            x_array, _ = n.propagate(0.2, 1., 1., 1., 0., t, h,
+                                     force=np.cos)
+            errors.append(np.max(np.abs(x_array - reference_forced(t))))
+        self.assertLess(errors[1], 2e-5)
+        self.assertAlmostEqual(errors[0] / errors[1], 4, delta=0.2)
+
+
+def reference(b, m, k, x, v, t):
+    """The exact solution by the matrix exponential."""
+    A = np.array([[0, 1], [-k / m, -b / m]])
+    return np.array([linalg.expm(A * s) @ [x, v] for s in t]).T
+
+
+class TestExact(unittest.TestCase):
+    def setUp(self):
+        self.t = np.linspace(0, 10, 101)
+
+    def test_exact_matches_matrix_exponential(self):
+        for b in REGIMES:
+            x_array, v_array = n.exact(b, 1., 1., 1., 0.5, self.t)
+            np.testing.assert_allclose(
+                np.stack((x_array, v_array)),
+                reference(b, 1., 1., 1., 0.5, self.t), atol=1e-12)
+
+    def test_result_is_real(self):
+        for b in REGIMES:
+            x_array, v_array = n.exact(b, 1., 1., 1., 0.5, self.t)
+            self.assertEqual(x_array.dtype, np.float64)
+            self.assertEqual(v_array.dtype, np.float64)
+
+    def test_continuous_across_critical_damping(self):
+        critical = n.exact(2., 1., 1., 1., 0.5, self.t)
+        for b in (2. - 1e-9, 2. + 1e-9):
+            np.testing.assert_allclose(n.exact(b, 1., 1., 1., 0.5, self.t),
+                                       critical, atol=1e-8)
+
+    def test_any_times(self):
+        solution = n.ExactSolution([0.3, 3.], 1., 1., 1., 0.5)
+        x_array, v_array = solution(np.array([[2., 0.], [5., 1.]]))
+        self.assertEqual(x_array.shape, (2, 2, 2))
+        np.testing.assert_allclose(
+            x_array[:, 1, 0], n.exact([0.3, 3.], 1., 1., 1., 0.5, 5.)[0])
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.t = 0.01 * np.arange(1000)
+
+    def assert_matches_full_run(self, method, **kwargs):
+        b = np.array([0., 0.3])
+        x_array, v_array = method(b, 1., 1., 1., 0., self.t, 0.01,
+                                  **kwargs)
+        stream = n.Stream(method, b, 1., 1., 1., 0., len(self.t), 0.01,
+                          chunk_size=300, **kwargs)
+        chunks = [(x.copy(), v.copy()) for _, x, v in stream]
+        np.testing.assert_array_equal(np.hstack([x for x, _ in chunks]),
+                                      x_array)
+        np.testing.assert_array_equal(np.hstack([v for _, v in chunks]),
+                                      v_array)
+
+    def test_matches_full_run(self):
+        for method in (n.euler, n.verlet, n.rk4, n.yoshida6):
+            self.assert_matches_full_run(method, force=np.sin)
+
+    def test_sampled_force_matches_full_run(self):
+        for method in (n.euler, n.rk4):
+            self.assert_matches_full_run(method, force=np.sin(self.t))
+
+    def test_impulses_across_chunks_match_full_run(self):
+        # The impulse at 2.995 falls over the steps either side of the
+        # boundary between the first two chunks.
+        for method in (n.euler, n.verlet, n.rk4):
+            self.assert_matches_full_run(method, force=[1., -2.],
+                                         time=[2.995, 5.])
+
+    def test_decimated_output(self):
+        x_array, _ = n.rk4(0.1, 1., 1., 1., 0., self.t, 0.01)
+        stream = n.Stream(n.rk4, 0.1, 1., 1., 1., 0., len(self.t), 0.01,
+                          every=7, chunk_size=300)
+        kept = np.hstack([x.copy() for _, x, _ in stream])
+        np.testing.assert_array_equal(kept, x_array[::7])
+        self.assertEqual(stream.x_max, x_array.max())
+        self.assertEqual(stream.x_min, x_array.min())
+
+    def test_output_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, "stream.npy")
+            stream = n.Stream(n.verlet, [0.1, 0.2], 1., 1., 1., 0.,
+                              len(self.t), 0.01, every=3, chunk_size=100,
+                              output=name).run()
+            saved = np.load(name)
+            x_array, v_array = n.verlet([0.1, 0.2], 1., 1., 1., 0., self.t,
+                                        0.01)
+            np.testing.assert_array_equal(saved[0], x_array[:, ::3])
+            np.testing.assert_array_equal(saved[1], v_array[:, ::3])
+            self.assertEqual(stream.energy.shape, (2,))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import numerical as n
+import recompute
+
+"""
+Unit testing for the viewer's recomputation, without a GUI.
+"""
+
+
+class Timer():
+    """Stands in for a GUI timer, recording whether it is running."""
+    def __init__(self):
+        self.running = False
+        self.starts = 0
+        self.callbacks = []
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def start(self):
+        self.running = True
+        self.starts += 1
+
+    def stop(self):
+        self.running = False
+
+    def fire(self):
+        for callback in self.callbacks:
+            callback()
+
+
+class TestCached(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def method(b, m, k, x, v, t, h, force=None, time=None):
+            self.calls.append((b, h))
+            return n.euler(b, m, k, x, v, t, h, force=force, time=time)
+        self.compute = recompute.cached(dict(line=method), 5, maxsize=2)
+
+    def test_results_match_method(self):
+        t, x_array, energy_array = self.compute("line", 0.1, 1., 1., 0.1,
+                                                1., 0., 0, 0)
+        np.testing.assert_array_equal(t, np.arange(1, 5, 0.1))
+        x_euler, v_euler = n.euler(0.1, 1., 1., 1., 0., t, 0.1)
+        np.testing.assert_array_equal(x_array, x_euler)
+        np.testing.assert_array_equal(energy_array,
+                                      n.energy(1., x_euler, 1., v_euler))
+
+    def test_repeated_parameters_are_not_recomputed(self):
+        first = self.compute("line", 0.1, 1., 1., 0.1, 1., 0., 0, 0)
+        self.compute("line", 0.2, 1., 1., 0.1, 1., 0., 0, 0)
+        self.assertIs(self.compute("line", 0.1, 1., 1., 0.1, 1., 0., 0, 0),
+                      first)
+        self.assertEqual(self.calls, [(0.1, 0.1), (0.2, 0.1)])
+
+    def test_least_recently_used_is_dropped(self):
+        for b in (0.1, 0.2, 0.3, 0.1):
+            self.compute("line", b, 1., 1., 0.1, 1., 0., 0, 0)
+        self.assertEqual(len(self.calls), 4)
+
+
+class TestRecomputer(unittest.TestCase):
+    def setUp(self):
+        self.params = (0.1, 1., 1., 0.1, 1., 0., 0, 0)
+        self.names = ["a", "b"]
+        self.drawn = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.debounce_timer = Timer()
+        self.poll_timer = Timer()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.recomputer = recompute.Recomputer(
+            self.compute, lambda: (self.params, self.names),
+            lambda params, results: self.drawn.append((params, results)),
+            self.debounce_timer, self.poll_timer, executor=self.executor)
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def compute(self, name, *params):
+        self.started.set()
+        self.release.wait()
+        return (name, params[0])
+
+    def test_update_restarts_debounce(self):
+        self.debounce_timer.start()
+        self.recomputer.update(1.)
+        self.recomputer.update(2.)
+        self.assertTrue(self.debounce_timer.running)
+        self.assertEqual(self.debounce_timer.starts, 3)
+        self.assertIsNone(self.recomputer.future)
+
+    def test_results_are_drawn_once_ready(self):
+        self.release.clear()
+        self.debounce_timer.fire()
+        self.assertTrue(self.poll_timer.running)
+        self.poll_timer.fire()
+        self.assertEqual(self.drawn, [])
+
+        self.release.set()
+        wait([self.recomputer.future])
+        self.poll_timer.fire()
+        self.assertFalse(self.poll_timer.running)
+        self.assertEqual(self.drawn, [(self.params, dict(a=("a", 0.1),
+                                                         b=("b", 0.1)))])
+        self.poll_timer.fire()
+        self.assertEqual(len(self.drawn), 1)
+
+    def test_only_latest_request_is_drawn(self):
+        self.release.clear()
+        self.debounce_timer.fire()
+        running = self.recomputer.future
+        self.started.wait()
+        self.params = (0.2,) + self.params[1:]
+        self.debounce_timer.fire()
+        queued = self.recomputer.future
+        self.params = (0.3,) + self.params[1:]
+        self.names = ["a"]
+        self.debounce_timer.fire()
+
+        # The first had started, so runs on; the second never does.
+        self.assertFalse(running.cancelled())
+        self.assertTrue(queued.cancelled())
+        self.release.set()
+        wait([running, self.recomputer.future])
+        self.poll_timer.fire()
+        self.assertEqual(self.drawn, [(self.params, dict(a=("a", 0.3)))])
+
+    def test_poll_without_request_does_nothing(self):
+        self.poll_timer.fire()
+        self.assertEqual(self.drawn, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
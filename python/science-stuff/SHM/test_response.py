@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+import numerical as n
+import response
+
+"""
+Unit testing for the frequency response.
+"""
+
+
+class TestResponse(unittest.TestCase):
+    def setUp(self):
+        self.omega = np.linspace(0, 3, 30001)
+
+    def test_resonance_matches_peak_of_analytic_curve(self):
+        for b, m, k in ((0.2, 1., 1.), (0.5, 2., 3.), (1., 1.5, 4.)):
+            amplitude, _ = response.analytic(b, m, k, self.omega)
+            omega_r, peak = response.resonance(b, m, k)
+            self.assertAlmostEqual(omega_r, self.omega[np.argmax(amplitude)],
+                                   delta=self.omega[1])
+            self.assertGreaterEqual(peak, amplitude.max())
+            self.assertAlmostEqual(
+                peak, response.analytic(b, m, k, [omega_r])[0][0],
+                places=12)
+
+    def test_no_resonance_when_heavily_damped(self):
+        omega_r, peak = response.resonance(np.array([0.2, 3.]), 1., 1.)
+        self.assertTrue(np.isnan(omega_r[1]))
+        self.assertTrue(np.isnan(peak[1]))
+
+    def test_phase_is_quarter_turn_at_natural_frequency(self):
+        _, phase = response.analytic([0.2, 0.5], 2., 8., [2.])
+        np.testing.assert_allclose(phase[:, 0], np.pi / 2)
+
+    def test_batch_matches_each_system(self):
+        b = np.array([0.1, 0.4])
+        amplitude, phase = response.analytic(b, 1., 1., self.omega)
+        for i in range(len(b)):
+            one = response.analytic(b[i], 1., 1., self.omega)
+            np.testing.assert_array_equal(amplitude[i], one[0])
+            np.testing.assert_array_equal(phase[i], one[1])
+
+    def test_spectral_matches_analytic(self):
+        omega, amplitude, phase = response.spectral(n.rk4, 0.2, 1., 1.,
+                                                    0.01, 20000)
+        exact_amplitude, exact_phase = response.analytic(0.2, 1., 1., omega)
+        near = omega < 3
+        np.testing.assert_allclose(amplitude[near], exact_amplitude[near],
+                                   atol=1e-4)
+        np.testing.assert_allclose(phase[near], exact_phase[near], atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import study
+
+"""
+Unit testing for the accuracy and cost study.
+"""
+
+
+def result(method, h, seconds, error):
+    return dict(method=method, h=h, n_steps=int(1 / h), seconds=seconds,
+                rms=error, max=error, final=error)
+
+
+class TestStudy(unittest.TestCase):
+    def test_orders_of_synthetic_results(self):
+        results = [result("second", h, 1., 3 * h ** 2)
+                   for h in (0.1, 0.05, 0.025)]
+        results += [result("fourth", h, 1., 3 * h ** 4)
+                    for h in (0.1, 0.05, 0.025)]
+        # Round-off is left out of the fit.
+        results.append(result("fourth", 0.001, 1., 1e-14))
+        fitted = study.orders(results)
+        self.assertAlmostEqual(fitted["second"], 2)
+        self.assertAlmostEqual(fitted["fourth"], 4)
+
+    def test_pareto_front(self):
+        results = [result("a", 0.1, 1., 1e-2), result("b", 0.1, 2., 1e-3),
+                   result("c", 0.1, 3., 1e-2), result("d", 0.1, 4., 1e-5)]
+        self.assertEqual([r["method"] for r in study.pareto_front(results)],
+                         ["a", "b", "d"])
+
+    def test_run_measures_orders(self):
+        with ThreadPoolExecutor() as executor:
+            results = study.run(duration=4., h=[0.1, 0.05, 0.025],
+                                methods=["verlet", "rk4"], repeat=1,
+                                executor=executor)
+        self.assertEqual(len(results), 6)
+        fitted = study.orders(results, "final")
+        self.assertAlmostEqual(fitted["rk4"], 4, delta=0.2)
+        self.assertIn("rk4", study.report(results))
+
+    def test_unknown_method_raises_error(self):
+        with self.assertRaises(ValueError):
+            study.run(methods=["leapfrog"])
+
+
+if __name__ == "__main__":
+    unittest.main()
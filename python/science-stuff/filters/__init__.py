@@ -1,13 +1,33 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-Filters for the datasets. Natively implemented are the Kalman filter and
-a single-pole low-pass filter.
+Filters for the datasets. Natively implemented are the Kalman filter,
+a single-pole low-pass filter, the running median and Hampel filters
+and a family of windowed smoothing filters (moving average,
+Savitzky-Golay and exponentially weighted mean and variance).
+
+Hits in the filtered data, and the decaying exponentials fitted to
+them, are found with the hits module.
 
 There is also a base filter class created for subclassing to allow the
 creation of custom filters.
+
+The filters can be computed with vectorised or compiled backends, which
+are checked against the reference filters, through the backends module.
+
+One series can be run through many filter configurations at once,
+sharing a single copy of it between processes, with the fanout module.
+
+Time spent in each filter, and the samples it processes, can be
+recorded by enabling the instrument module.
 """
+from . import backends
+from . import fanout
+from . import hits
+from . import instrument
 from . import kalman
 from . import lowpass
+from . import median
+from . import smoothing
 __author__ = "Toby James and Alex Bombrun"
 __version__ = "0.1.0"
@@ -0,0 +1,206 @@
+"""
+Compute backends for the filters.
+
+Each filter's generator, FilterData._filter, is the reference
+implementation. A backend provides kernels which compute the whole
+filtered series at once and must agree with the reference. The
+backends are:
+
+    python: the reference generators.
+
+    numpy:  vectorised kernels, using recurrence solvers and cumulative
+            sums in place of Python loops.
+
+    numba:  the filter loops compiled with numba. Only available if
+            numba is installed.
+
+Kernels are registered against a filter class with register() and
+only apply to instances whose _filter is the one they were registered
+against, so subclasses which change the filter fall back to their own
+reference implementation. A kernel may also return None to defer to
+the reference, for example for data it does not support.
+
+The backend is chosen per call, e.g. filter_data.save(backend="numpy"),
+or globally with set_default(). verify() and verify_registered() check
+the backends against the reference.
+"""
+import numpy as np
+from . import instrument
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+REFERENCE = "python"
+
+# Kernels for each backend, keyed by the filter class.
+_kernels = {REFERENCE: {}, "numpy": {}}
+
+if numba is not None:
+    _kernels["numba"] = {}
+    # Decorator used by the filter modules to compile their loops.
+    jit = numba.njit(nogil=True, cache=True)
+else:
+    jit = None
+
+_default = REFERENCE
+
+
+def register(backend, cls):
+    """
+    Decorator registering a kernel for a filter class.
+
+    A kernel accepts the filter object and its data as a numpy array,
+    and returns the filtered data as a numpy array, or None to defer to
+    the reference implementation.
+    """
+    def decorator(kernel):
+        _kernels[backend][cls] = kernel
+        return kernel
+    return decorator
+
+
+def available():
+    """Names of the backends which can be used."""
+    return list(_kernels)
+
+
+def get_default():
+    """The backend used when none is given."""
+    return _default
+
+
+def set_default(backend):
+    """Set the backend used when none is given."""
+    global _default
+    _default = _check(backend)
+
+
+def _check(backend):
+    if backend not in _kernels:
+        raise(ValueError("Backend %r is not available. Choose from %r."
+                         % (backend, available())))
+    return backend
+
+
+def kernel_for(filter_data, backend):
+    """
+    The kernel of the given backend for a filter object, or None if
+    the reference implementation must be used.
+    """
+    kernels = _kernels[_check(backend)]
+    for cls in type(filter_data).__mro__:
+        if cls in kernels:
+            # Only valid if the filter has not been overridden.
+            if type(filter_data)._filter is cls._filter:
+                return kernels[cls]
+            return None
+    return None
+
+
+def reference(filter_data):
+    """The filtered data from the reference implementation."""
+    return np.fromiter(filter_data._filter(filter_data._data), dtype=float,
+                       count=len(filter_data._data))
+
+
+def run(filter_data, backend=None):
+    """
+    Accepts:
+
+        A FilterData object.
+
+    Kwargs:
+
+        backend (str, default=get_default()):
+            The backend to compute the filtered data with.
+
+    Returns:
+
+        The filtered data as a numpy array.
+    """
+    if backend is None:
+        backend = _default
+    kernel = kernel_for(filter_data, backend)
+    with instrument.stage(filter_data, "filter", len(filter_data._data)):
+        if kernel is not None:
+            filtered = kernel(filter_data, np.asarray(filter_data._data,
+                                                      dtype=float))
+            if filtered is not None:
+                return filtered
+        return reference(filter_data)
+
+
+def verify(filter_data, backends=None, rtol=1e-9, atol=1e-9):
+    """
+    Accepts:
+
+        A FilterData object.
+
+    Checks every backend against the reference implementation.
+
+    Kwargs:
+
+        backends (list, default=available()):
+            The backends to check.
+
+        rtol, atol (float, default=1e-9):
+            The relative and absolute tolerances, as in np.allclose.
+            Missing values must match exactly.
+
+    Returns:
+
+        A dictionary of the largest absolute difference from the
+        reference for each backend. A value missing from only one of
+        the two, or a different shape, counts as an infinite
+        difference.
+
+    Raises:
+
+        AssertionError if any backend disagrees with the reference.
+    """
+    if backends is None:
+        backends = available()
+    expected = reference(filter_data)
+    differences = {}
+    failures = []
+    for backend in backends:
+        filtered = run(filter_data, backend)
+        if filtered.shape != expected.shape:
+            failures.append(backend)
+            differences[backend] = float("inf")
+            continue
+        if not np.allclose(filtered, expected, rtol=rtol, atol=atol,
+                           equal_nan=True):
+            failures.append(backend)
+        # Missing values in only one of the two count as infinitely far
+        # apart. Only those missing in both are skipped.
+        with np.errstate(invalid="ignore"):
+            difference = np.where(np.isnan(filtered) != np.isnan(expected),
+                                  np.inf, np.abs(filtered - expected))
+        differences[backend] = float(np.nanmax(difference, initial=0.))
+    if failures:
+        raise(AssertionError("%s backend(s) %r disagree with the reference,"
+                             " largest differences %r."
+                             % (filter_data.name, failures, differences)))
+    return differences
+
+
+def verify_registered(data, rtol=1e-9, atol=1e-9):
+    """
+    Accepts:
+
+        An array.
+
+    Runs verify() for every filter class with a registered kernel,
+    each set up with its default settings on the given data.
+
+    Returns:
+
+        A dictionary of the results of verify(), keyed by the name of
+        the filter class.
+    """
+    classes = {cls for kernels in _kernels.values() for cls in kernels}
+    return {cls.name: verify(cls(data), rtol=rtol, atol=atol)
+            for cls in sorted(classes, key=lambda cls: cls.name)}
@@ -0,0 +1,263 @@
+"""
+Benchmarks for the filters.
+
+Measures the throughput, in samples per second, and the peak memory
+allocated by FilterData, KalmanData, ExtendedKalmanData and
+LowPassData for each combination of:
+
+    input size:     1e3 to 1e6 samples by default, up to 1e8 if asked.
+
+    input type:     list, array.array, numpy ndarray and pandas
+                    DataFrame.
+
+    access pattern: construction, save(), to_pandas(), slicing and
+                    arithmetic.
+
+save() is measured once for each compute backend.
+
+Run from the directory containing the package as:
+
+    python -m filters.benchmark --output results.json
+
+and compare two sets of results with:
+
+    python -m filters.benchmark --compare old.json new.json
+
+Throughput is the best of several timed runs. Peak memory is measured
+in a separate run under tracemalloc, since tracing slows the code down.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import time
+import tracemalloc
+from array import array
+import numpy as np
+import pandas as pd
+from . import __version__
+from . import backends
+from . import filter_base
+from . import kalman
+from . import lowpass
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+# Settings are fixed so that no time is spent estimating them.
+FILTERS = {"FilterData": (filter_base.FilterData, {}),
+           "KalmanData": (kalman.KalmanData, dict(q=0.1, r=1.)),
+           "ExtendedKalmanData": (kalman.ExtendedKalmanData,
+                                  dict(q=0.1, r=1.)),
+           "LowPassData": (lowpass.LowPassData, dict(cutoff=0.1))}
+
+# Filters which step through the samples in Python are only measured
+# up to these sizes, as larger runs take minutes each.
+LARGEST = {"ExtendedKalmanData": 10 ** 5}
+
+INPUTS = {"list": lambda data: data.tolist(),
+          "array": lambda data: array('d', data),
+          "ndarray": lambda data: data,
+          "DataFrame": lambda data: pd.DataFrame(dict(
+              time=np.arange(len(data), dtype=float), y=data))}
+
+
+def _construct(cls, settings, data):
+    # Construction from a DataFrame reports the column it indexes by.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return cls(data, **settings)
+
+
+def _access_patterns():
+    """
+    The access patterns measured, as functions of the filter class,
+    its settings and the input data. Each function sets up anything it
+    needs and returns the operation to be timed.
+    """
+    def construct(cls, settings, data):
+        return lambda: _construct(cls, settings, data)
+
+    def save(backend):
+        def setup(cls, settings, data):
+            filtered = _construct(cls, settings, data)
+            return lambda: filtered.save(backend=backend)
+        return setup
+
+    def to_pandas(cls, settings, data):
+        filtered = _construct(cls, settings, data)
+        return lambda: filtered.to_pandas()
+
+    def slicing(cls, settings, data):
+        filtered = _construct(cls, settings, data)
+        return lambda: filtered[len(filtered) // 4:3 * len(filtered) // 4]
+
+    def arithmetic(cls, settings, data):
+        filtered = _construct(cls, settings, data)
+        return lambda: (filtered + 1.) * 2. - filtered
+
+    patterns = {"construct": construct}
+    for backend in backends.available():
+        patterns["save[%s]" % backend] = save(backend)
+    patterns.update({"to_pandas": to_pandas, "slice": slicing,
+                     "arithmetic": arithmetic})
+    return patterns
+
+
+def measure(setup, repeat=3):
+    """
+    Accepts:
+
+        A function returning the operation to measure.
+
+    Kwargs:
+
+        repeat (int, default=3):
+            The number of timed runs.
+
+    Returns:
+
+        A tuple of the fastest time in seconds and the peak memory
+        allocated in bytes.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        operation = setup()
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+
+    operation = setup()
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes=SIZES, filters=None, inputs=None, patterns=None, repeat=3,
+        seed=0):
+    """
+    Kwargs:
+
+        sizes (iterable, default=SIZES):
+            The numbers of samples to benchmark with. Filters in
+            LARGEST are left out at sizes above their limit.
+
+        filters, inputs, patterns (iterable, default=None):
+            The names of the filters, input types and access patterns
+            to benchmark. If None, all are used.
+
+        repeat (int, default=3):
+            The number of timed runs of each benchmark.
+
+        seed (int, default=0):
+            Seeds the random input data.
+
+    Returns:
+
+        A dictionary of the environment and the results, ready to be
+        written as JSON.
+    """
+    all_patterns = _access_patterns()
+    filters = list(FILTERS) if filters is None else filters
+    inputs = list(INPUTS) if inputs is None else inputs
+    patterns = list(all_patterns) if patterns is None else patterns
+    generator = np.random.default_rng(seed)
+
+    results = []
+    for size in sizes:
+        raw = generator.normal(size=int(size))
+        for input_name in inputs:
+            data = INPUTS[input_name](raw)
+            for filter_name in filters:
+                if size > LARGEST.get(filter_name, size):
+                    continue
+                cls, settings = FILTERS[filter_name]
+                for pattern in patterns:
+                    seconds, peak = measure(
+                        lambda: all_patterns[pattern](cls, settings, data),
+                        repeat)
+                    results.append(dict(
+                        filter=filter_name, input=input_name,
+                        size=int(size), access=pattern, seconds=seconds,
+                        samples_per_second=int(size) / seconds,
+                        peak_bytes=peak))
+
+    return dict(version=__version__, python=platform.python_version(),
+                numpy=np.__version__, pandas=pd.__version__,
+                machine=platform.machine(), timestamp=time.time(),
+                results=results)
+
+
+def compare(old, new, tolerance=0.1):
+    """
+    Accepts:
+
+        Two sets of results from run().
+
+    Kwargs:
+
+        tolerance (float, default=0.1):
+            The fractional loss of throughput or gain in peak memory
+            reported as a regression.
+
+    Returns:
+
+        A list of dictionaries describing each regression.
+    """
+    def key(result):
+        return (result["filter"], result["input"], result["size"],
+                result["access"])
+
+    previous = {key(result): result for result in old["results"]}
+    regressions = []
+    for result in new["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        throughput = (result["samples_per_second"] /
+                      before["samples_per_second"])
+        memory = result["peak_bytes"] / max(before["peak_bytes"], 1)
+        if throughput < 1 - tolerance or memory > 1 + tolerance:
+            regressions.append(dict(zip(("filter", "input", "size",
+                                         "access"), key(result)),
+                                    throughput_ratio=throughput,
+                                    memory_ratio=memory))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1],
+                                     prog="python -m filters.benchmark")
+    parser.add_argument("--sizes", nargs="+", type=float, default=SIZES,
+                        help="numbers of samples, e.g. 1e3 1e8")
+    parser.add_argument("--filters", nargs="+", choices=list(FILTERS))
+    parser.add_argument("--inputs", nargs="+", choices=list(INPUTS))
+    parser.add_argument("--patterns", nargs="+",
+                        choices=list(_access_patterns()))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="report regressions between two result files")
+    arguments = parser.parse_args(argv)
+
+    if arguments.compare:
+        with open(arguments.compare[0]) as old, \
+                open(arguments.compare[1]) as new:
+            regressions = compare(json.load(old), json.load(new))
+        print(json.dumps(regressions, indent=2))
+        return
+
+    results = run(arguments.sizes, arguments.filters, arguments.inputs,
+                  arguments.patterns, arguments.repeat)
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
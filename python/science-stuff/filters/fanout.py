@@ -0,0 +1,146 @@
+"""
+Running one series through many filter configurations at once.
+
+The series is validated and copied once into shared memory as a
+SharedSeries. Each configuration is then run on a process pool by a
+filter object built over a read-only view of that memory, so however
+many configurations run there is only one copy of the input. The
+filtered series are written into a second shared block, one row per
+configuration.
+
+    with fanout.SharedSeries(data) as series:
+        filtered = fanout.fan_out(series, [
+            (kalman.KalmanData, dict(q=0.1, r=1.)),
+            (kalman.KalmanData, dict(q=0.01, r=1.)),
+            (lowpass.LowPassData, dict(cutoff=0.1), True)])
+
+A configuration is a tuple of the filter class, a dictionary of its
+settings and optionally True to run the filter backwards. The classes
+and settings must be picklable.
+"""
+import gc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from . import backends
+from . import filter_base
+
+
+class SharedSeries():
+    """
+    A series of real values held once in shared memory.
+    """
+    def __init__(self, data_array):
+        """
+        Accepts:
+
+            An array, validated as by FilterData.
+        """
+        data = np.asarray(filter_base.FilterData._as_array(data_array),
+                          dtype=float)
+        self._length = len(data)
+        # Shared memory blocks cannot be empty.
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=max(data.nbytes, 8))
+        np.ndarray(self._length, buffer=self._memory.buf)[:] = data
+
+    def __len__(self):
+        return self._length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    @property
+    def name(self):
+        """The name of the shared memory block."""
+        return self._memory.name
+
+    def close(self):
+        """Release the shared memory. The series can't be used after."""
+        self._memory.close()
+        self._memory.unlink()
+
+
+def _view(memory, length):
+    """A read-only memoryview of the first length doubles in a block."""
+    # The block may be larger than asked for, rounded up to a page.
+    return memory.buf.cast("d")[:length].toreadonly()
+
+
+def _filtered(data, configuration, backend):
+    """The filtered data for one configuration."""
+    cls, settings, *direction = configuration
+    backwards = bool(direction and direction[0])
+    filter_data = cls(data, **settings)
+    if backwards:
+        filter_data.reverse()
+    filtered = backends.run(filter_data, backend)
+    return filtered[::-1] if backwards else filtered
+
+
+def _run(name, length, configuration, backend, output_name, row):
+    """Run one configuration in a worker, writing to its output row."""
+    memory = shared_memory.SharedMemory(name=name)
+    output = shared_memory.SharedMemory(name=output_name)
+    rows = np.ndarray((row + 1, length), buffer=output.buf)
+    rows[row] = _filtered(_view(memory, length), configuration, backend)
+    del rows
+    # The filter's generators refer back to it, so it is only freed by
+    # the garbage collector. Every view must be gone before the shared
+    # memory can be closed.
+    gc.collect()
+    memory.close()
+    output.close()
+
+
+def fan_out(series, configurations, backend=None, executor=None):
+    """
+    Accepts:
+
+        A SharedSeries, or an array to be copied into one for the
+        duration of the call, and an iterable of configurations.
+
+    Runs every configuration over the series concurrently.
+
+    Kwargs:
+
+        backend (str, default=backends.get_default()):
+            The backend each filter is computed with.
+
+        executor (concurrent.futures.Executor, default=None):
+            The process pool to run the configurations on. If None, a
+            ProcessPoolExecutor is created for the call.
+
+    Returns:
+
+        A numpy array with a row of filtered data for each
+        configuration, in order.
+    """
+    configurations = list(configurations)
+    owned = not isinstance(series, SharedSeries)
+    if owned:
+        series = SharedSeries(series)
+    length = len(series)
+    output = shared_memory.SharedMemory(
+        create=True, size=max(len(configurations) * length * 8, 8))
+    pool = ProcessPoolExecutor() if executor is None else executor
+    try:
+        futures = [pool.submit(_run, series.name, length, configuration,
+                               backend, output.name, row)
+                   for row, configuration in enumerate(configurations)]
+        for future in futures:
+            future.result()
+        filtered = np.ndarray((len(configurations), length),
+                              buffer=output.buf).copy()
+    finally:
+        if executor is None:
+            pool.shutdown()
+        output.close()
+        output.unlink()
+        if owned:
+            series.close()
+    return filtered
@@ -1,6 +1,13 @@
+import asyncio
 import numpy as np
 import pandas as pd
 from array import array
+from functools import partial
+from itertools import islice
+from math import nan
+from numbers import Real
+from . import backends
+from . import instrument
 
 
 class FilterData():
@@ -9,6 +16,9 @@ class FilterData():
     Subclass this and apply custom filter methods.
     """
     name = "FilterData"
+    # Whether the filter can run on a stream of chunks, rather than
+    # needing the whole series at once.
+    streamable = True
     # ----special methods------------------------------------------------------
 
     def __init__(self, data_array, save=False):
@@ -18,14 +28,25 @@ class FilterData():
             An array.
 
         Can be initialised with any iterable array of real numerical
-        values.
+        values. Missing values may be given as None or NaN; the filters
+        carry their state across them rather than requiring the gaps to
+        be filled beforehand.
+
+        A one dimensional memoryview of doubles, such as a view of the
+        shared memory used by the fanout module, is used in place
+        rather than copied.
 
         Kwargs:
 
             save(bool, default=False):
                 If True, saves the filtered data to self.data on
                 initialisation. If False, doesn't. This saves memory.
+
+        If instrumentation is enabled, self.stats records the time
+        spent in each stage. Otherwise it is None. See the instrument
+        module.
         """
+        self.stats = instrument.new_stats()
         # Check if data was initialised from pandas dataframe.
         self._initialised_from_pandas = False
         # If data_array can be iterated over, iterate over it a
@@ -34,21 +55,13 @@ class FilterData():
 
             if isinstance(data_array, pd.DataFrame):
                 # This is delegated to self._from_pandas().
-                self._from_pandas(data_array)
+                with instrument.stage(self, "pandas"):
+                    self._from_pandas(data_array)
                 self._initialised_from_pandas = True
 
-            elif all(isinstance(data_point,
-                                (int, float)) for data_point in data_array):
-                # Check that each element is a real number.
-                self._data = array('d', data_array)
-
-            else:  # Isolate the issue with the data and raise TypeError.
-                for data_point in data_array:
-                    if not isinstance(data_point, (int, float)):
-                        break
-                raise(TypeError("Data type %r is not supported. Please supply"
-                                " an iterable of numerical values." %
-                                type(data_point)))
+            else:
+                with instrument.stage(self, "validate"):
+                    self._data = FilterData._as_array(data_array)
 
         else:
             raise(TypeError("Data type %r is not supported. Please supply an"
@@ -56,14 +69,16 @@ class FilterData():
                             type(data_array)))
 
         # Set up filtered data generator.
-        self._filter_data = self._filter(self._data)
+        self._filter_data = self._filtered(self._data)
 
         if save:
             # Saves data as an array rather than as a generator. More
             # resource heavy but can be useful nonetheless.
-            self.data = array('d', self._filter(self._data))
+            self.data = array('d', self._filtered(self._data))
         else:
             self.data = None
+        # Whether self.data matches the filter's current settings.
+        self._saved_current = save
 
         # private variables----------------------------------------------------
         if not self._initialised_from_pandas:
@@ -93,7 +108,7 @@ class FilterData():
         Apply filter to selected regions.
         Returns a list rather than a generator.
         """
-        return array('d', self._filter(self._data[index]))
+        return array('d', self._filtered(self._data[index]))
 
     # Comparison operators:
     # -------------------------------------
@@ -116,27 +131,27 @@ class FilterData():
 
     @checkdatatype
     def __eq__(self, other):
-        return self._data == other._data
+        return self._values() == other._values()
 
     @checkdatatype
     def __gt__(self, other):
-        return self._data > other._data
+        return self._values() > other._values()
 
     @checkdatatype
     def __ge__(self, other):
-        return self._data >= other._data
+        return self._values() >= other._values()
 
     @checkdatatype
     def __lt__(self, other):
-        return self._data < other._data
+        return self._values() < other._values()
 
     @checkdatatype
     def __le__(self, other):
-        return self._data <= other._data
+        return self._values() <= other._values()
 
     def __ne__(self, other):
         if isinstance(other, FilterData):
-            return self._data != other._data
+            return self._values() != other._values()
         else:
             return True
     # --------------------------------------
@@ -193,10 +208,12 @@ class FilterData():
         Allows subtraction of scalars and (elementwise) arrays of equal length
         to self.
         """
-        if hasattr(other, "__iter__") and not isinstance(other, str):
-            return self + [(-1) * b for b in other]
-        elif isinstance(other, (float, int, FilterData)):
+        # FilterData is checked first since iterating over it gives
+        # the filtered rather than the raw data.
+        if isinstance(other, (float, int, FilterData)):
             return self + (-1) * other
+        elif hasattr(other, "__iter__") and not isinstance(other, str):
+            return self + [(-1) * b for b in other]
         else:
             raise(TypeError("Unable to broadcast together operands of type "
                             "%r and %r." % (type(self), type(other))))
@@ -209,13 +226,13 @@ class FilterData():
         if isinstance(other, (float, int)):
             return type(self)([a/other for a in self._data])
 
+        elif isinstance(other, FilterData) and len(self) == len(other):
+            return type(self)([a / b for a, b in zip(self._data, other._data)])
+
         elif hasattr(other, "__iter__") and not isinstance(other, str) and \
                 len(self) == len(other):
             return type(self)([a / b for a, b in zip(self._data, other)])
 
-        elif isinstance(other, FilterData) and len(self) == len(other):
-            return type(self)([a / b for a, b in zip(self._data, other._data)])
-
         else:
             raise(TypeError("Unable to divide type %r by type %r."
                             % (type(self), type(other))))
@@ -228,10 +245,59 @@ class FilterData():
     def __call__(self):  # Allow easy iteration over generated data.
         """Returns a generator for the filtered data."""
         return next(self._filter_data)
+
+    def __iter__(self):
+        """
+        Returns an independent cursor over the filtered data.
+
+        If the filtered data has been saved since the filter was last
+        reset, the cursor reads from self.data. Otherwise it is a fresh
+        filter generator with its own state. Either way, cursors share
+        nothing mutable with each other or with self(), so several
+        threads can each read the filtered data through their own
+        cursor without locking.
+        """
+        saved = self.data
+        if saved is not None and self._saved_current:
+            return iter(saved)
+        return self._filtered(self._data)
     # -------------------------------------------------------------------------
 
     # Private methods and variables (so far as python allows)------------------
 
+    @staticmethod
+    def _as_array(data_array):
+        """
+        Check that each element is a real number or missing and return
+        them as an array. Missing values are stored as NaN.
+        """
+        if isinstance(data_array, memoryview) and data_array.ndim == 1 and \
+                data_array.format == "d":
+            # Already an array of doubles, so share it rather than copy.
+            return data_array
+
+        if isinstance(data_array, np.ndarray) and data_array.ndim == 1 and \
+                data_array.dtype.kind in "biuf":
+            # Already known to be real numbers, so copy the buffer
+            # rather than checking each element.
+            converted = array('d')
+            converted.frombytes(np.ascontiguousarray(data_array,
+                                                     dtype=float).tobytes())
+            return converted
+
+        if all(isinstance(data_point, (Real, type(None)))
+               for data_point in data_array):
+            return array('d', (nan if data_point is None else data_point
+                               for data_point in data_array))
+
+        # Isolate the issue with the data and raise TypeError.
+        for data_point in data_array:
+            if not isinstance(data_point, (Real, type(None))):
+                break
+        raise(TypeError("Data type %r is not supported. Please supply"
+                        " an iterable of numerical values." %
+                        type(data_point)))
+
     def _from_pandas(self, df):
         """
         Create FilterData object from pandas dataframe.
@@ -261,9 +327,37 @@ class FilterData():
     @staticmethod
     def _var(data_array, samples):
         # Really trivial function, gets an estimate for the noise on the
-        # data by observing the first samples.
+        # data by observing the first samples. Missing values are
+        # ignored.
         """Variance of the data."""
-        return np.var(data_array[0:samples])
+        return np.nanvar(data_array[0:samples])
+
+    def _values(self):
+        """
+        The data as an array('d'), copying it if it is held in a
+        memoryview, which can't be ordered or outlive its buffer.
+        """
+        if isinstance(self._data, memoryview):
+            return array('d', self._data)
+        return self._data
+
+    @staticmethod
+    def _first_valid(data_array):
+        """
+        The first datapoint which is not missing, used to start the
+        filters. NaN if all are missing.
+        """
+        for data_point in data_array:
+            if data_point == data_point:  # False only for NaN.
+                return data_point
+        return nan
+
+    def _filtered(self, data_array):
+        """
+        The filter generator for the given data, counted if
+        instrumentation is enabled.
+        """
+        return instrument.counted(self, self._filter(data_array))
 
     @staticmethod
     def _filter(data_array):
@@ -280,20 +374,43 @@ class FilterData():
 
     # Public methods-----------------------------------------------------------
     def reset(self):
-        """Resets the generator."""
-        self._filter_data = self._filter(self._data)
+        """
+        Resets the generator. Any saved filtered data is kept in
+        self.data, but may no longer match the filter's settings, so
+        is not read by new cursors until the data is saved again.
+        """
+        self._filter_data = self._filtered(self._data)
+        self._saved_current = False
 
     def reverse(self):
         """Reverse the order of the data to run the filter backwards."""
-        self._data = array('d', reversed(self._data))
+        if isinstance(self._data, memoryview):
+            self._data = self._data[::-1]  # Reversed without a copy.
+        else:
+            self._data = array('d', reversed(self._data))
         self._rev = not self._rev  # Binary switch.
+        self.reset()
 
-    def save(self):
-        """Saves the filtered data to a variable - self.data."""
+    def save(self, backend=None):
+        """
+        Saves the filtered data to a variable - self.data.
+
+        Kwargs:
+
+            backend (str, default=backends.get_default()):
+                The backend to compute the filtered data with. See the
+                backends module.
+        """
         # Reset first to ensure the generator starts from the first
         # datapoint.
         self.reset()
-        self.data = array('d', self._filter_data)
+        if backend is None:
+            backend = backends.get_default()
+        if backend == backends.REFERENCE:
+            self.data = array('d', self._filter_data)
+        else:
+            self.data = FilterData._as_array(backends.run(self, backend))
+        self._saved_current = True
 
     def to_pandas(self, time=None, columns=None):
         """
@@ -341,14 +458,16 @@ class FilterData():
             # If not, use an array.
             indices = np.linspace(0, len(self._data)-1, len(self._data))
 
-        # Generate dataframe.
-        sorted_df = pd.DataFrame(index=indices, data=dict(time=time, y=y))
+        with instrument.stage(self, "pandas"):
+            # Generate dataframe.
+            sorted_df = pd.DataFrame(index=indices,
+                                     data=dict(time=time, y=self.data))
 
-        # If the initial data was created from a pandas dataframe, the
-        # indices may now be out of order due to sorting by time.
-        # Sort the dataframe by index to allow the data to be more
-        # comparable with the original dataframe.
-        df = sorted_df.sort_index()
+            # If the initial data was created from a pandas dataframe,
+            # the indices may now be out of order due to sorting by
+            # time. Sort the dataframe by index to allow the data to be
+            # more comparable with the original dataframe.
+            df = sorted_df.sort_index()
 
         return df
 
@@ -371,4 +490,105 @@ class FilterData():
         return cls(return_df)
 
     def copy(self):
-        return type(self)(self._data)
+        # Data adopted from a memoryview, such as shared memory, is
+        # copied so that the copy doesn't depend on the buffer.
+        return type(self)(self._values())
+
+    @classmethod
+    async def stream(cls, chunks, *args, executor=None, **kwargs):
+        """
+        Accepts:
+
+            An async iterable of chunks of data.
+
+        Filters a stream of data chunk by chunk, carrying the filter's
+        state from each chunk to the next, for use as:
+
+            async for filtered in KalmanData.stream(chunks, q=q, r=r):
+                ...
+
+        The filter is set up from the first chunk, so any settings
+        estimated from the data (such as q and r for KalmanData) are
+        estimated from it alone. Filters which need the whole series
+        at once, such as SavitzkyGolayData, cannot be streamed and
+        raise a TypeError.
+
+        The next chunk is only read once the previous filtered chunk
+        has been consumed, so a slow consumer holds back the producer
+        rather than letting chunks queue up.
+
+        Kwargs:
+
+            executor (concurrent.futures.Executor, default=None):
+                The executor that validates and filters each chunk,
+                keeping that work off the event loop. If None, the
+                event loop's default executor is used.
+
+            Any other arguments are passed to the constructor.
+
+        Yields:
+
+            A numpy array of the filtered data for each chunk.
+        """
+        if not cls.streamable:
+            raise(TypeError("%s needs the whole series at once, so cannot"
+                            " be streamed." % cls.name))
+        loop = asyncio.get_running_loop()
+        feed = None
+        filtered = None
+        async for chunk in chunks:
+            if feed is None:
+                instance = await loop.run_in_executor(
+                    executor, partial(cls, chunk, *args, **kwargs))
+                feed = _ChunkFeed(instance._data)
+                filtered = instance._filtered(feed)
+            else:
+                feed.push(await loop.run_in_executor(
+                    executor, FilterData._as_array, chunk))
+            yield await loop.run_in_executor(
+                executor, _take, filtered, len(feed.chunk))
+
+
+@backends.register("numpy", FilterData)
+def _numpy_filter(filter_data, data):
+    return data.copy()
+
+
+def _take(generator, n):
+    """The next n values of a generator as a numpy array."""
+    return np.fromiter(islice(generator, n), dtype=float, count=n)
+
+
+class _ChunkFeed():
+    """
+    The data passed to a streaming filter.
+
+    Behaves as a sequence of every datapoint streamed so far, but only
+    holds the current chunk. Filters read their data in order, so
+    earlier chunks are never needed again.
+    """
+    def __init__(self, chunk):
+        self.chunk = chunk
+        self._offset = 0
+
+    def __len__(self):
+        return self._offset + len(self.chunk)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if start < self._offset:
+                raise(ValueError("Datapoint %r has already been discarded."
+                                 % start))
+            return self.chunk[start - self._offset:stop - self._offset:step]
+        if index < 0:
+            index += len(self)
+        if index < self._offset:
+            raise(ValueError("Datapoint %r has already been discarded."
+                             % index))
+        return self.chunk[index - self._offset]
+
+    def push(self, chunk):
+        """Replace the current chunk with the next one."""
+        self._offset += len(self.chunk)
+        self.chunk = chunk
@@ -0,0 +1,228 @@
+"""
+Hit detection for filtered data.
+
+A hit is a run of consecutive samples above a threshold. Each hit is
+characterised by where it starts, peaks and ends, and by the decaying
+exponential
+
+    y = A exp(- t / tau)
+
+fitted to its tail, from the peak to the last sample above threshold,
+where t is measured from the peak. Taking the logarithm turns the fit
+into a straight line,
+
+    log(y) = log(A) - t / tau,
+
+which is solved by ordinary least squares for every hit at once from
+per-hit sums, with no loop over hits.
+
+Hits are returned as a numpy structured array with the fields:
+
+    start:      index of the first sample above threshold.
+    peak:       index of the highest sample.
+    end:        index one past the last sample above threshold.
+    height:     value at the peak, relative to the baseline.
+    amplitude:  fitted A, relative to the baseline.
+    decay:      fitted decay constant, tau. NaN if the tail is too
+                short or does not decay.
+
+HitDetector accepts data in chunks and carries unfinished hits over to
+the next chunk, so arbitrarily long filtered series can be processed
+without being held in memory.
+"""
+from itertools import islice
+import numpy as np
+
+HIT_DTYPE = np.dtype([("start", np.int64),
+                      ("peak", np.int64),
+                      ("end", np.int64),
+                      ("height", np.float64),
+                      ("amplitude", np.float64),
+                      ("decay", np.float64)])
+
+
+def find_hits(data, threshold, baseline=0., dt=1., offset=0):
+    """
+    Accepts:
+
+        An array.
+
+    Finds the hits in the data in a single vectorised pass.
+
+    Kwargs:
+
+        threshold (float):
+            The value above which samples are part of a hit.
+
+        baseline (float, default=0.):
+            The level the hits decay towards. Must be below the
+            threshold.
+
+        dt (float, default=1.):
+            The time step between samples, used to scale the decay
+            constant.
+
+        offset (int, default=0):
+            Added to the returned indices, for data which is part of a
+            longer series.
+
+    Returns:
+
+        A structured array of dtype HIT_DTYPE with one entry per hit.
+    """
+    if not threshold > baseline:
+        raise(ValueError("Threshold %r must be above the baseline %r."
+                         % (threshold, baseline)))
+    y = np.asarray(data, dtype=float) - baseline
+    above = y > threshold - baseline
+    edges = np.diff(np.concatenate(([False], above, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    hits = np.zeros(len(starts), dtype=HIT_DTYPE)
+    if not len(starts):
+        return hits
+
+    # Heights are the maxima over each [start, end) run. The gaps
+    # between runs are reduced too and discarded.
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[::2] = starts
+    bounds[1::2] = ends
+    heights = np.maximum.reduceat(np.append(y, 0.), bounds)[::2]
+
+    # Label each sample above threshold with the index of its hit and
+    # take the first sample of each hit which reaches its height.
+    positions = np.flatnonzero(above)
+    labels = np.repeat(np.arange(len(starts)), ends - starts)
+    at_peak = y[positions] == heights[labels]
+    _, first = np.unique(labels[at_peak], return_index=True)
+    peaks = positions[at_peak][first]
+
+    # Batched least squares for the log-linear tail of each hit.
+    tail = positions >= peaks[labels]
+    tail_labels = labels[tail]
+    t = (positions[tail] - peaks[tail_labels]) * dt
+    log_y = np.log(y[positions[tail]])
+    n = np.bincount(tail_labels, minlength=len(starts))
+    s_t = np.bincount(tail_labels, weights=t, minlength=len(starts))
+    s_y = np.bincount(tail_labels, weights=log_y, minlength=len(starts))
+    s_tt = np.bincount(tail_labels, weights=t * t, minlength=len(starts))
+    s_ty = np.bincount(tail_labels, weights=t * log_y, minlength=len(starts))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * s_ty - s_t * s_y) / (n * s_tt - s_t ** 2)
+        intercept = (s_y - slope * s_t) / n
+        decay = np.where(slope < 0, -1 / slope, np.nan)
+
+    hits["start"] = starts + offset
+    hits["peak"] = peaks + offset
+    hits["end"] = ends + offset
+    hits["height"] = heights
+    hits["amplitude"] = np.where(n > 1, np.exp(intercept), heights)
+    hits["decay"] = decay
+    return hits
+
+
+class HitDetector():
+    """
+    Streaming hit detection over chunks of filtered data.
+    """
+# Special methods--------------------------------------------------------------
+    def __init__(self, threshold, baseline=0., dt=1.):
+        """
+        Accepts:
+
+            The threshold above which samples are part of a hit.
+
+        Kwargs:
+
+            baseline (float, default=0.):
+                The level the hits decay towards.
+
+            dt (float, default=1.):
+                The time step between samples.
+        """
+        if not threshold > baseline:
+            raise(ValueError("Threshold %r must be above the baseline %r."
+                             % (threshold, baseline)))
+        self._threshold = threshold
+        self._baseline = baseline
+        self._dt = dt
+        # Samples of a hit still in progress at the end of the last
+        # chunk and the index of the first of them.
+        self._pending = np.empty(0)
+        self._offset = 0
+# -----------------------------------------------------------------------------
+
+# Public methods --------------------------------------------------------------
+    def update(self, chunk):
+        """
+        Accepts:
+
+            The next chunk of data.
+
+        Returns:
+
+            The hits completed within the chunk.
+        """
+        data = np.concatenate((self._pending, np.asarray(chunk, dtype=float)))
+        # Hold back a hit which runs up to the end of the chunk, since
+        # it may continue into the next one.
+        below = np.flatnonzero(data <= self._threshold)
+        cut = below[-1] + 1 if len(below) else 0
+        hits = find_hits(data[:cut], self._threshold, self._baseline,
+                         self._dt, self._offset)
+        self._pending = data[cut:]
+        self._offset += cut
+        return hits
+
+    def flush(self):
+        """
+        Returns:
+
+            The hit in progress, if any, treating the data as ended.
+        """
+        hits = find_hits(self._pending, self._threshold, self._baseline,
+                         self._dt, self._offset)
+        self._offset += len(self._pending)
+        self._pending = np.empty(0)
+        return hits
+# -----------------------------------------------------------------------------
+
+
+def detect_hits(filter_data, threshold, baseline=0., dt=1.,
+                chunk_size=65536):
+    """
+    Accepts:
+
+        A FilterData object, such as KalmanData.
+
+    Runs the filter and finds the hits in its output chunk by chunk, so
+    the filtered data is never stored in full.
+
+    Kwargs:
+
+        threshold (float):
+            The value above which samples are part of a hit.
+
+        baseline (float, default=0.):
+            The level the hits decay towards.
+
+        dt (float, default=1.):
+            The time step between samples.
+
+        chunk_size (int, default=65536):
+            The number of filtered samples processed at a time.
+
+    Returns:
+
+        A structured array of dtype HIT_DTYPE with one entry per hit.
+    """
+    detector = HitDetector(threshold, baseline, dt)
+    filtered = filter_data._filtered(filter_data._data)
+    found = []
+    while True:
+        chunk = np.fromiter(islice(filtered, chunk_size), dtype=float)
+        if not len(chunk):
+            break
+        found.append(detector.update(chunk))
+    found.append(detector.flush())
+    return np.concatenate(found)
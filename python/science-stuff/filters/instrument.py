@@ -0,0 +1,187 @@
+"""
+Opt-in instrumentation for the filters.
+
+Once enabled, each filter object created gets a Stats object as its
+stats attribute, recording for each stage of its work:
+
+    validate:   checking and copying the data on construction.
+    estimate:   estimating settings from the data, such as q and r for
+                KalmanData or the cutoff for LowPassData.
+    filter:     running the filter, along with the number of samples.
+    pandas:     conversion from and to pandas dataframes.
+
+For each stage the total time, the number of times it ran and the net
+number of memory blocks it allocated are kept. Stages may contain each
+other; for example KalmanData estimates q and r once its filter has
+started.
+
+A hook is called as each stage completes and a metrics sink, if given,
+is sent its measurements. Both may also be used with Stats.export().
+
+While disabled, filter objects have stats set to None. The filters
+then run exactly as they would without this module: the filter
+generators are not wrapped, and each stage costs a single check when
+it starts.
+"""
+import sys
+from contextlib import nullcontext
+from time import perf_counter
+
+_enabled = False
+_hook = None
+_sink = None
+
+# Returned in place of a timer while disabled.
+_NULL = nullcontext()
+
+
+def enable(hook=None, sink=None):
+    """
+    Enable instrumentation for filter objects created from now on.
+
+    Kwargs:
+
+        hook (callable, default=None):
+            Called as hook(filter_data, stage, seconds, blocks) when a
+            stage completes.
+
+        sink (callable, default=None):
+            Called as sink(metric, value, tags) for each measurement
+            as a stage completes, where metric is a name such as
+            "filters.filter.seconds" and tags is a dictionary holding
+            the filter's name.
+    """
+    global _enabled, _hook, _sink
+    _enabled = True
+    _hook = hook
+    _sink = sink
+
+
+def disable():
+    """Disable instrumentation for filter objects created from now on."""
+    global _enabled, _hook, _sink
+    _enabled = False
+    _hook = None
+    _sink = None
+
+
+def enabled():
+    """Whether instrumentation is enabled."""
+    return _enabled
+
+
+class Stats():
+    """
+    Measurements for a single filter object.
+    """
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self.blocks = {}
+        self.samples = 0
+
+    def __repr__(self):
+        return "Stats(%r)" % self.as_dict()
+
+    def record(self, stage, seconds, blocks):
+        """Add a run of a stage."""
+        self.seconds[stage] = self.seconds.get(stage, 0.) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self.blocks[stage] = self.blocks.get(stage, 0) + blocks
+
+    def as_dict(self):
+        """The measurements as a dictionary."""
+        return dict(seconds=dict(self.seconds), calls=dict(self.calls),
+                    blocks=dict(self.blocks), samples=self.samples)
+
+    def export(self, sink, tags=None):
+        """
+        Send the totals to a metrics sink, called as
+        sink(metric, value, tags).
+        """
+        tags = {} if tags is None else tags
+        for stage in self.seconds:
+            sink("filters.%s.seconds" % stage, self.seconds[stage], tags)
+            sink("filters.%s.calls" % stage, self.calls[stage], tags)
+            sink("filters.%s.blocks" % stage, self.blocks[stage], tags)
+        sink("filters.samples", self.samples, tags)
+
+
+def new_stats():
+    """A Stats object if instrumentation is enabled, otherwise None."""
+    return Stats() if _enabled else None
+
+
+def _report(filter_data, stage, seconds, blocks, samples=None):
+    """Record a completed stage and pass it to the hook and sink."""
+    filter_data.stats.record(stage, seconds, blocks)
+    if samples is not None:
+        filter_data.stats.samples += samples
+    if _hook is not None:
+        _hook(filter_data, stage, seconds, blocks)
+    if _sink is not None:
+        tags = dict(filter=filter_data.name)
+        _sink("filters.%s.seconds" % stage, seconds, tags)
+        _sink("filters.%s.blocks" % stage, blocks, tags)
+        if samples is not None:
+            _sink("filters.samples", samples, tags)
+
+
+class _Stage():
+    def __init__(self, filter_data, name, samples):
+        self._filter_data = filter_data
+        self._name = name
+        self._samples = samples
+
+    def __enter__(self):
+        self._blocks = sys.getallocatedblocks()
+        self._start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = perf_counter() - self._start
+        _report(self._filter_data, self._name, seconds,
+                sys.getallocatedblocks() - self._blocks, self._samples)
+        return False
+
+
+def stage(filter_data, name, samples=None):
+    """
+    Context manager timing a stage of a filter object's work. Does
+    nothing if the object is not instrumented.
+    """
+    if getattr(filter_data, "stats", None) is None:
+        return _NULL
+    return _Stage(filter_data, name, samples)
+
+
+def counted(filter_data, generator):
+    """
+    Wrap a filter generator to time it and count its samples, if the
+    filter object is instrumented. Otherwise the generator is returned
+    as it is.
+    """
+    if getattr(filter_data, "stats", None) is None:
+        return generator
+    return _counted(filter_data, generator)
+
+
+def _counted(filter_data, generator):
+    seconds = 0.
+    blocks = 0
+    samples = 0
+    try:
+        while True:
+            before = sys.getallocatedblocks()
+            start = perf_counter()
+            try:
+                value = next(generator)
+            except StopIteration:
+                break
+            finally:
+                seconds += perf_counter() - start
+                blocks += sys.getallocatedblocks() - before
+            samples += 1
+            yield value
+    finally:
+        # Reached when the generator is exhausted or closed.
+        _report(filter_data, "filter", seconds, blocks, samples)
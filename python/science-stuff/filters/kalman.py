@@ -60,19 +60,45 @@ used without being committed to memory twice.
 
 Current implementation supports 1-dimensional data.
 
+   -----EXTENDED VERSION---------
+   for a nonlinear transition, f, and measurement, h, the matrices A
+   and H are replaced by the Jacobians of f and h:
+
+   time update----------------------------------------------------------
+   F = df/dx evaluated at x_pos
+
+   x_pri = f(x_pos)
+
+   P_pri = F @ P_pos @ F_T + Q
+   ---------------------------------------------------------------------
+
+   measurement update---------------------------------------------------
+   H = dh/dx evaluated at x_pri
+
+   K = P_pri @ H_T @ (H @ P_pri @ H_T + R) ^ (-1)
+
+   P_pos = (I - K @ H) @ P_pri
+
+   x_pos = x_pri + K @ (z - h(x_pri))
+   ---------------------------------------------------------------------
+
+The extended filter is implemented for a state of any dimension with a
+scalar measurement. Its arithmetic is vectorised over independent
+channels, so many series can be filtered with the same model at once
+with extended_kalman.
+
 References:
    kalmanfilter.net
    Welch G, Bishop G; An Introduction to the Kalman Filter; UNC; 1994.
 """
 import numpy as np
+from scipy import signal
+from . import backends
 from . import filter_base
+from . import instrument
 
-# TODO implement extended Kalman and use to identify decay pattern for
-# hits (assume exponential?).
-
-# TODO can you transform detected (and Kalman-cleaned?) hits into some
-# sort of linear space to get actual decaying exponential coefficents
-# using basic Kalman?
+# Hits in Kalman-cleaned data and their decaying exponential
+# coefficients are found by hits.detect_hits.
 
 # TODO decide on appropriate starting values for q and r.
 # TODO implement multiple dimensional Kalman.
@@ -108,6 +134,21 @@ class KalmanData(filter_base.FilterData):
 
 # Private methods--------------------------------------------------------------
 
+    def _noise(self, data_array, samples=50):
+        """
+        The variances q and r, as set or else estimated from the data.
+        """
+        with instrument.stage(self, "estimate"):
+            if self._q is not None:
+                q = self._q
+            else:
+                q = KalmanData._var(data_array, samples)
+            if self._r is not None:
+                r = self._r
+            else:
+                r = np.nanstd(np.abs(np.diff(self._data))) ** 2
+        return q, r
+
     def _kalman(self, data_array, r=None, q=None, samples=50):
         """
         Accepts:
@@ -141,13 +182,15 @@ class KalmanData(filter_base.FilterData):
         Yields:
 
             The next value as predicted by the Kalman filter algorithm.
+            Where a datapoint is missing (NaN), only the time update is
+            performed and the prediction is yielded.
         """
-        x = data_array[0]
+        x = KalmanData._first_valid(data_array)
         p = x**2
-        if q is None and self._q is not None:
-            q = self._q
-        elif q is None and self._q is None:
-            q = KalmanData._var(data_array, samples)
+        if q is None or r is None:
+            estimated_q, estimated_r = self._noise(data_array, samples)
+            q = estimated_q if q is None else q
+            r = estimated_r if r is None else r
         i = 0
         while True:
             p = p + q
@@ -155,10 +198,10 @@ class KalmanData(filter_base.FilterData):
                 z = data_array[i]
             except(IndexError):
                 break
-            if r is None and self._r is not None:
-                r = self._r
-            elif r is None and self._r is None:
-                r = np.std([abs(x) for x in np.diff(self._data)]) ** 2
+            if z != z:  # Missing datapoint, so no measurement update.
+                yield x
+                i += 1
+                continue
             K = p/(p+r)
             x = x + K * (z - x)
             p = (1-K)*p
@@ -168,3 +211,428 @@ class KalmanData(filter_base.FilterData):
     # Reassign _filter method to _kalman function.
     _filter = _kalman
 # -----------------------------------------------------------------------------
+
+
+# Backend kernels--------------------------------------------------------------
+@backends.register("numpy", KalmanData)
+def _numpy_kalman(filter_data, data):
+    """
+    The gain sequence does not depend on the data and settles to a
+    constant within a few steps. Once it has, the filter is a
+    first-order recurrence with constant coefficients, solved by
+    scipy.signal.lfilter.
+
+    With q = 0 the gain never settles, decaying as 1/n, but the filter
+    is then a weighted running mean with a closed form.
+    """
+    if np.isnan(data).any():
+        return None  # Gaps change the gain, so defer to the reference.
+    q, r = filter_data._noise(data)
+    filtered = np.empty(len(data))
+    if not len(data):
+        return filtered
+    x = data[0]
+    p = x**2
+    if q == 0 and r > 0:
+        return _static_kalman(data, x, p, r)
+    K_previous = None
+    i = 0
+    while i < len(data):
+        p = p + q
+        K = p/(p+r)
+        x = x + K * (data[i] - x)
+        p = (1-K)*p
+        filtered[i] = x
+        i += 1
+        if K_previous is not None and \
+                abs(K - K_previous) <= 4 * np.finfo(float).eps * abs(K):
+            break
+        K_previous = K
+    if i < len(data):
+        filtered[i:] = signal.lfilter([K], [1, K - 1], data[i:],
+                                      zi=[(1 - K) * x])[0]
+    return filtered
+
+
+def _static_kalman(data, x, p, r):
+    """
+    The Kalman filter with q = 0, for which
+
+        1 / p_n = 1 / p + n / r,   K_n = 1 / (c + n),   c = 1 + r / p
+
+    so that (c + n) x_n = (c + n - 1) x_(n-1) + z_n, and
+
+        x_n = (c - 1) x + z_0 + ... + z_n
+              ---------------------------
+                        c + n
+    """
+    if p == 0:
+        return np.full(len(data), x)  # No gain, so x never moves.
+    c = 1 + r / p
+    return ((c - 1) * x + np.cumsum(data)) / (c + np.arange(len(data)))
+
+
+if backends.jit is not None:
+    @backends.jit
+    def _kalman_loop(data, x, p, q, r):
+        filtered = np.empty(len(data))
+        for i in range(len(data)):
+            p = p + q
+            z = data[i]
+            if z == z:
+                K = p/(p+r)
+                x = x + K * (z - x)
+                p = (1-K)*p
+            filtered[i] = x
+        return filtered
+
+    @backends.register("numba", KalmanData)
+    def _numba_kalman(filter_data, data):
+        q, r = filter_data._noise(data)
+        x = float(KalmanData._first_valid(data))
+        return _kalman_loop(data, x, x**2, float(q), float(r))
+# -----------------------------------------------------------------------------
+
+
+def _finite_difference(func, x, step=None, points=None, out=None):
+    """
+    Jacobian of func at x by forward differences.
+
+    x has shape (channels, n). The base point and its n perturbations
+    are stacked and passed to func in a single call, so func must act
+    on the last axis of its argument. Returns shape
+    (channels, outputs, n), or (channels, n) for scalar outputs.
+
+    step, of shape (channels, n), points, of shape (n + 1, channels, n),
+    and out, of the shape returned, are workspaces written into in
+    place of allocating new arrays.
+    """
+    n = x.shape[-1]
+    if step is None:
+        step = np.empty(x.shape)
+    if points is None:
+        points = np.empty((n + 1,) + x.shape)
+    np.abs(x, out=step)
+    np.maximum(step, 1, out=step)
+    step *= np.sqrt(np.finfo(float).eps)
+    points[:] = x
+    for i in range(n):
+        points[i + 1, :, i] += step[:, i]
+    values = np.asarray(func(points), dtype=float)
+    if out is None:
+        out = np.empty(values.shape[1:] + (n,))
+    # differences is indexed (input, channel[, output]).
+    differences = np.moveaxis(out, -1, 0)
+    np.subtract(values[1:], values[0], out=differences)
+    differences /= step.T[(...,) + (None,) * (values.ndim - 2)]
+    return out
+
+
+def _extended_kalman_steps(z, transition, measurement, x0, p0, q, r,
+                           transition_jacobian=None,
+                           measurement_jacobian=None):
+    """
+    Generator for the extended Kalman filter over channels.
+
+    z is indexed by time step and gives a scalar or one measurement per
+    channel. x0 has shape (channels, n) and p0, q shape
+    (channels, n, n). Each step yields the posterior state, of shape
+    (channels, n), and its measurement, of shape (channels,). The
+    yielded state is updated in place by the following step.
+    """
+    x = np.array(x0, dtype=float)
+    # Workspaces allocated once and written into at every step.
+    P = np.array(p0, dtype=float)
+    channels, n = x.shape
+    F = np.empty_like(P)
+    FP = np.empty_like(P)
+    KHP = np.empty_like(P)
+    H = np.empty(x.shape)
+    PHt = np.empty(x.shape)
+    HP = np.empty(x.shape)
+    K = np.empty(x.shape)
+    S = np.empty(channels)
+    innovation = np.empty(channels)
+    step = np.empty(x.shape)
+    points = np.empty((n + 1,) + x.shape)
+    i = 0
+    while True:
+        try:
+            measured = z[i]
+        except(IndexError):
+            break
+
+        # Time update.
+        if transition_jacobian is None:
+            F = _finite_difference(transition, x, step, points, out=F)
+        else:
+            F = transition_jacobian(x)
+        x[:] = transition(x)
+        np.matmul(F, P, out=FP)
+        np.matmul(FP, np.swapaxes(F, -1, -2), out=P)
+        P += q
+
+        # Measurement update.
+        if measurement_jacobian is None:
+            H = _finite_difference(measurement, x, step, points, out=H)
+        else:
+            H = measurement_jacobian(x)
+        np.einsum("cij,cj->ci", P, H, out=PHt)
+        np.einsum("ci,cij->cj", H, P, out=HP)
+        np.einsum("ci,ci->c", H, PHt, out=S)
+        S += r
+        np.divide(PHt, S[:, None], out=K)
+        np.subtract(measured, measurement(x), out=innovation)
+        # Channels with a missing measurement keep their prediction.
+        missing = np.isnan(innovation)
+        if missing.any():
+            innovation[missing] = 0
+            K[missing] = 0
+        np.multiply(K[:, :, None], HP[:, None, :], out=KHP)
+        P -= KHP
+        K *= innovation[:, None]
+        x += K
+        yield x, measurement(x)
+        i += 1
+
+
+def extended_kalman(z, transition, measurement, x0, p0, q, r,
+                    transition_jacobian=None, measurement_jacobian=None):
+    """
+    Accepts:
+
+        An array of measurements, of shape (samples,) or
+        (samples, channels).
+
+    Performs the extended Kalman filter on every channel at once.
+
+    Params:
+
+        transition: f, mapping states of shape (..., n) to the next
+            states, of shape (..., n).
+
+        measurement: h, mapping states of shape (..., n) to
+            measurements, of shape (...).
+
+        x0: the initial state, of shape (n,) or (channels, n).
+
+        p0: the initial state covariance, of shape (n, n) or
+            (channels, n, n).
+
+        q: the process noise covariance, of shape (n, n) or
+           (channels, n, n).
+
+        r: the measurement noise variance, a scalar or one per
+           channel.
+
+    Missing measurements (NaN) get only the time update.
+
+    Kwargs:
+
+        transition_jacobian (default=None):
+            Maps states of shape (..., n) to df/dx, of shape
+            (..., n, n). If None, found by finite differences.
+
+        measurement_jacobian (default=None):
+            Maps states of shape (..., n) to dh/dx, of shape (..., n).
+            If None, found by finite differences.
+
+    Returns:
+
+        A tuple of the filtered measurements, shaped like z, and the
+        posterior states, of shape (samples, channels, n).
+    """
+    z = np.asarray(z, dtype=float)
+    measurements = z.reshape(len(z), -1)
+    channels = measurements.shape[1]
+    x0 = np.broadcast_to(np.asarray(x0, dtype=float),
+                         (channels, np.shape(x0)[-1]))
+    n = x0.shape[1]
+    p0 = np.broadcast_to(np.asarray(p0, dtype=float), (channels, n, n))
+    q = np.broadcast_to(np.asarray(q, dtype=float), (channels, n, n))
+    r = np.broadcast_to(np.asarray(r, dtype=float), (channels,))
+
+    filtered = np.empty(measurements.shape)
+    states = np.empty(measurements.shape + (n,))
+    for i, (x, y) in enumerate(_extended_kalman_steps(
+            measurements, transition, measurement, x0, p0, q, r,
+            transition_jacobian, measurement_jacobian)):
+        states[i] = x
+        filtered[i] = y
+    return filtered.reshape(z.shape), states
+
+
+class ExtendedKalmanData(filter_base.FilterData):
+    """
+    Extended Kalman filter implementation for nonlinear models.
+
+    For example, an exponential decay with unknown rate, lam, sampled
+    every dt has the state [y, lam] and:
+
+        transition = lambda x: np.stack((x[..., 0] *
+                                         np.exp(-x[..., 1] * dt),
+                                         x[..., 1]), axis=-1)
+
+        measurement = lambda x: x[..., 0]
+    """
+    name = "ExtendedKalmanData"
+
+    def __init__(self, *args, transition=None, measurement=None,
+                 transition_jacobian=None, measurement_jacobian=None,
+                 x0=None, p0=None, q=None, r=None):
+        """
+        Accepts:
+
+            An array.
+
+        Kwargs:
+
+            transition (default=None):
+                f, mapping states of shape (..., n) to the next states.
+                If None, the state is a random walk as in KalmanData.
+
+            measurement (default=None):
+                h, mapping states of shape (..., n) to measurements of
+                shape (...). If None, the first state component is
+                measured.
+
+            transition_jacobian, measurement_jacobian (default=None):
+                Analytic Jacobians of f and h. If None, found by finite
+                differences.
+
+            x0 (array-like, default=None):
+                The initial state. If None, the first datapoint.
+
+            p0 (array-like, default=None):
+                The initial state covariance. If None, x0 ^ 2 on the
+                diagonal, as in KalmanData.
+
+            q (float or array-like, default=None):
+                The process noise covariance, or a variance applied to
+                each state component. If None, estimated as in
+                KalmanData.
+
+            r (float, default=None):
+                The variance of the noise on the measured data. If
+                None, estimated as in KalmanData.
+        """
+        self._transition = transition
+        self._measurement = measurement
+        self._transition_jacobian = transition_jacobian
+        self._measurement_jacobian = measurement_jacobian
+        self._x0 = x0
+        self._p0 = p0
+        self._q = q
+        self._r = r
+        filter_base.FilterData.__init__(self, *args)
+
+# Public methods---------------------------------------------------------------
+    def tweak_q(self, q):
+        """Change the process noise covariance."""
+        self._q = q
+        self.reset()
+
+    def tweak_r(self, r):
+        """Change the variance of the noise on the measured value."""
+        self._r = r
+        self.reset()
+
+    def states(self):
+        """
+        Returns:
+
+            The posterior state at each sample, as an array of shape
+            (samples, n).
+        """
+        steps = self._steps(self._data)
+        if steps is None:
+            return np.empty((0, 0))
+        return np.array([x[0].copy() for x, _ in steps])
+# -----------------------------------------------------------------------------
+
+# Private methods--------------------------------------------------------------
+    @staticmethod
+    def _identity(x):
+        return x
+
+    @staticmethod
+    def _first_component(x):
+        return x[..., 0]
+
+    def _steps(self, data_array, samples=50):
+        """
+        Resolves the model and noise and returns the step generator for
+        a single channel, or None if there is no data.
+        """
+        if not len(data_array):
+            return None
+        transition = self._transition
+        transition_jacobian = self._transition_jacobian
+        if transition is None:
+            transition = ExtendedKalmanData._identity
+            if transition_jacobian is None:
+                transition_jacobian = (lambda x: np.broadcast_to(
+                    np.eye(x.shape[-1]), x.shape + x.shape[-1:]))
+        measurement = self._measurement
+        measurement_jacobian = self._measurement_jacobian
+        if measurement is None:
+            measurement = ExtendedKalmanData._first_component
+            if measurement_jacobian is None:
+                measurement_jacobian = (lambda x: np.broadcast_to(
+                    np.eye(x.shape[-1])[0], x.shape))
+
+        if self._x0 is None:
+            x0 = np.array([self._first_valid(data_array)], dtype=float)
+        else:
+            x0 = np.atleast_1d(np.asarray(self._x0, dtype=float))
+        n = len(x0)
+        if self._p0 is None:
+            p0 = np.diag(x0 ** 2)
+        else:
+            p0 = np.broadcast_to(np.asarray(self._p0, dtype=float), (n, n))
+        with instrument.stage(self, "estimate"):
+            if self._q is None:
+                q = self._var(data_array, samples) * np.eye(n)
+            elif np.ndim(self._q) == 0:
+                q = self._q * np.eye(n)
+            else:
+                q = np.asarray(self._q, dtype=float)
+            if self._r is None:
+                r = np.nanstd(np.abs(np.diff(self._data))) ** 2
+            else:
+                r = self._r
+
+        return _extended_kalman_steps(
+            data_array, transition, measurement, x0[None], p0[None],
+            q[None], np.array([r], dtype=float), transition_jacobian,
+            measurement_jacobian)
+
+    def _extended_kalman(self, data_array, samples=50):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the extended Kalman filter algorithm on the data.
+
+        Kwargs:
+
+            samples: (int, default=50):
+                The number of samples used to estimate q if it is not
+                given.
+
+        Yields:
+
+            The measurement of the state estimated by the extended
+            Kalman filter. Where a datapoint is missing (NaN), only
+            the time update is performed.
+        """
+        steps = self._steps(data_array, samples)
+        if steps is None:
+            return
+        for _, y in steps:
+            yield float(y[0])
+
+    # Reassign _filter method to _extended_kalman function.
+    _filter = _extended_kalman
+# -----------------------------------------------------------------------------
@@ -12,12 +12,17 @@ dependent on the cutoff frequency, f, and is defined as:
             2 pi dt f + 1
 
 where dt is the time step used.
+
+Missing datapoints (NaN) leave y unchanged, so the filter holds its
+state across gaps in the data.
 """
 
 import numpy as np
-import scipy
+from scipy import signal
 import pandas as pd
+from . import backends
 from . import filter_base
+from . import instrument
 
 
 class LowPassData(filter_base.FilterData):
@@ -31,15 +36,15 @@ class LowPassData(filter_base.FilterData):
         filter_base.FilterData.__init__(self, *args)
 
         # Set up private variables.
-        if self._obmt is not None:
+        if self._time is not None:
             self._dt = self._time[1] - self._time[0]
         else:
             self._dt = 1
         if isinstance(cutoff, (float, int)):
             self._cutoff = cutoff
         else:
-            print(self._data)
-            self._cutoff = self._get_frequency_from_psd(self._data)
+            with instrument.stage(self, "estimate"):
+                self._cutoff = self._get_frequency_from_psd(self._data)
 
         self._alpha = (2 * np.pi * self._dt * self._cutoff)/(2 * np.pi *
                                                              self._dt *
@@ -59,26 +64,60 @@ class LowPassData(filter_base.FilterData):
         if alpha is None:
             alpha = self._alpha
 
-        x = data_array[0]
+        x = LowPassData._first_valid(data_array)
         i = 0
         while True:
             try:
-                x += alpha * (data_array[i] - x)
+                z = data_array[i]
             except(IndexError):
                 break
+            if z == z:  # Hold the state over missing (NaN) datapoints.
+                x += alpha * (z - x)
             yield x
             i += 1
 
-    def _get_frequency_from_psd(data):
+    def _get_frequency_from_psd(self, data):
 
         f = self._dt ** (-1)
 
         d = pd.DataFrame()
 
-        d['freqs'], d['psd'] = scipy.signal.welch(data, fs=f)
+        # Missing datapoints are dropped for the spectral estimate.
+        data = np.asarray(data)
+        d['freqs'], d['psd'] = signal.welch(data[~np.isnan(data)], fs=f)
 
         return d[d['psd'] == max(d['psd'])]['freqs'].tolist()[0]
 
 # Reassign _filter to _low_pass
     _filter = _low_pass
 # -----------------------------------------------------------------------------
+
+
+# Backend kernels--------------------------------------------------------------
+@backends.register("numpy", LowPassData)
+def _numpy_low_pass(filter_data, data):
+    if np.isnan(data).any():
+        return None  # Held state over gaps isn't a plain recurrence.
+    if not len(data):
+        return np.empty(0)
+    alpha = filter_data._alpha
+    return signal.lfilter([alpha], [1, alpha - 1], data,
+                          zi=[(1 - alpha) * data[0]])[0]
+
+
+if backends.jit is not None:
+    @backends.jit
+    def _low_pass_loop(data, x, alpha):
+        filtered = np.empty(len(data))
+        for i in range(len(data)):
+            z = data[i]
+            if z == z:
+                x += alpha * (z - x)
+            filtered[i] = x
+        return filtered
+
+    @backends.register("numba", LowPassData)
+    def _numba_low_pass(filter_data, data):
+        return _low_pass_loop(data, float(LowPassData._first_valid(data)),
+                              float(filter_data._alpha))
+# -----------------------------------------------------------------------------
@@ -0,0 +1,336 @@
+"""
+Running median and Hampel filter implementation in Python.
+
+The running median replaces each point with the median of the trailing
+window of the last w measurements:
+
+    y_n = median(x_(n-w+1), ..., x_n)
+
+The Hampel filter uses the same window to reject outliers. A point is
+replaced by the window median when it lies more than n_sigmas robust
+standard deviations from it:
+
+    |x_n - median| > n_sigmas * 1.4826 * MAD
+
+where MAD is the median absolute deviation of the window. Otherwise the
+point is passed through unchanged.
+
+Both filters are nonlinear and so are well suited to data contaminated
+with isolated spikes, which the linear filters smear out rather than
+remove. Missing datapoints (NaN) are left out of the window and
+replaced by the median of the remaining samples.
+
+The window is held in an indexable skip list, so adding the newest
+sample, dropping the oldest and reading the median each cost O(log w)
+rather than the O(w) of re-sorting the window. The MAD is read from the
+same structure with a binary search over order statistics, costing
+O(log^2 w) per sample.
+
+References:
+   Hampel F R; The Influence Curve and its Role in Robust Estimation;
+   JASA; 1974.
+   Pugh W; Skip Lists: A Probabilistic Alternative to Balanced Trees;
+   CACM; 1990.
+"""
+from collections import deque
+from math import log, nan
+from random import random
+from . import filter_base
+
+# Scales the MAD to the standard deviation for normally distributed
+# data.
+_MAD_SCALE = 1.4826
+
+
+class _Node():
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, next, width):
+        self.value = value
+        self.next = next
+        self.width = width
+
+
+class _IndexableSkiplist():
+    """
+    Sorted collection supporting insertion, removal and indexing by
+    rank in O(log n).
+
+    Each link stores the number of nodes it skips over (its width),
+    which allows the i-th smallest value to be found by walking down
+    the levels.
+    """
+    def __init__(self, expected_size=100):
+        self._size = 0
+        self._maxlevels = int(1 + log(max(expected_size, 2), 2))
+        self._tail = _Node(float("inf"), [], [])
+        self._head = _Node(None, [self._tail] * self._maxlevels,
+                           [1] * self._maxlevels)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._size:
+            raise(IndexError("Skiplist index out of range."))
+        node = self._head
+        i += 1
+        for level in reversed(range(self._maxlevels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        """Insert value, keeping the collection sorted."""
+        chain = [None] * self._maxlevels
+        steps_at_level = [0] * self._maxlevels
+        node = self._head
+        for level in reversed(range(self._maxlevels)):
+            while (node.next[level] is not self._tail and
+                   node.next[level].value <= value):
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        # Geometrically distributed number of levels for the new node.
+        depth = min(self._maxlevels, 1 - int(log(1 - random(), 2)))
+        new_node = _Node(value, [None] * depth, [None] * depth)
+        steps = 0
+        for level in range(depth):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(depth, self._maxlevels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, value):
+        """Remove one occurrence of value."""
+        chain = [None] * self._maxlevels
+        node = self._head
+        for level in reversed(range(self._maxlevels)):
+            while (node.next[level] is not self._tail and
+                   node.next[level].value < value):
+                node = node.next[level]
+            chain[level] = node
+        if chain[0].next[0] is self._tail or \
+                value != chain[0].next[0].value:
+            raise(KeyError("%r not in skiplist." % value))
+
+        depth = len(chain[0].next[0].next)
+        for level in range(depth):
+            previous = chain[level]
+            previous.width[level] += previous.next[level].width[level] - 1
+            previous.next[level] = previous.next[level].next[level]
+        for level in range(depth, self._maxlevels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+
+class MedianData(filter_base.FilterData):
+    """
+    Running median filter implementation.
+    """
+    name = "MedianData"
+
+# Special methods--------------------------------------------------------------
+    def __init__(self, *args, window=None):
+        # Set before initialising the base class since saving on
+        # initialisation runs the filter.
+        self._window = MedianData._check_window(window)
+        filter_base.FilterData.__init__(self, *args)
+# -----------------------------------------------------------------------------
+
+# Public methods --------------------------------------------------------------
+    def tweak_window(self, window):
+        """Change the number of samples in the median window."""
+        self._window = MedianData._check_window(window)
+        self.reset()
+# -----------------------------------------------------------------------------
+
+# Private methods--------------------------------------------------------------
+    @staticmethod
+    def _check_window(window):
+        """Validate the window length, defaulting to 5 samples."""
+        if window is None:
+            return 5
+        if isinstance(window, int) and window > 0:
+            return window
+        raise(ValueError("Window must be a positive integer, not %r."
+                         % window))
+
+    @staticmethod
+    def _middle(sorted_window):
+        """Median of a sorted window, NaN if it is empty."""
+        n = len(sorted_window)
+        if not n:
+            return nan
+        if n % 2:
+            return sorted_window[n // 2]
+        return (sorted_window[n // 2 - 1] + sorted_window[n // 2]) / 2
+
+    def _running(self, data_array, window):
+        """
+        Yields each sample along with the sorted trailing window
+        containing it. Missing (NaN) samples take up a place in the
+        window but are not sorted into it.
+        """
+        sorted_window = _IndexableSkiplist(window)
+        history = deque()
+        i = 0
+        while True:
+            try:
+                x = data_array[i]
+            except(IndexError):
+                break
+            if x == x:  # False only for NaN.
+                sorted_window.insert(x)
+            history.append(x)
+            if len(history) > window:
+                oldest = history.popleft()
+                if oldest == oldest:
+                    sorted_window.remove(oldest)
+            yield x, sorted_window
+            i += 1
+
+    def _median(self, data_array, window=None):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the running median on the data.
+
+        Kwargs:
+
+            window (int, default=self._window):
+                The number of trailing samples the median is taken
+                over. Changeable through self.tweak_window().
+
+        Yields:
+
+            The median of the window ending at the current sample.
+        """
+        if window is None:
+            window = self._window
+        for _, sorted_window in self._running(data_array, window):
+            yield MedianData._middle(sorted_window)
+
+    # Reassign _filter method to _median function.
+    _filter = _median
+# -----------------------------------------------------------------------------
+
+
+class HampelData(MedianData):
+    """
+    Hampel outlier rejection filter implementation.
+    """
+    name = "HampelData"
+
+# Special methods--------------------------------------------------------------
+    def __init__(self, *args, window=None, n_sigmas=3):
+        self._n_sigmas = n_sigmas
+        MedianData.__init__(self, *args, window=window)
+# -----------------------------------------------------------------------------
+
+# Public methods --------------------------------------------------------------
+    def tweak_n_sigmas(self, n_sigmas):
+        """Change the rejection threshold in robust standard deviations."""
+        self._n_sigmas = n_sigmas
+        self.reset()
+# -----------------------------------------------------------------------------
+
+# Private methods--------------------------------------------------------------
+    @staticmethod
+    def _kth_distance(sorted_window, median, k):
+        """
+        The k-th (from 0) smallest absolute deviation from the median.
+
+        Values below the median have deviations increasing towards the
+        start of the window and values above it have deviations
+        increasing towards the end. This merges the two sorted runs of
+        deviations with a binary search, so only O(log w) values need
+        to be read.
+        """
+        n = len(sorted_window)
+        split = (n + 1) // 2
+
+        def below(i):
+            return median - sorted_window[split - 1 - i]
+
+        def above(j):
+            return sorted_window[split + j] - median
+
+        # Take i deviations from below and total - i from above.
+        total = k + 1
+        lo = max(0, total - (n - split))
+        hi = min(total, split)
+        while lo < hi:
+            i = (lo + hi) // 2
+            if below(i) < above(total - i - 1):
+                lo = i + 1
+            else:
+                hi = i
+        candidates = []
+        if lo > 0:
+            candidates.append(below(lo - 1))
+        if total - lo > 0:
+            candidates.append(above(total - lo - 1))
+        return max(candidates)
+
+    @staticmethod
+    def _mad(sorted_window, median):
+        """Median absolute deviation of a sorted window."""
+        n = len(sorted_window)
+        if n % 2:
+            return HampelData._kth_distance(sorted_window, median, n // 2)
+        return (HampelData._kth_distance(sorted_window, median, n // 2 - 1) +
+                HampelData._kth_distance(sorted_window, median, n // 2)) / 2
+
+    def _hampel(self, data_array, window=None, n_sigmas=None):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the Hampel filter on the data.
+
+        Kwargs:
+
+            window (int, default=self._window):
+                The number of trailing samples used to estimate the
+                median and MAD. Changeable through self.tweak_window().
+
+            n_sigmas (float, default=self._n_sigmas):
+                The number of robust standard deviations from the
+                median beyond which a sample is rejected. Changeable
+                through self.tweak_n_sigmas().
+
+        Yields:
+
+            The sample, or the window median if the sample is an
+            outlier.
+        """
+        if window is None:
+            window = self._window
+        if n_sigmas is None:
+            n_sigmas = self._n_sigmas
+        for x, sorted_window in self._running(data_array, window):
+            median = MedianData._middle(sorted_window)
+            if x != x:  # Fill missing (NaN) samples with the median.
+                yield median
+                continue
+            threshold = (n_sigmas * _MAD_SCALE *
+                         HampelData._mad(sorted_window, median))
+            if abs(x - median) > threshold:
+                yield median
+            else:
+                yield x
+
+    # Reassign _filter method to _hampel function.
+    _filter = _hampel
+# -----------------------------------------------------------------------------
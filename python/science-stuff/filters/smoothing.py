@@ -0,0 +1,450 @@
+"""
+Windowed smoothing filters implemented in Python.
+
+The moving average is the mean of the trailing window of the last w
+measurements:
+
+    y_n = 1 (x_(n-w+1) + ... + x_n)
+          w
+
+It is kept as a running sum, adding the newest sample and subtracting
+the one leaving the window, so each sample costs the same regardless of
+w. Infinite samples are counted apart from the sum, so the mean
+recovers once they leave the window.
+
+The Savitzky-Golay filter fits a polynomial of order p by least squares
+to the window centred on each point and evaluates it there. The fit is
+linear in the data, so it reduces to convolution with a fixed set of
+coefficients. This is done with an overlap-add FFT convolution, so the
+cost per sample grows only logarithmically with w. The first and last
+half windows are evaluated from a polynomial fitted to the edge window.
+
+The exponentially weighted mean and variance are defined by the
+recurrence relations:
+
+    d_n = x_n - m_(n-1)
+
+    m_n = m_(n-1) + alpha d_n
+
+    v_n = (1 - alpha) (v_(n-1) + alpha d_n ^ 2)
+
+where alpha is the smoothing factor, which may be given directly or as
+a span, s:
+
+    alpha =   2
+            s + 1
+
+Missing datapoints (NaN) are handled without a separate pass: the
+moving average is taken over the samples present in the window, the
+exponentially weighted filters hold their state across gaps and the
+Savitzky-Golay filter interpolates across them linearly before
+smoothing.
+
+References:
+   Savitzky A, Golay M J E; Smoothing and Differentiation of Data by
+   Simplified Least Squares Procedures; Anal. Chem.; 1964.
+   Finch T; Incremental calculation of weighted mean and variance;
+   University of Cambridge; 2009.
+"""
+from collections import deque
+from math import inf, nan
+import numpy as np
+from scipy import signal
+from . import backends
+from . import filter_base
+
+
+class MovingAverageData(filter_base.FilterData):
+    """
+    Trailing moving average filter implementation.
+    """
+    name = "MovingAverageData"
+
+# Special methods--------------------------------------------------------------
+    def __init__(self, *args, window=None):
+        self._window = MovingAverageData._check_window(window)
+        filter_base.FilterData.__init__(self, *args)
+# -----------------------------------------------------------------------------
+
+# Public methods --------------------------------------------------------------
+    def tweak_window(self, window):
+        """Change the number of samples averaged over."""
+        self._window = MovingAverageData._check_window(window)
+        self.reset()
+# -----------------------------------------------------------------------------
+
+# Private methods--------------------------------------------------------------
+    @staticmethod
+    def _check_window(window):
+        """Validate the window length, defaulting to 5 samples."""
+        if window is None:
+            return 5
+        if isinstance(window, int) and window > 0:
+            return window
+        raise(ValueError("Window must be a positive integer, not %r."
+                         % window))
+
+    def _moving_average(self, data_array, window=None):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the moving average on the data.
+
+        Kwargs:
+
+            window (int, default=self._window):
+                The number of trailing samples to average over.
+                Changeable through self.tweak_window().
+
+        Yields:
+
+            The mean of the window ending at the current sample.
+        """
+        if window is None:
+            window = self._window
+        history = deque()
+        # Running sum with Kahan compensation, which stops rounding
+        # errors from building up over long series. Missing (NaN)
+        # samples take up a place in the window but are not counted.
+        # Infinite samples are counted but kept out of the sum, which
+        # could never recover from them, so the mean is only infinite
+        # while they are in the window.
+        total = 0.
+        compensation = 0.
+        count = 0
+        infinities = {inf: 0, -inf: 0}
+        i = 0
+        while True:
+            try:
+                x = data_array[i]
+            except(IndexError):
+                break
+            history.append(x)
+            change = 0.
+            if x in infinities:
+                infinities[x] += 1
+                count += 1
+            elif x == x:  # False only for NaN.
+                change += x
+                count += 1
+            if len(history) > window:
+                oldest = history.popleft()
+                if oldest in infinities:
+                    infinities[oldest] -= 1
+                    count -= 1
+                elif oldest == oldest:
+                    change -= oldest
+                    count -= 1
+            change -= compensation
+            new_total = total + change
+            compensation = (new_total - total) - change
+            total = new_total
+            if infinities[inf] or infinities[-inf]:
+                # inf - inf is undefined, as in a plain sum.
+                yield (nan if infinities[inf] and infinities[-inf] else
+                       inf if infinities[inf] else -inf)
+            else:
+                yield total / count if count else nan
+            i += 1
+
+    # Reassign _filter method to _moving_average function.
+    _filter = _moving_average
+# -----------------------------------------------------------------------------
+
+
+class SavitzkyGolayData(filter_base.FilterData):
+    """
+    Savitzky-Golay smoothing filter implementation.
+    """
+    name = "SavitzkyGolayData"
+    streamable = False
+
+# Special methods--------------------------------------------------------------
+    def __init__(self, *args, window=None, polyorder=2):
+        self._window, self._polyorder = \
+            SavitzkyGolayData._check_window(window, polyorder)
+        filter_base.FilterData.__init__(self, *args)
+# -----------------------------------------------------------------------------
+
+# Public methods --------------------------------------------------------------
+    def tweak_window(self, window, polyorder=None):
+        """Change the window length and optionally the polynomial order."""
+        if polyorder is None:
+            polyorder = self._polyorder
+        self._window, self._polyorder = \
+            SavitzkyGolayData._check_window(window, polyorder)
+        self.reset()
+# -----------------------------------------------------------------------------
+
+# Private methods--------------------------------------------------------------
+    @staticmethod
+    def _check_window(window, polyorder):
+        """
+        Validate the window length and polynomial order, defaulting to
+        a window of 7 samples.
+        """
+        if window is None:
+            window = 7
+        if not (isinstance(window, int) and window > 0 and window % 2):
+            raise(ValueError("Window must be a positive odd integer, not %r."
+                             % window))
+        if not (isinstance(polyorder, int) and 0 <= polyorder < window):
+            raise(ValueError("Polynomial order must be a non-negative integer"
+                             " less than the window, not %r." % polyorder))
+        return window, polyorder
+
+    @staticmethod
+    def _fit_edge(y, polyorder, positions):
+        """Evaluate a polynomial fitted to y at the given positions."""
+        x = np.arange(len(y))
+        coefficients = np.polyfit(x, y, min(polyorder, len(y) - 1))
+        return np.polyval(coefficients, positions)
+
+    def _savitzky_golay(self, data_array, window=None, polyorder=None):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the Savitzky-Golay filter on the data. Since the
+        window is centred, the whole array is smoothed in one
+        vectorised pass before the first value is yielded.
+
+        Kwargs:
+
+            window (int, default=self._window):
+                The odd number of samples each polynomial is fitted
+                to. Changeable through self.tweak_window().
+
+            polyorder (int, default=self._polyorder):
+                The order of the fitted polynomials.
+
+        Yields:
+
+            The value of the polynomial fitted about the current
+            sample.
+        """
+        if window is None:
+            window = self._window
+        if polyorder is None:
+            polyorder = self._polyorder
+        data = np.asarray(data_array, dtype=float)
+        n = len(data)
+        if n == 0:
+            return
+        missing = np.isnan(data)
+        if missing.any() and not missing.all():
+            data = data.copy()
+            present = np.flatnonzero(~missing)
+            data[missing] = np.interp(np.flatnonzero(missing), present,
+                                      data[present])
+        if n < window:
+            # Too short for a full window; fit the whole series.
+            smoothed = SavitzkyGolayData._fit_edge(data, polyorder,
+                                                   np.arange(n))
+        else:
+            half = window // 2
+            smoothed = np.empty(n)
+            smoothed[half:n - half] = signal.oaconvolve(
+                data, signal.savgol_coeffs(window, polyorder), mode="valid")
+            smoothed[:half] = SavitzkyGolayData._fit_edge(
+                data[:window], polyorder, np.arange(half))
+            smoothed[n - half:] = SavitzkyGolayData._fit_edge(
+                data[n - window:], polyorder, np.arange(window - half, window))
+        yield from smoothed.tolist()
+
+    # Reassign _filter method to _savitzky_golay function.
+    _filter = _savitzky_golay
+# -----------------------------------------------------------------------------
+
+
+class EWMAData(filter_base.FilterData):
+    """
+    Exponentially weighted moving average implementation.
+    """
+    name = "EWMAData"
+
+# Special methods--------------------------------------------------------------
+    def __init__(self, *args, alpha=None, span=None):
+        self._alpha = EWMAData._check_alpha(alpha, span)
+        filter_base.FilterData.__init__(self, *args)
+# -----------------------------------------------------------------------------
+
+# Public methods --------------------------------------------------------------
+    def tweak_alpha(self, alpha=None, span=None):
+        """Change the smoothing factor, given directly or as a span."""
+        self._alpha = EWMAData._check_alpha(alpha, span)
+        self.reset()
+# -----------------------------------------------------------------------------
+
+# Private methods--------------------------------------------------------------
+    @staticmethod
+    def _check_alpha(alpha, span):
+        """
+        Validate the smoothing factor, defaulting to a span of 10
+        samples.
+        """
+        if alpha is not None and span is not None:
+            raise(ValueError("Give only one of alpha and span."))
+        if alpha is None:
+            if span is None:
+                span = 10
+            if not (isinstance(span, (int, float)) and span >= 1):
+                raise(ValueError("Span must be at least 1, not %r." % span))
+            alpha = 2 / (span + 1)
+        if not (isinstance(alpha, (int, float)) and 0 < alpha <= 1):
+            raise(ValueError("Alpha must be in (0, 1], not %r." % alpha))
+        return alpha
+
+    def _moments(self, data_array, alpha=None):
+        """
+        Yields the exponentially weighted mean and variance at each
+        sample.
+        """
+        if alpha is None:
+            alpha = self._alpha
+        mean = None
+        variance = 0.
+        i = 0
+        while True:
+            try:
+                x = data_array[i]
+            except(IndexError):
+                break
+            if x != x:  # Hold the state over missing (NaN) samples.
+                yield (nan, nan) if mean is None else (mean, variance)
+                i += 1
+                continue
+            if mean is None:
+                mean = x
+            difference = x - mean
+            increment = alpha * difference
+            mean += increment
+            variance = (1 - alpha) * (variance + difference * increment)
+            yield mean, variance
+            i += 1
+
+    def _ewma(self, data_array, alpha=None):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the exponentially weighted moving average on the data.
+
+        Kwargs:
+
+            alpha (float, default=self._alpha):
+                The smoothing factor. Changeable through
+                self.tweak_alpha().
+
+        Yields:
+
+            The exponentially weighted mean at the current sample.
+        """
+        for mean, _ in self._moments(data_array, alpha):
+            yield mean
+
+    # Reassign _filter method to _ewma function.
+    _filter = _ewma
+# -----------------------------------------------------------------------------
+
+
+class EWMVarData(EWMAData):
+    """
+    Exponentially weighted moving variance implementation.
+    """
+    name = "EWMVarData"
+
+# Private methods--------------------------------------------------------------
+    def _ewmvar(self, data_array, alpha=None):
+        """
+        Accepts:
+
+            An array.
+
+        Performs the exponentially weighted moving variance on the
+        data.
+
+        Kwargs:
+
+            alpha (float, default=self._alpha):
+                The smoothing factor. Changeable through
+                self.tweak_alpha().
+
+        Yields:
+
+            The exponentially weighted variance at the current sample.
+        """
+        for _, variance in self._moments(data_array, alpha):
+            yield variance
+
+    # Reassign _filter method to _ewmvar function.
+    _filter = _ewmvar
+# -----------------------------------------------------------------------------
+
+
+# Backend kernels--------------------------------------------------------------
+@backends.register("numpy", MovingAverageData)
+def _numpy_moving_average(filter_data, data):
+    """
+    Window sums as differences of cumulative sums. As in the reference,
+    infinite samples are counted separately and kept out of the sums.
+    """
+    window = filter_data._window
+    positive = np.isposinf(data)
+    negative = np.isneginf(data)
+    finite = np.isfinite(data)
+    # Offsetting by the first value keeps the cumulative sums small,
+    # limiting the rounding error in their differences.
+    offset = data[finite][0] if finite.any() else 0.
+    sums = np.cumsum(np.where(finite, data - offset, 0.))
+    counts = np.cumsum(finite)
+    positives = np.cumsum(positive)
+    negatives = np.cumsum(negative)
+    for running in (sums, counts, positives, negatives):
+        running[window:] -= running[:-window].copy()
+    counts = counts + positives + negatives
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts + offset, np.nan)
+    means[positives > 0] = np.inf
+    means[negatives > 0] = -np.inf
+    means[(positives > 0) & (negatives > 0)] = np.nan
+    return means
+
+
+def _ewm_mean(data, alpha):
+    """The exponentially weighted mean, as a first-order recurrence."""
+    return signal.lfilter([alpha], [1, alpha - 1], data,
+                          zi=[(1 - alpha) * data[0]])[0]
+
+
+@backends.register("numpy", EWMAData)
+def _numpy_ewma(filter_data, data):
+    if np.isnan(data).any():
+        return None  # Held state over gaps isn't a plain recurrence.
+    if not len(data):
+        return np.empty(0)
+    return _ewm_mean(data, filter_data._alpha)
+
+
+@backends.register("numpy", EWMVarData)
+def _numpy_ewmvar(filter_data, data):
+    """
+    Given the means, the variance is a first-order recurrence in the
+    squared differences from the previous mean.
+    """
+    if np.isnan(data).any():
+        return None  # Held state over gaps isn't a plain recurrence.
+    if not len(data):
+        return np.empty(0)
+    alpha = filter_data._alpha
+    mean = _ewm_mean(data, alpha)
+    differences = np.empty(len(data))
+    differences[0] = 0.
+    differences[1:] = data[1:] - mean[:-1]
+    return signal.lfilter([(1 - alpha) * alpha], [1, alpha - 1],
+                          differences ** 2)
+# -----------------------------------------------------------------------------
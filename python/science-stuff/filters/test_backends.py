@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+from . import backends as backends
+from . import filter_base as filter_base
+from . import kalman as kalman
+from . import lowpass as lowpass
+from . import smoothing as smoothing
+
+"""
+Unit testing for the compute backends, including the differential
+check of every backend against the reference filters.
+"""
+
+
+class DoubledKalmanData(kalman.KalmanData):
+    def _filter(self, data_array):
+        for x in kalman.KalmanData._filter(self, data_array):
+            yield 2 * x
+
+
+class TestBackendsMatchReference(unittest.TestCase):
+    def setUp(self):
+        self.data = np.random.normal(3, 1, 5000)
+
+    def test_registered_filters_match_reference(self):
+        results = backends.verify_registered(self.data)
+        self.assertIn("KalmanData", results)
+        self.assertIn("LowPassData", results)
+
+    def test_registered_filters_match_reference_with_gaps(self):
+        gappy = self.data.copy()
+        gappy[100:150] = np.nan
+        gappy[4000] = np.nan
+        backends.verify_registered(gappy)
+
+    def test_moving_average_with_infinities_matches_reference(self):
+        data = self.data.copy()
+        data[[0, 10, 12, 400, 401, 2000]] = [np.inf, -np.inf, np.inf,
+                                              -np.inf, -np.inf, np.nan]
+        backends.verify(smoothing.MovingAverageData(data, window=5))
+        backends.verify(smoothing.MovingAverageData(
+            [1, np.inf, 3, 5, -np.inf, np.inf, 7, 9], window=2))
+
+    def test_kalman_without_process_noise_matches_reference(self):
+        for data in (self.data, np.r_[0., self.data]):
+            backends.verify(kalman.KalmanData(data, q=0, r=1))
+
+    def test_verify_raises_error_on_mismatch(self):
+        filtered = kalman.KalmanData(self.data, q=0.1, r=1)
+        backends.register("numpy", kalman.KalmanData)(
+            lambda filter_data, data: data)
+        try:
+            with self.assertRaises(AssertionError):
+                backends.verify(filtered)
+        finally:
+            backends.register("numpy", kalman.KalmanData)(
+                kalman._numpy_kalman)
+
+    def test_verify_reports_missing_values_as_mismatch(self):
+        filtered = kalman.KalmanData(self.data, q=0.1, r=1)
+
+        def missing_first(filter_data, data):
+            result = kalman._numpy_kalman(filter_data, data)
+            result[0] = np.nan
+            return result
+        backends.register("numpy", kalman.KalmanData)(missing_first)
+        try:
+            with self.assertRaisesRegex(AssertionError, "'numpy': inf"):
+                backends.verify(filtered, backends=["numpy"])
+        finally:
+            backends.register("numpy", kalman.KalmanData)(
+                kalman._numpy_kalman)
+
+
+class TestBackendSelection(unittest.TestCase):
+    def setUp(self):
+        self.filtered = lowpass.LowPassData(list(np.random.randn(1000)),
+                                            cutoff=0.1)
+
+    def tearDown(self):
+        backends.set_default(backends.REFERENCE)
+
+    def test_save_with_backend(self):
+        self.filtered.save(backend="numpy")
+        np.testing.assert_allclose(self.filtered.data,
+                                   backends.reference(self.filtered))
+
+    def test_default_backend_is_used(self):
+        backends.set_default("numpy")
+        self.assertEqual(backends.get_default(), "numpy")
+        self.filtered.save()
+        np.testing.assert_allclose(self.filtered.data,
+                                   backends.reference(self.filtered))
+
+    def test_unknown_backend_raises_error(self):
+        with self.assertRaises(ValueError):
+            backends.set_default("abacus")
+        with self.assertRaises(ValueError):
+            self.filtered.save(backend="abacus")
+
+    def test_overridden_filter_uses_reference(self):
+        doubled = DoubledKalmanData(list(np.random.randn(100)), q=1, r=1)
+        self.assertIsNone(backends.kernel_for(doubled, "numpy"))
+        np.testing.assert_allclose(backends.run(doubled, "numpy"),
+                                   backends.reference(doubled))
+
+    def test_unregistered_filter_uses_reference(self):
+        filtered = smoothing.SavitzkyGolayData(list(np.random.randn(100)))
+        np.testing.assert_allclose(backends.run(filtered, "numpy"),
+                                   backends.reference(filtered))
+
+    def test_base_filter_is_identity(self):
+        filtered = filter_base.FilterData([1, 2, 3])
+        filtered.save(backend="numpy")
+        self.assertEqual(list(filtered.data), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
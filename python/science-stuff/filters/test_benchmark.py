@@ -0,0 +1,51 @@
+import unittest
+from . import benchmark as benchmark
+
+"""
+Unit testing for the benchmark suite, on small inputs only.
+"""
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.results = benchmark.run(sizes=(100,), repeat=1,
+                                     patterns=["construct", "save[python]",
+                                               "to_pandas"])
+
+    def test_every_combination_is_measured(self):
+        self.assertEqual(len(self.results["results"]),
+                         len(benchmark.FILTERS) * len(benchmark.INPUTS) * 3)
+
+    def test_large_sizes_skip_slow_filters(self):
+        results = benchmark.run(sizes=(100,), repeat=1,
+                                filters=["KalmanData", "ExtendedKalmanData"],
+                                inputs=["ndarray"], patterns=["construct"])
+        self.assertEqual(len(results["results"]), 2)
+        benchmark.LARGEST["ExtendedKalmanData"] = 10
+        try:
+            results = benchmark.run(sizes=(100,), repeat=1,
+                                    filters=["KalmanData",
+                                             "ExtendedKalmanData"],
+                                    inputs=["ndarray"],
+                                    patterns=["construct"])
+        finally:
+            benchmark.LARGEST["ExtendedKalmanData"] = 10 ** 5
+        self.assertEqual([result["filter"] for result in results["results"]],
+                         ["KalmanData"])
+
+    def test_results_are_positive(self):
+        for result in self.results["results"]:
+            self.assertGreater(result["samples_per_second"], 0)
+            self.assertGreater(result["peak_bytes"], 0)
+
+    def test_compare_reports_slowdown(self):
+        slower = dict(self.results, results=[
+            dict(result, samples_per_second=result["samples_per_second"] / 2)
+            for result in self.results["results"]])
+        self.assertEqual(benchmark.compare(self.results, self.results), [])
+        self.assertEqual(len(benchmark.compare(self.results, slower)),
+                         len(self.results["results"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import fanout as fanout
+from . import filter_base as filter_base
+from . import kalman as kalman
+from . import lowpass as lowpass
+
+"""
+Unit testing for running filters over a series in shared memory.
+"""
+
+
+class TestFanOut(unittest.TestCase):
+    def setUp(self):
+        self.data = np.random.normal(3, 1, 2000)
+        self.data[500:520] = np.nan
+        self.configurations = [
+            (kalman.KalmanData, dict(q=0.1, r=1.)),
+            (kalman.KalmanData, dict(q=0.01, r=2.), True),
+            (lowpass.LowPassData, dict(cutoff=0.1))]
+
+    def expected(self, cls, settings, backwards=False):
+        filtered = cls(self.data, **settings)
+        if backwards:
+            filtered.reverse()
+            return np.array(filtered[:])[::-1]
+        return np.array(filtered[:])
+
+    def test_matches_separate_filters(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            filtered = fanout.fan_out(self.data, self.configurations,
+                                      executor=executor)
+        self.assertEqual(filtered.shape, (3, 2000))
+        for row, configuration in zip(filtered, self.configurations):
+            np.testing.assert_allclose(row, self.expected(*configuration))
+
+    def test_shared_series_is_reused(self):
+        with fanout.SharedSeries(self.data) as series, \
+                ProcessPoolExecutor(max_workers=2) as executor:
+            first = fanout.fan_out(series, self.configurations[:1],
+                                   executor=executor)
+            second = fanout.fan_out(series, self.configurations[2:],
+                                    executor=executor)
+        np.testing.assert_allclose(first[0],
+                                   self.expected(*self.configurations[0]))
+        np.testing.assert_allclose(second[0],
+                                   self.expected(*self.configurations[2]))
+
+    def test_memoryview_is_not_copied(self):
+        view = memoryview(self.data).toreadonly()
+        filtered = kalman.KalmanData(view, q=0.1, r=1.)
+        self.assertIs(filtered._data, view)
+        filtered.reverse()
+        self.assertIsInstance(filtered._data, memoryview)
+        np.testing.assert_allclose(
+            filtered[:], self.expected(kalman.KalmanData, dict(q=0.1, r=1.),
+                                       True)[::-1])
+
+    def test_copy_of_memoryview_owns_its_data(self):
+        filtered = filter_base.FilterData(memoryview(self.data))
+        copied = filtered.copy()
+        self.assertNotIsInstance(copied._data, memoryview)
+        first = self.data[0]
+        self.data[0] = first + 1
+        self.assertEqual(copied._data[0], first)
+
+    def test_memoryview_comparisons(self):
+        data = np.arange(10.)
+        filtered = filter_base.FilterData(memoryview(data))
+        larger = filter_base.FilterData(data + 1)
+        self.assertTrue(filtered < larger)
+        self.assertTrue(larger >= filtered)
+        self.assertTrue(filtered == filtered.copy())
+        self.assertFalse(filtered != filtered.copy())
+
+
+if __name__ == "__main__":
+    unittest.main()
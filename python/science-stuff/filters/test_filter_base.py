@@ -1,5 +1,10 @@
+import asyncio
+import math
+import threading
+import numpy as np
 import pandas as pd
 import unittest
+from array import array
 from . import filter_base as filter_base
 
 """
@@ -34,6 +39,14 @@ class TestFilterInit(unittest.TestCase):
         with self.assertRaises(TypeError):
             filter_base.FilterData(1)
 
+    def test_init_with_none_stores_missing_value(self):
+        filtered = filter_base.FilterData([1, None, 3])
+        self.assertTrue(math.isnan(filtered._data[1]))
+
+    def test_init_with_numpy_values(self):
+        filtered = filter_base.FilterData(np.arange(3, dtype=np.float32))
+        self.assertEqual(list(filtered._data), [0, 1, 2])
+
 
 class TestFilterComparisons(unittest.TestCase):
     def setUp(self):
@@ -202,6 +215,114 @@ class TestFilterArithmetic(unittest.TestCase):
             self.filter_1 / "string"
 
 
+class RunningSumData(filter_base.FilterData):
+    # A filter with state, to show when cursors share it.
+    @staticmethod
+    def _filter(data_array):
+        total = 0
+        for data_point in data_array:
+            total += data_point
+            yield total
+
+
+class TestFilterCursors(unittest.TestCase):
+    def setUp(self):
+        self.filter_1 = RunningSumData([1, 2, 3, 4, 5, 6, 7])
+        self.expected = [1, 3, 6, 10, 15, 21, 28]
+
+    def test_cursors_are_independent(self):
+        cursor_1 = iter(self.filter_1)
+        cursor_2 = iter(self.filter_1)
+        self.assertEqual([next(cursor_1), next(cursor_1)], [1, 3])
+        self.assertEqual(list(cursor_2), self.expected)
+        self.assertEqual(list(cursor_1), self.expected[2:])
+
+    def test_cursors_do_not_advance_call(self):
+        list(self.filter_1)
+        self.assertEqual(self.filter_1(), 1)
+
+    def test_cursor_reads_saved_data(self):
+        self.filter_1.save()
+        self.filter_1._data = array('d', [0] * 7)
+        self.assertEqual(list(self.filter_1), self.expected)
+
+    def test_reset_keeps_saved_data(self):
+        self.filter_1.save()
+        self.filter_1.reset()
+        self.assertEqual(list(self.filter_1.data), self.expected)
+
+    def test_cursor_after_reset_reads_current_settings(self):
+        self.filter_1.save()
+        self.filter_1.reset()
+        self.filter_1._data = array('d', [0] * 7)
+        self.assertEqual(list(self.filter_1), [0] * 7)
+
+    def test_concurrent_cursors(self):
+        results = [None] * 8
+
+        def read(i):
+            results[i] = list(self.filter_1)
+
+        threads = [threading.Thread(target=read, args=(i,))
+                   for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [self.expected] * len(results))
+
+    def test_subtraction_uses_raw_data(self):
+        self.assertEqual(self.filter_1 - self.filter_1,
+                         filter_base.FilterData([0] * 7))
+
+    def test_division_uses_raw_data(self):
+        self.assertEqual(self.filter_1 / self.filter_1,
+                         filter_base.FilterData([1] * 7))
+
+
+async def produce(chunks, log=None):
+    for chunk in chunks:
+        if log is not None:
+            log.append("produced")
+        yield chunk
+
+
+async def consume(stream, log=None):
+    filtered = []
+    async for chunk in stream:
+        if log is not None:
+            log.append("consumed")
+        filtered.append(list(chunk))
+    return filtered
+
+
+class TestFilterStream(unittest.TestCase):
+    def setUp(self):
+        self.chunks = [[1, 2, 3], [4, 5], [6, 7]]
+
+    def test_state_is_carried_between_chunks(self):
+        filtered = asyncio.run(consume(RunningSumData.stream(
+            produce(self.chunks))))
+        self.assertEqual(filtered, [[1, 3, 6], [10, 15], [21, 28]])
+
+    def test_numpy_chunks(self):
+        chunks = [np.arange(3), np.arange(3, 7)]
+        filtered = asyncio.run(consume(RunningSumData.stream(
+            produce(chunks))))
+        self.assertEqual(filtered, [[0, 1, 3], [6, 10, 15, 21]])
+
+    def test_invalid_chunk_raises_error(self):
+        with self.assertRaises(TypeError):
+            asyncio.run(consume(RunningSumData.stream(
+                produce([[1, 2], ["string"]]))))
+
+    def test_chunks_are_not_read_ahead(self):
+        log = []
+        asyncio.run(consume(RunningSumData.stream(produce(self.chunks, log)),
+                            log))
+        self.assertEqual(log, ["produced", "consumed"] * 3)
+
+
 class TestFilterPandasInteraction(unittest.TestCase):
     pass
 
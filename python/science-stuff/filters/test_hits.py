@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from . import filter_base as filter_base
+from . import hits as hits
+
+"""
+Unit testing for hit detection.
+"""
+
+
+class TestFindHits(unittest.TestCase):
+    def setUp(self):
+        t = np.arange(2000.)
+        self.data = np.zeros(2000)
+        # (start, amplitude, decay constant) of each hit.
+        self.hits = [(100, 5., 20.), (700, 8., 50.), (1500, 3., 5.)]
+        for start, amplitude, decay in self.hits:
+            self.data[start:] += amplitude * np.exp(-(t[start:] - start) /
+                                                    decay)
+
+    def test_finds_each_hit(self):
+        found = hits.find_hits(self.data, 0.5)
+        self.assertEqual(list(found["start"]),
+                         [start for start, _, _ in self.hits])
+
+    def test_recovers_decay_constants(self):
+        found = hits.find_hits(self.data, 0.5)
+        np.testing.assert_allclose(found["decay"],
+                                   [decay for _, _, decay in self.hits],
+                                   rtol=1e-4)
+        np.testing.assert_allclose(found["amplitude"],
+                                   [amplitude for _, amplitude, _ in
+                                    self.hits], rtol=1e-4)
+
+    def test_baseline_is_removed(self):
+        found = hits.find_hits(self.data + 10, 10.5, baseline=10)
+        np.testing.assert_allclose(found["decay"],
+                                   [decay for _, _, decay in self.hits],
+                                   rtol=1e-4)
+
+    def test_dt_scales_decay_constant(self):
+        found = hits.find_hits(self.data, 0.5, dt=0.1)
+        np.testing.assert_allclose(found["decay"],
+                                   [decay / 10 for _, _, decay in self.hits],
+                                   rtol=1e-4)
+
+    def test_peak_is_highest_sample(self):
+        rising = [0, 1, 3, 2, 0]
+        self.assertEqual(hits.find_hits(rising, 0.5)["peak"][0], 2)
+
+    def test_no_hits_returns_empty_array(self):
+        found = hits.find_hits(np.zeros(10), 1)
+        self.assertEqual(len(found), 0)
+        self.assertEqual(found.dtype, hits.HIT_DTYPE)
+
+    def test_threshold_below_baseline_raises_error(self):
+        with self.assertRaises(ValueError):
+            hits.find_hits(self.data, 0, baseline=1)
+
+
+class TestHitDetector(unittest.TestCase):
+    def setUp(self):
+        t = np.arange(1000.)
+        self.data = np.zeros(1000)
+        for start in (10, 400, 990):
+            self.data[start:] += 4 * np.exp(-(t[start:] - start) / 10)
+
+    def test_chunked_detection_matches_single_pass(self):
+        detector = hits.HitDetector(0.5)
+        found = [detector.update(chunk) for chunk in
+                 np.array_split(self.data, 23)]
+        found.append(detector.flush())
+        self.assertTrue(np.array_equal(np.concatenate(found),
+                                       hits.find_hits(self.data, 0.5)))
+
+    def test_detect_hits_on_filter_output(self):
+        found = hits.detect_hits(filter_base.FilterData(self.data.tolist()),
+                                 0.5, chunk_size=64)
+        self.assertTrue(np.array_equal(found, hits.find_hits(self.data, 0.5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
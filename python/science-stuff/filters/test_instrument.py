@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import pandas as pd
+from . import filter_base as filter_base
+from . import instrument as instrument
+from . import kalman as kalman
+from . import lowpass as lowpass
+
+"""
+Unit testing for the filter instrumentation.
+"""
+
+
+class TestInstrumentDisabled(unittest.TestCase):
+    def test_stats_is_none(self):
+        filtered = kalman.KalmanData([1., 2., 3.], q=1, r=1)
+        self.assertIsNone(filtered.stats)
+
+    def test_generators_are_not_wrapped(self):
+        filtered = filter_base.FilterData([1., 2., 3.])
+        self.assertEqual(filtered._filter_data.__name__, "_filter")
+
+
+class TestInstrumentEnabled(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.metrics = []
+        instrument.enable(
+            hook=lambda *args: self.calls.append(args),
+            sink=lambda *args: self.metrics.append(args))
+        self.data = list(np.random.normal(3, 1, 500))
+
+    def tearDown(self):
+        instrument.disable()
+
+    def test_filter_stage_counts_samples(self):
+        filtered = kalman.KalmanData(self.data, q=0.1, r=1)
+        filtered.save()
+        self.assertEqual(filtered.stats.samples, 500)
+        self.assertEqual(filtered.stats.calls["validate"], 1)
+        self.assertEqual(filtered.stats.calls["filter"], 1)
+        self.assertGreater(filtered.stats.seconds["filter"], 0)
+
+    def test_output_is_unchanged(self):
+        filtered = kalman.KalmanData(self.data)
+        instrument.disable()
+        plain = kalman.KalmanData(self.data)
+        self.assertEqual(list(filtered[:]), list(plain[:]))
+
+    def test_estimate_stage(self):
+        filtered = lowpass.LowPassData(self.data)
+        self.assertEqual(filtered.stats.calls["estimate"], 1)
+        filtered = kalman.KalmanData(self.data)
+        filtered[:]
+        self.assertEqual(filtered.stats.calls["estimate"], 1)
+
+    def test_backend_filter_stage(self):
+        filtered = kalman.KalmanData(self.data, q=0.1, r=1)
+        filtered.save(backend="numpy")
+        self.assertEqual(filtered.stats.samples, 500)
+        self.assertEqual(filtered.stats.calls["filter"], 1)
+
+    def test_pandas_stage(self):
+        df = pd.DataFrame(dict(time=np.arange(500.), y=self.data))
+        filtered = filter_base.FilterData(df)
+        filtered.to_pandas()
+        self.assertEqual(filtered.stats.calls["pandas"], 2)
+
+    def test_hook_and_sink(self):
+        filtered = filter_base.FilterData(self.data)
+        filtered[:]
+        self.assertEqual([call[1] for call in self.calls],
+                         ["validate", "filter"])
+        self.assertIs(self.calls[0][0], filtered)
+        self.assertIn(("filters.samples", 500, dict(filter="FilterData")),
+                      self.metrics)
+
+    def test_export(self):
+        filtered = filter_base.FilterData(self.data)
+        filtered[:]
+        exported = {}
+        filtered.stats.export(
+            lambda metric, value, tags: exported.update({metric: value}))
+        self.assertEqual(exported["filters.samples"], 500)
+        self.assertEqual(exported["filters.filter.calls"], 1)
+        self.assertIn("filters.validate.seconds", exported)
+
+
+if __name__ == "__main__":
+    unittest.main()
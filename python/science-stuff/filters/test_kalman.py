@@ -0,0 +1,122 @@
+import asyncio
+import random
+import unittest
+import numpy as np
+from . import kalman as kalman
+
+"""
+Unit testing for the Kalman filters.
+"""
+
+
+def decay(dt):
+    """Transition and Jacobian for the state [y, lam] of y' = -lam y."""
+    def transition(x):
+        return np.stack((x[..., 0] * np.exp(-x[..., 1] * dt), x[..., 1]),
+                        axis=-1)
+
+    def jacobian(x):
+        J = np.zeros(x.shape + x.shape[-1:])
+        J[..., 0, 0] = np.exp(-x[..., 1] * dt)
+        J[..., 0, 1] = -dt * x[..., 0] * np.exp(-x[..., 1] * dt)
+        J[..., 1, 1] = 1
+        return J
+
+    return transition, jacobian
+
+
+def measure(x):
+    return x[..., 0]
+
+
+class TestKalmanDataGaps(unittest.TestCase):
+    def setUp(self):
+        self.data = [random.gauss(0, 1) for _ in range(100)]
+        self.gappy = list(self.data)
+        self.gappy[40:50] = [None] * 10
+
+    def test_gaps_are_predicted_not_updated(self):
+        filtered = kalman.KalmanData(self.gappy, q=0.1, r=1)[:]
+        self.assertEqual(list(filtered[40:50]), [filtered[39]] * 10)
+        np.testing.assert_allclose(
+            filtered[:40], kalman.KalmanData(self.data, q=0.1, r=1)[:40])
+
+    def test_leading_gap_starts_at_first_datapoint(self):
+        filtered = kalman.KalmanData([None, 2., 2.], q=0.1, r=1)[:]
+        self.assertEqual(list(filtered), [2., 2., 2.])
+
+    def test_estimated_noise_ignores_gaps(self):
+        filtered = kalman.KalmanData(self.gappy)[:]
+        self.assertFalse(np.isnan(filtered).any())
+
+    def test_extended_gaps_are_predicted_not_updated(self):
+        filtered = kalman.ExtendedKalmanData(self.gappy, q=0.1, r=1)[:]
+        np.testing.assert_allclose(
+            filtered, kalman.KalmanData(self.gappy, q=0.1, r=1)[:])
+
+
+class TestKalmanDataStream(unittest.TestCase):
+    def test_stream_matches_batch(self):
+        data = [random.gauss(0, 1) for _ in range(100)]
+
+        async def run():
+            async def chunks():
+                for start in range(0, len(data), 30):
+                    yield data[start:start + 30]
+            return [chunk async for chunk in
+                    kalman.KalmanData.stream(chunks(), q=0.1, r=1)]
+
+        np.testing.assert_allclose(np.concatenate(asyncio.run(run())),
+                                   kalman.KalmanData(data, q=0.1, r=1)[:])
+
+
+class TestExtendedKalmanData(unittest.TestCase):
+    def setUp(self):
+        self.data = [np.sin(i / 20) + random.gauss(0, 0.1)
+                     for i in range(300)]
+        t = np.arange(400) * 0.1
+        self.decaying = (5 * np.exp(-0.7 * t) +
+                         np.random.normal(0, 0.01, len(t)))
+        self.transition, self.jacobian = decay(0.1)
+        self.model = dict(transition=self.transition, measurement=measure,
+                          x0=[4, 0.3], p0=np.eye(2), q=1e-8 * np.eye(2),
+                          r=1e-4)
+
+    def test_random_walk_model_matches_kalman(self):
+        np.testing.assert_allclose(
+            kalman.ExtendedKalmanData(self.data, q=0.01, r=0.01)[:],
+            kalman.KalmanData(self.data, q=0.01, r=0.01)[:])
+
+    def test_estimated_noise_matches_kalman(self):
+        np.testing.assert_allclose(kalman.ExtendedKalmanData(self.data)[:],
+                                   kalman.KalmanData(self.data)[:])
+
+    def test_finite_difference_matches_analytic_jacobian(self):
+        numeric = kalman.ExtendedKalmanData(self.decaying.tolist(),
+                                            **self.model)
+        analytic = kalman.ExtendedKalmanData(
+            self.decaying.tolist(), transition_jacobian=self.jacobian,
+            **self.model)
+        np.testing.assert_allclose(numeric.states(), analytic.states(),
+                                   atol=1e-6)
+
+    def test_recovers_decay_rate(self):
+        filtered = kalman.ExtendedKalmanData(self.decaying.tolist(),
+                                             **self.model)
+        self.assertAlmostEqual(filtered.states()[-1, 1], 0.7, places=2)
+
+    def test_channels_match_single_channel(self):
+        channels = np.stack((self.decaying, 2 * self.decaying), axis=1)
+        filtered, states = kalman.extended_kalman(
+            channels, self.transition, measure, [4, 0.3], np.eye(2),
+            1e-8 * np.eye(2), 1e-4, self.jacobian)
+        self.assertEqual(filtered.shape, channels.shape)
+        single = kalman.ExtendedKalmanData(
+            self.decaying.tolist(), transition_jacobian=self.jacobian,
+            **self.model)
+        np.testing.assert_allclose(states[:, 0], single.states())
+        np.testing.assert_allclose(filtered[:, 0], single[:])
+
+
+if __name__ == "__main__":
+    unittest.main()
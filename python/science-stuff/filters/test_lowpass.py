@@ -0,0 +1,30 @@
+import random
+import unittest
+import numpy as np
+from . import lowpass as lowpass
+
+"""
+Unit testing for the low pass filter.
+"""
+
+
+class TestLowPassData(unittest.TestCase):
+    def setUp(self):
+        self.data = [np.sin(i / 10) + random.gauss(0, 0.1)
+                     for i in range(500)]
+
+    def test_cutoff_is_estimated_from_spectrum(self):
+        filtered = lowpass.LowPassData(self.data)
+        self.assertGreater(filtered._cutoff, 0)
+
+    def test_state_is_held_over_missing_values(self):
+        gappy = list(self.data)
+        gappy[200:220] = [None] * 20
+        filtered = lowpass.LowPassData(gappy, cutoff=0.1)[:]
+        self.assertEqual(list(filtered[200:220]), [filtered[199]] * 20)
+        np.testing.assert_allclose(
+            filtered[:200], lowpass.LowPassData(self.data, cutoff=0.1)[:200])
+
+
+if __name__ == "__main__":
+    unittest.main()
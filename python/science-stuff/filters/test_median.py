@@ -0,0 +1,145 @@
+import math
+import random
+import unittest
+import numpy as np
+from . import median as median
+
+"""
+Unit testing for the running median and Hampel filters.
+"""
+
+
+def naive_running_median(data, window):
+    return [np.median(data[max(0, i - window + 1):i + 1])
+            for i in range(len(data))]
+
+
+class TestIndexableSkiplist(unittest.TestCase):
+    def test_indexing_matches_sorted_list(self):
+        values = [random.uniform(-10, 10) for _ in range(200)]
+        skiplist = median._IndexableSkiplist(len(values))
+        for value in values:
+            skiplist.insert(value)
+        self.assertEqual([skiplist[i] for i in range(len(values))],
+                         sorted(values))
+
+    def test_remove_keeps_order(self):
+        values = [random.randint(0, 20) for _ in range(100)]
+        skiplist = median._IndexableSkiplist(len(values))
+        for value in values:
+            skiplist.insert(value)
+        for value in values[::2]:
+            skiplist.remove(value)
+            values.remove(value)
+        self.assertEqual([skiplist[i] for i in range(len(skiplist))],
+                         sorted(values))
+
+    def test_remove_missing_value_raises_error(self):
+        skiplist = median._IndexableSkiplist()
+        skiplist.insert(1.0)
+        with self.assertRaises(KeyError):
+            skiplist.remove(2.0)
+
+    def test_infinite_values(self):
+        values = [2., math.inf, -math.inf, 1., math.inf]
+        skiplist = median._IndexableSkiplist(len(values))
+        for value in values:
+            skiplist.insert(value)
+        skiplist.remove(math.inf)
+        self.assertEqual([skiplist[i] for i in range(len(skiplist))],
+                         [-math.inf, 1., 2., math.inf])
+
+    def test_index_out_of_range_raises_error(self):
+        skiplist = median._IndexableSkiplist()
+        with self.assertRaises(IndexError):
+            skiplist[0]
+
+
+class TestMedianData(unittest.TestCase):
+    def setUp(self):
+        self.data = [random.gauss(0, 1) for _ in range(300)]
+
+    def test_odd_window_matches_naive_median(self):
+        filtered = median.MedianData(self.data, window=7)
+        np.testing.assert_allclose(filtered[:],
+                                   naive_running_median(self.data, 7))
+
+    def test_even_window_matches_naive_median(self):
+        filtered = median.MedianData(self.data, window=4)
+        np.testing.assert_allclose(filtered[:],
+                                   naive_running_median(self.data, 4))
+
+    def test_generator_matches_batch(self):
+        filtered = median.MedianData(self.data, window=5)
+        generated = [filtered() for _ in range(len(self.data))]
+        filtered.save()
+        self.assertEqual(generated, list(filtered.data))
+
+    def test_tweak_window_resets_filter(self):
+        filtered = median.MedianData(self.data, window=3)
+        filtered()
+        filtered.tweak_window(9)
+        self.assertEqual(filtered(), self.data[0])
+
+    def test_non_positive_window_raises_error(self):
+        with self.assertRaises(ValueError):
+            median.MedianData(self.data, window=0)
+
+    def test_missing_values_are_left_out_of_window(self):
+        filtered = median.MedianData([1., None, 3., None, None, None],
+                                     window=3)[:]
+        self.assertEqual(list(filtered[:4]), [1., 1., 2., 3.])
+        self.assertTrue(math.isnan(filtered[5]))
+
+    def test_non_integer_window_raises_error(self):
+        with self.assertRaises(ValueError):
+            median.MedianData(self.data, window=2.5)
+
+    def test_infinite_values_match_naive_median(self):
+        data = [1., math.inf, 2., -math.inf, 3., math.inf, math.inf, 4.]
+        filtered = median.MedianData(data, window=3)
+        np.testing.assert_array_equal(filtered[:],
+                                      naive_running_median(data, 3))
+
+
+class TestHampelData(unittest.TestCase):
+    def setUp(self):
+        self.data = [float(i % 5) for i in range(50)]
+
+    def test_mad_matches_numpy(self):
+        for n in (1, 2, 5, 8, 13):
+            values = sorted(random.gauss(0, 1) for _ in range(n))
+            skiplist = median._IndexableSkiplist(n)
+            for value in values:
+                skiplist.insert(value)
+            middle = median.MedianData._middle(skiplist)
+            self.assertAlmostEqual(
+                median.HampelData._mad(skiplist, middle),
+                np.median(np.abs(np.array(values) - np.median(values))))
+
+    def test_spike_is_replaced(self):
+        spiked = list(self.data)
+        spiked[25] = 1000.
+        filtered = median.HampelData(spiked, window=9)[:]
+        self.assertLess(filtered[25], 5)
+
+    def test_missing_value_is_filled_with_median(self):
+        gappy = list(self.data)
+        gappy[25] = None
+        filtered = median.HampelData(gappy, window=9)[:]
+        self.assertEqual(filtered[25], np.median(self.data[17:25]))
+
+    def test_infinite_spikes_are_replaced(self):
+        spiked = list(self.data)
+        spiked[20] = math.inf
+        spiked[30] = -math.inf
+        filtered = median.HampelData(spiked, window=9)[:]
+        self.assertTrue(np.all(np.isfinite(filtered)))
+
+    def test_clean_data_passes_through(self):
+        filtered = median.HampelData(self.data, window=9)[:]
+        self.assertEqual(list(filtered), self.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import random
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import signal
+from . import smoothing as smoothing
+
+"""
+Unit testing for the windowed smoothing filters.
+"""
+
+
+class TestMovingAverageData(unittest.TestCase):
+    def setUp(self):
+        self.data = [random.gauss(0, 1) for _ in range(500)]
+
+    def test_matches_rolling_mean(self):
+        filtered = smoothing.MovingAverageData(self.data, window=20)
+        np.testing.assert_allclose(
+            filtered[:],
+            pd.Series(self.data).rolling(20, min_periods=1).mean())
+
+    def test_constant_data_is_unchanged(self):
+        filtered = smoothing.MovingAverageData([3.] * 100, window=1000)
+        self.assertEqual(list(filtered[:]), [3.] * 100)
+
+    def test_non_positive_window_raises_error(self):
+        with self.assertRaises(ValueError):
+            smoothing.MovingAverageData(self.data, window=-1)
+
+    def test_missing_values_are_not_counted(self):
+        filtered = smoothing.MovingAverageData([1., None, 3., 5.],
+                                               window=2)[:]
+        self.assertEqual(list(filtered), [1., 1., 3., 4.])
+
+    def test_infinite_values_leave_the_window(self):
+        filtered = smoothing.MovingAverageData(
+            [1., np.inf, 3., 5., -np.inf, np.inf, 7., 9.], window=2)[:]
+        np.testing.assert_array_equal(
+            filtered, [1., np.inf, np.inf, 4., -np.inf, np.nan, np.inf, 8.])
+
+
+class TestSavitzkyGolayData(unittest.TestCase):
+    def setUp(self):
+        self.data = [random.gauss(0, 1) for _ in range(500)]
+
+    def test_stream_raises_error(self):
+        async def chunks():
+            yield self.data[:250]
+            yield self.data[250:]
+
+        async def consume():
+            return [chunk async for chunk in
+                    smoothing.SavitzkyGolayData.stream(chunks())]
+
+        with self.assertRaisesRegex(TypeError, "SavitzkyGolayData"):
+            asyncio.run(consume())
+
+    def test_matches_scipy_savgol_filter(self):
+        filtered = smoothing.SavitzkyGolayData(self.data, window=11,
+                                               polyorder=3)
+        np.testing.assert_allclose(
+            filtered[:], signal.savgol_filter(self.data, 11, 3), atol=1e-12)
+
+    def test_polynomial_data_is_unchanged(self):
+        quadratic = [0.5 * i ** 2 - i + 2. for i in range(50)]
+        filtered = smoothing.SavitzkyGolayData(quadratic, window=9,
+                                               polyorder=2)
+        np.testing.assert_allclose(filtered[:], quadratic, atol=1e-9)
+
+    def test_missing_values_are_interpolated(self):
+        line = [2. * i for i in range(30)]
+        line[10:15] = [None] * 5
+        filtered = smoothing.SavitzkyGolayData(line, window=7)
+        np.testing.assert_allclose(filtered[:], [2. * i for i in range(30)],
+                                   atol=1e-9)
+
+    def test_data_shorter_than_window(self):
+        filtered = smoothing.SavitzkyGolayData([1., 2., 3.], window=11)
+        np.testing.assert_allclose(filtered[:], [1., 2., 3.])
+
+    def test_even_window_raises_error(self):
+        with self.assertRaises(ValueError):
+            smoothing.SavitzkyGolayData(self.data, window=10)
+
+    def test_polyorder_not_less_than_window_raises_error(self):
+        with self.assertRaises(ValueError):
+            smoothing.SavitzkyGolayData(self.data, window=5, polyorder=5)
+
+
+class TestEWMData(unittest.TestCase):
+    def setUp(self):
+        self.data = [random.gauss(0, 1) for _ in range(500)]
+        self.ewm = pd.Series(self.data).ewm(alpha=0.2, adjust=False)
+
+    def test_mean_matches_pandas(self):
+        filtered = smoothing.EWMAData(self.data, alpha=0.2)
+        np.testing.assert_allclose(filtered[:], self.ewm.mean())
+
+    def test_variance_matches_pandas(self):
+        filtered = smoothing.EWMVarData(self.data, alpha=0.2)
+        np.testing.assert_allclose(filtered[:], self.ewm.var(bias=True),
+                                   atol=1e-12)
+
+    def test_state_is_held_over_missing_values(self):
+        gappy = list(self.data)
+        gappy[100:110] = [None] * 10
+        filtered = smoothing.EWMVarData(gappy, alpha=0.2)[:]
+        self.assertEqual(list(filtered[100:110]), [filtered[99]] * 10)
+
+    def test_span_is_equivalent_to_alpha(self):
+        self.assertEqual(list(smoothing.EWMAData(self.data, span=9)[:]),
+                         list(smoothing.EWMAData(self.data, alpha=0.2)[:]))
+
+    def test_alpha_and_span_together_raise_error(self):
+        with self.assertRaises(ValueError):
+            smoothing.EWMAData(self.data, alpha=0.2, span=9)
+
+    def test_alpha_out_of_range_raises_error(self):
+        with self.assertRaises(ValueError):
+            smoothing.EWMAData(self.data, alpha=1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()